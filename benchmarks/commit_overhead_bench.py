@@ -0,0 +1,67 @@
+"""Measure the per-run overhead of @commit: with a fresh session per run, with the process-wide session, and
+with the commit made in the background (`LOGIS_BACKGROUND=1`), which is the time the experiment loop waits.
+
+$ uv run python benchmarks/commit_overhead_bench.py --runs 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import git
+
+import logis
+
+from logis.util.session import close_session
+
+
+@logis.commit
+def noop(run: logis.Run, i: int):
+    run.set_hyperparameters({"i": i})
+    run.set_metrics({"score": i})
+
+
+def measure(runs: int, fresh_session: bool) -> float:
+    """Seconds per run of an experiment that does no work."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(runs):
+            noop(i)
+            if fresh_session:
+                close_session()  # What every run paid before sessions were shared
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="Leave out the commits themselves")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        os.environ["LOGIS_DRY_RUN"] = "1"
+    with tempfile.TemporaryDirectory() as directory:
+        repo = git.Repo.init(directory)
+        with repo.config_writer() as config:
+            config.set_value("user", "name", "bench").set_value("user", "email", "bench@example.com")
+        os.chdir(directory)
+
+        print(f"{args.runs} runs{' (dry run)' if args.dry_run else ''}\n")
+        print(f"{'session':<12}{'ms/run':>10}")
+        for name, fresh, background in (
+            ("per run", True, False),
+            ("shared", False, False),
+            ("background", False, True),
+        ):
+            close_session()
+            os.environ["LOGIS_BACKGROUND"] = "1" if background else ""
+            print(f"{name:<12}{measure(args.runs, fresh) * 1000:>10.2f}")
+            logis.flush()
+        close_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Compare the size and decode time of the metadata encodings (`LOGIS_ENCODING`).
+
+$ uv run python benchmarks/encoding_bench.py --runs 1000 --epochs 500
+"""
+
+import argparse
+import random
+import time
+
+from logis.domain.experiment import ExperimentRun, MetadataEncoding
+
+
+def make_runs(num_runs: int, epochs: int) -> list[ExperimentRun]:
+    """Runs that log per-epoch curves, the case where metadata gets large."""
+    rng = random.Random(0)
+    return [
+        ExperimentRun(
+            experiment="bench",
+            hyperparameters={"lr": rng.random(), "batch_size": 32},
+            metrics={
+                "accuracy": rng.random(),
+                "train_loss": [rng.random() for _ in range(epochs)],
+                "val_loss": [rng.random() for _ in range(epochs)],
+            },
+        )
+        for _ in range(num_runs)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--epochs", type=int, default=500)
+    args = parser.parse_args()
+
+    runs = make_runs(args.runs, args.epochs)
+    print(f"{args.runs} runs with {args.epochs} epochs of 2 curves each\n")
+    print(f"{'encoding':<12}{'MB':>10}{'encode s':>12}{'decode s':>12}")
+    for encoding in MetadataEncoding:
+        start = time.perf_counter()
+        messages = [run.as_commit_message(template="run {experiment}").render(encoding) for run in runs]
+        encoded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed = sum(ExperimentRun.parse_metadata(message) is not None for message in messages)
+        decoded = time.perf_counter() - start
+        assert parsed == len(runs)
+
+        size = sum(len(message.encode()) for message in messages) / 1e6
+        print(f"{encoding:<12}{size:>10.1f}{encoded:>12.2f}{decoded:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the bulk `git log` reader with the per-object GitPython walk.
+
+$ uv run python benchmarks/git_log_bench.py --commits 100000
+"""
+
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+
+from pathlib import Path
+
+import git
+
+from logis.domain.experiment import CommitKind
+from logis.domain.git import Commit
+from logis.service.git import GitService
+
+
+def make_repo(path: Path, num_commits: int, exp_ratio: float) -> git.Repo:
+    """Create a synthetic repository with `git fast-import`, one experiment commit every 1/exp_ratio commits."""
+    subprocess.run(["git", "init", "-q", str(path)], check=True)
+    exp_every = max(1, round(1 / exp_ratio))
+    stream = bytearray()
+    for i in range(num_commits):
+        if i % exp_every == 0:
+            metadata = {
+                "experiment": "bench",
+                "hyperparameters": {"lr": 0.001 * i},
+                "metrics": {"accuracy": i / num_commits},
+            }
+            message = f"exp: run bench {i}\n\n---\n\n{json.dumps(metadata, indent=2)}"
+        else:
+            message = f"feat: change {i}"
+        data = message.encode()
+        stream += b"commit refs/heads/main\n"
+        stream += f"committer Bench <bench@example.com> {1_700_000_000 + i} +0000\n".encode()
+        stream += f"data {len(data)}\n".encode() + data + b"\n"
+    subprocess.run(["git", "fast-import", "--quiet"], input=bytes(stream), cwd=path, check=True)
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=path, check=True)
+    return git.Repo(path)
+
+
+def timed(label: str, fn) -> None:
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40}{count:>10} commits{elapsed:>10.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=100_000)
+    parser.add_argument("--exp-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Creating synthetic repository with {args.commits} commits...")
+        repo = make_repo(Path(tmp_dir), args.commits, args.exp_ratio)
+        service = GitService(repo)
+
+        timed("GitPython iter_commits + from_git", lambda: sum(1 for c in repo.iter_commits() if Commit.from_git(c)))
+        timed("bulk git log", lambda: sum(1 for _ in service.iter_commits()))
+        timed("bulk git log --grep ^exp:", lambda: sum(1 for _ in service.iter_commits(CommitKind.EXP)))
+
+
+if __name__ == "__main__":
+    main()
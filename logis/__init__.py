@@ -1,3 +1,25 @@
-from logis.decorator import commit
+from typing import TYPE_CHECKING, Any
 
-__ALL__ = [commit]
+if TYPE_CHECKING:
+    from logis.decorator import Run, batch, commit, flush
+    from logis.sweeps import sweep
+
+__all__ = ["Run", "batch", "commit", "flush", "sweep"]
+
+# Module each export lives in.
+_MODULES = {
+    "Run": "logis.decorator",
+    "batch": "logis.decorator",
+    "commit": "logis.decorator",
+    "flush": "logis.decorator",
+    "sweep": "logis.sweeps",
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Import the decorator on first use, so `import logis` (and the CLI) doesn't pay for it.
+    if name in _MODULES:
+        from importlib import import_module
+
+        return getattr(import_module(_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,65 @@
+from importlib import import_module
+
 import click
 
-from dishka.integrations.click import setup_dishka
 
-from logis.cli.commands.query import query
-from logis.util.di import DI
+class LazyGroup(click.Group):
+    """A command group that only imports a subcommand's module when that subcommand is run.
+
+    Commands are registered as `name -> (import path, short help)`, so listing them in `--help` doesn't
+    import anything either.
+    """
+
+    def __init__(self, *args, lazy_commands: dict[str, tuple[str, str]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands
+
+    def list_commands(self, context: click.Context) -> list[str]:
+        return sorted([*super().list_commands(context), *self.lazy_commands])
+
+    def get_command(self, context: click.Context, name: str) -> click.Command | None:
+        if name not in self.lazy_commands:
+            return super().get_command(context, name)
+        module, _, attribute = self.lazy_commands[name][0].rpartition(".")
+        command = getattr(import_module(module), attribute)
+        if not isinstance(command, click.Command):
+            command = click.command(name)(command)
+        self.add_command(command, name)
+        del self.lazy_commands[name]
+        return command
+
+    def format_commands(self, context: click.Context, formatter: click.HelpFormatter) -> None:
+        rows = [(name, help) for name, (_, help) in self.lazy_commands.items()]
+        rows += [(name, command.get_short_help_str()) for name, command in self.commands.items() if not command.hidden]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(sorted(rows))
+
+
+COMMANDS = {
+    "migrate": (
+        "logis.cli.commands.migrate.migrate",
+        "Copy run metadata from experiment commit messages into git notes.",
+    ),
+    "query": ("logis.cli.commands.query.query", "Query experiment runs."),
+    "serve": ("logis.cli.commands.serve.serve", "Serve queries from a warm index until interrupted."),
+    "sweep": ("logis.cli.commands.sweep.sweep", "Run an experiment over a grid of parameters."),
+}
 
 
 def start():
-    @click.group()
+    @click.group(cls=LazyGroup, lazy_commands=dict(COMMANDS))
     @click.pass_context
     def main(context: click.Context):
-        di = DI()
-        setup_dishka(container=di.container, context=context, auto_inject=True)
+        # The container (and the services behind it) is only built once a command actually runs, with the
+        # services that command asks for. Auto-injection would load every command to inject them all.
+        from dishka.integrations.click import inject, setup_dishka
+
+        from logis.util.di import DI
 
-    main.command("query")(query)
+        command = context.command.get_command(context, context.invoked_subcommand)
+        di = DI.for_function(command.callback)
+        setup_dishka(container=di.container, context=context)
+        command.callback = inject(command.callback)
 
     main()
@@ -0,0 +1,13 @@
+from dishka import FromDishka
+from rich.console import Console
+
+from logis.config import NOTES_REF
+from logis.service.git import GitService
+
+
+def migrate(git_service: FromDishka[GitService]):
+    """Copy run metadata from experiment commit messages into git notes."""
+    console = Console()
+    count = git_service.backfill_notes()
+    console.print(f"Added {count} note(s) under {NOTES_REF}.")
+    console.print("Set LOGIS_STORAGE=notes to keep the metadata of new runs there too.")
@@ -1,24 +1,117 @@
+import json
+import re
 import sys
 
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import and_
+from typing import Optional
+
 import click
 
 from dishka import FromDishka
 from rich.console import Console
+from rich.table import Table
 
+from logis.domain.query import Aggregate, OrderBy, Query, lookup
+from logis.service.daemon import DaemonClient
 from logis.service.query import QueryService
 
+RELATIVE_TIME_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def parse_time(context: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[str]:
+    """Parse an ISO date/time or a relative time like `7d` (7 days ago) into an ISO timestamp."""
+    if value is None:
+        return None
+    if match := re.fullmatch(r"(\d+)([mhdw])", value):
+        amount, unit = match.groups()
+        return (datetime.now() - timedelta(**{RELATIVE_TIME_UNITS[unit]: int(amount)})).isoformat()
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise click.BadParameter("expected an ISO date/time or a relative time like 30m, 12h, 7d or 2w")
 
-@click.argument("query", type=str)
+
+@click.argument("query", type=str, required=False)
 @click.option("limit", "--limit", type=int, default=-1)
 @click.option("full_sha", "--full-sha", is_flag=True, type=bool, default=False)
-def query(query: str, limit: int, full_sha: bool, query_service: FromDishka[QueryService]):
+@click.option("experiment", "--experiment", type=str, default=None, help="Only runs of this experiment.")
+@click.option("since", "--since", type=str, default=None, callback=parse_time, help="Only runs since, e.g. 7d.")
+@click.option("until", "--until", type=str, default=None, callback=parse_time, help="Only runs until, e.g. 1d.")
+@click.option("order_by", "--order-by", type=str, default=None, help="Order by a numeric field, highest first.")
+@click.option("ascending", "--asc", is_flag=True, type=bool, default=False, help="Order lowest first.")
+@click.option("group_by", "--group-by", type=str, default=None, help="Group aggregates by a field.")
+@click.option(
+    "aggregates", "--agg", type=str, multiple=True, help="Aggregate, e.g. count, mean:metrics.loss or p90:..."
+)
+def query(
+    query: Optional[str],
+    limit: int,
+    full_sha: bool,
+    experiment: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    order_by: Optional[str],
+    ascending: bool,
+    group_by: Optional[str],
+    aggregates: tuple[str, ...],
+    query_service: FromDishka[QueryService],
+):
+    """Query experiment runs."""
     console = Console()
-    query_parts = query.split(" ")
-    if len(query_parts) != 3:
+    clauses = []
+    try:
+        if query:
+            query_parts = query.split(" ")
+            if len(query_parts) != 3:
+                raise ValueError(query)
+            clauses.append(Query.where(*query_parts))
+        # These filters are answered from the secondary indexes.
+        if experiment:
+            clauses.append(Query.where("experiment", "==", json.dumps(experiment)))
+        if since:
+            clauses.append(Query.where("timestamp", ">=", json.dumps(since)))
+        if until:
+            clauses.append(Query.where("timestamp", "<=", json.dumps(until)))
+        parsed_aggregates = [Aggregate.parse(spec) for spec in aggregates]
+    except ValueError:
         console.print(f"[b]Invalid query:[/b] {query}")
         sys.exit(1)
 
-    result = query_service.execute_simple(*query_parts, limit=limit)
+    if group_by and not parsed_aggregates:
+        parsed_aggregates = [Aggregate(function="count")]
+
+    if not clauses:
+        if not (order_by or parsed_aggregates):
+            console.print("[b]Invalid query:[/b] provide a query or at least one of --experiment, --since, --until")
+            sys.exit(1)
+        clauses.append(Query.everything())
+
+    # Use `logis serve` if it's running in this repository.
+    service = DaemonClient.connect(query_service.git_service.git_dir) or query_service
+
+    if parsed_aggregates:
+        aggregate_result = service.aggregate(reduce(and_, clauses), parsed_aggregates, group_by=group_by)
+        if aggregate_result.is_empty:
+            console.print("[b]No results found.[/b]")
+            return
+        table = Table()
+        if group_by:
+            table.add_column(group_by)
+        table.add_column("runs", justify="right")
+        for aggregate in parsed_aggregates:
+            table.add_column(aggregate.label, justify="right")
+        for group in aggregate_result.groups:
+            cells = [json.dumps(group.key)] if group_by else []
+            cells.append(str(group.count))
+            cells.extend("-" if value is None else f"{value:g}" for value in group.values.values())
+            table.add_row(*cells)
+        console.print(table)
+        return
+
+    ordering = OrderBy(field=order_by, descending=not ascending) if order_by else None
+    result = service.execute(reduce(and_, clauses), limit=limit, order_by=ordering)
 
     if result.is_empty:
         console.print("[b]No results found.[/b]")
@@ -28,4 +121,8 @@ def query(query: str, limit: int, full_sha: bool, query_service: FromDishka[Quer
     for commit in result.commits:
         sha = commit.sha if full_sha else commit.sha[:7]
         sha_len = 40 if full_sha else 7
-        console.print(f"\t[b]{sha:<{sha_len + 3}}[/b]{commit.to_semantic().summary}")
+        summary = commit.to_semantic().summary
+        if ordering:
+            value = lookup(commit.experiment_run.model_dump(mode="json"), ordering.path)
+            summary = f"{ordering.field}={value}  {summary}"
+        console.print(f"\t[b]{sha:<{sha_len + 3}}[/b]{summary}")
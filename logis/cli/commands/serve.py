@@ -0,0 +1,31 @@
+import sys
+
+from dishka import FromDishka
+from rich.console import Console
+
+from logis.error import LogisError
+from logis.service.daemon import QueryServer
+from logis.service.git import GitService
+from logis.service.index import IndexService
+from logis.service.query import QueryService
+
+
+def serve(
+    git_service: FromDishka[GitService],
+    index_service: FromDishka[IndexService],
+    query_service: FromDishka[QueryService],
+):
+    """Serve queries from a warm index until interrupted."""
+    console = Console()
+    try:
+        server = QueryServer(git_service, index_service, query_service)
+    except LogisError as e:
+        console.print(f"[b]{e}[/b]")
+        sys.exit(1)
+
+    console.print(f"Serving queries on {server.path}, press Ctrl+C to stop.")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+from importlib import import_module
+from typing import Any, Optional
+
+import click
+
+from rich.console import Console
+
+from logis.error import LogisError
+
+
+def parse_param(context: click.Context, param: click.Parameter, values: tuple[str, ...]) -> dict[str, list[Any]]:
+    """Parse `name=value,value,...` options into a parameter space. Values are read as JSON if they can be."""
+    space: dict[str, list[Any]] = {}
+    for value in values:
+        name, separator, choices = value.partition("=")
+        if not separator or not name:
+            raise click.BadParameter(f"expected name=value[,value...], got {value!r}")
+        space[name] = [_parse_value(choice) for choice in choices.split(",")]
+    return space
+
+
+def _parse_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+@click.command()
+@click.argument("target")
+@click.option("space", "--param", "-p", multiple=True, callback=parse_param, help="Values to try, e.g. lr=0.1,0.01.")
+@click.option("workers", "--workers", "-w", type=int, default=None, help="Worker processes, defaults to one per CPU.")
+@click.option("samples", "--samples", type=int, default=None, help="Run this many random configurations.")
+@click.option("seed", "--seed", type=int, default=0, help="Random seed for --samples.")
+@click.option("skip_existing", "--skip-existing/--rerun", default=True, help="Skip configurations already recorded.")
+def sweep(
+    target: str,
+    space: dict[str, list[Any]],
+    workers: Optional[int],
+    samples: Optional[int],
+    seed: int,
+    skip_existing: bool,
+):
+    """Run an experiment over a grid of parameters.
+
+    TARGET is a @logis.commit-decorated function, as `module:function`.
+    """
+    from logis.sweeps import configurations
+    from logis.sweeps import sweep as run_sweep
+
+    console = Console()
+    module, _, name = target.partition(":")
+    if not module or not name:
+        console.print(f"[b]Invalid target:[/b] expected module:function, got {target!r}")
+        sys.exit(1)
+    sys.path.insert(0, os.getcwd())  # Like `python -m`, and inherited by the workers
+    experiment = getattr(import_module(module), name)
+
+    console.print(f"Sweeping {len(configurations(space, samples, seed))} configuration(s) of {target}...")
+    try:
+        runs = run_sweep(experiment, space, workers=workers, samples=samples, seed=seed, skip_existing=skip_existing)
+    except LogisError as e:
+        console.print(f"[b]{e}[/b]")
+        sys.exit(1)
+    console.print(f"Recorded {len(runs)} run(s).")
@@ -1,2 +1,50 @@
 BODY_METADATA_SEPARATOR = "---"
 SUMMARY_BODY_SEPARATOR = "\n\n"
+# Batch commits hold their runs as a list under this metadata key.
+BATCH_RUNS_FIELD = "runs"
+# Runs made by logis.sweep record their configuration under this annotation.
+SWEEP_ANNOTATION = "sweep"
+# Runs of experiments with `@commit(cache=True)` record the fingerprint of their code and arguments here.
+CACHE_ANNOTATION = "fingerprint"
+# Start of metadata written with a binary encoding (`LOGIS_ENCODING=zlib`), followed by version and codec.
+ENCODED_METADATA_PREFIX = "logis:"
+# With `LOGIS_STORAGE=notes`, run metadata is kept in git notes under this ref instead of the commit message.
+NOTES_REF = "refs/notes/logis"
+
+# Local state kept inside the repository's `.git` directory.
+LOGIS_DIR = "logis"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 4
+DAEMON_SOCKET = "daemon.sock"
+COMMIT_LOCK_FILE = "commit.lock"
+COMMIT_QUEUE_DIR = "queue"
+COMMIT_CLAIMED_DIR = "committing"  # Queue entries a drain has taken on
+COMMIT_FAILED_DIR = "failed"  # Deferred commits that conflicted, until their process reports them
+STAT_CACHE_FILE = "stat-cache.json"
+ARTIFACT_DIR = "objects"  # Content-addressed `.npy` files of arrays logged with runs
+
+# Waiting for locks (the commit lock, git's index.lock): exponential backoff between retries, in seconds.
+LOCK_TIMEOUT = 60.0
+LOCK_BACKOFF_INITIAL = 0.01
+LOCK_BACKOFF_MAX = 0.5
+
+# How often (in seconds) `logis serve` checks HEAD for new commits.
+DAEMON_POLL_INTERVAL = 1.0
+
+# Number of compiled query plans kept in memory.
+QUERY_PLAN_CACHE_SIZE = 128
+
+# Minimum number of runs before queries switch to vectorized filtering (requires numpy).
+COLUMNAR_THRESHOLD = 1000
+# Building the columnar view costs about as much as ten row scans, so it's only built once this many queries
+# of the same log scanned its rows, e.g. by `logis serve`. One-off queries from the CLI keep scanning rows.
+COLUMNAR_MIN_SCANS = 10
+
+# Experiment commits are parsed across a process pool (see `LOGIS_WORKERS`) above this many commits.
+PARALLEL_PARSE_THRESHOLD = 5000
+PARALLEL_PARSE_CHUNK_SIZE = 1000
+
+# `Run.log` keeps this many points per metric in memory before appending them to disk in the background,
+# with at most SERIES_MAX_PENDING_CHUNKS chunks waiting to be written.
+SERIES_CHUNK_SIZE = 4096
+SERIES_MAX_PENDING_CHUNKS = 4
@@ -1,26 +1,49 @@
+import asyncio
+import atexit
+import inspect
 import os
+import threading
 
 from dataclasses import dataclass
-from functools import wraps
-from typing import Callable, Concatenate, Literal, Optional, ParamSpec, TypeVar, Union, cast, overload
+from datetime import timedelta
+from functools import cache, wraps
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Concatenate,
+    Literal,
+    Optional,
+    ParamSpec,
+    Sequence,
+    TypeVar,
+    Union,
+    cast,
+    get_type_hints,
+    overload,
+)
 
 from pydantic import BaseModel
-from rich.console import Console
-from rich.padding import Padding
 
-from logis.domain.experiment import ExperimentRun
-from logis.domain.git import StageStrategy
+from logis.config import CACHE_ANNOTATION
+from logis.domain.experiment import ExperimentBatch, ExperimentRun
+from logis.domain.git import ExperimentCommit, StageStrategy
 from logis.error import LogisError
-from logis.service.git import GitService
-from logis.util.di import DI
+
+if TYPE_CHECKING:
+    from logis.service.aio import AsyncGitService
+    from logis.service.git import GitService
+    from logis.service.series import SeriesWriter
 
 
 @dataclass
 class Run:
-    """Tracks experiment hyperparameters and metrics."""
+    """Tracks experiment hyperparameters, metrics, arrays and metric series."""
 
     _hypers: Optional[dict] = None
     _metrics: Optional[dict] = None
+    _arrays: Optional[dict] = None
+    _series: Optional["SeriesWriter"] = None
 
     def set_hyperparameters(self, hypers: dict) -> None:
         """Set hyperparameters manually."""
@@ -30,6 +53,36 @@ class Run:
         """Set metrics manually."""
         self._metrics = metrics
 
+    def set_artifacts(self, arrays: dict) -> None:
+        """Set arrays (e.g. loss curves, confusion matrices, embeddings) to store alongside the run.
+
+        They are saved as content-addressed `.npy` files and only referenced from the commit, see
+        ArtifactService. Requires numpy.
+        """
+        self._arrays = arrays
+
+    def log(self, step: float, **metrics: float) -> None:
+        """Record metric values at a step as the run goes, e.g. `run.log(epoch, loss=loss, accuracy=accuracy)`.
+
+        The series are spooled to disk in the background and stored with the run's arrays when it finishes.
+        The commit records a summary of each (count, last, min and max, with the steps they were reached at)
+        under `series`, which queries can use, e.g. `series.loss.min < 0.1`. Requires numpy.
+        """
+        if self._series is None:
+            from logis.service.series import SeriesWriter
+
+            self._series = SeriesWriter()
+        self._series.append(step, metrics)
+
+    @property
+    def arrays(self) -> dict:
+        return self._arrays or {}
+
+    @property
+    def has_artifacts(self) -> bool:
+        """Whether there are arrays or logged series to store with the run."""
+        return bool(self._arrays) or self._series is not None
+
     @property
     def hyperparameters(self) -> dict:
         if not self._hypers:
@@ -55,6 +108,10 @@ def commit(
     hypers: str = "hypers",
     template: str = "run {experiment}",
     strategy: StageStrategy = StageStrategy.ALL,
+    paths: Sequence[str] = (),
+    cache: bool = False,
+    cache_ttl: Optional[timedelta] = None,
+    background: bool = False,
     implicit: Literal[False] = False,
 ) -> Callable[[Callable[Concatenate[Run, P], R]], Callable[P, R]]: ...
 
@@ -66,6 +123,10 @@ def commit(
     hypers: str = "hypers",
     template: str = "run {experiment}",
     strategy: StageStrategy = StageStrategy.ALL,
+    paths: Sequence[str] = (),
+    cache: bool = False,
+    cache_ttl: Optional[timedelta] = None,
+    background: bool = False,
     implicit: Literal[True],
 ) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
 
@@ -82,31 +143,31 @@ def commit(
     hypers: str = "hypers",
     template: str = "run {experiment}",
     strategy: StageStrategy = StageStrategy.ALL,
+    paths: Sequence[str] = (),
+    cache: bool = False,
+    cache_ttl: Optional[timedelta] = None,
+    background: bool = False,
     implicit: bool = False,
 ) -> Union[Callable[[Callable[..., R]], Callable[..., R]], Callable[..., R]]:
     """Decorator to auto-commit experimental code with scientific metadata.
 
     Can be used as @commit or @commit(message="Custom message")
+
+    The strategy decides what is staged with each run, e.g. StageStrategy.TRACKED to leave untracked data
+    and checkpoints alone, or StageStrategy.PATHS with `paths=["src/**/*.py"]`.
     """
 
     def decorator(func: Callable[..., R]) -> Callable[..., R]:
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            di = DI()
-            git_service = di[GitService]
-            run = Run()
+        def call_args(run: Run, args: tuple) -> list:
+            return list(args) if implicit else [run, *args]
 
+        def experiment_run(run: Run, metrics: Any, kwargs: dict, stored: dict[str, Any]) -> ExperimentRun:
             if not implicit:
-                args = [run] + list(args)
-                metrics = func(*args, **kwargs)
-
                 if run.hyperparameters is None:
                     raise LogisError("When using context, hyperparameters must be set via the Context object")
                 if run.metrics is None:
                     raise LogisError("When using context, metrics must be set via the Context object")
             else:
-                metrics = func(*args, **kwargs)
-
                 hyperparameters = cast(BaseModel, kwargs.get(hypers, None))
                 if not hyperparameters:
                     raise LogisError("When not using context, hyperparameters must be provided as function arguments")
@@ -116,32 +177,305 @@ def commit(
                 run.set_hyperparameters(hyperparameters.model_dump())
                 run.set_metrics(metrics.model_dump())
 
-            experiment = ExperimentRun(
+            return ExperimentRun(
                 experiment=func.__name__,
                 hyperparameters=run.hyperparameters,
                 metrics=run.metrics,
+                **stored,
             )
-            message = experiment.as_commit_message(template=template)
-
-            # Commit changes
-            if git_service.should_commit(strategy):
-                console = Console()
-                console.print("Generating commit with message:\n")
-                console.print(Padding(message.render(), pad=(0, 0, 0, 4)))  # Indent by 4 spaces.
-                if os.getenv("LOGIS_DRY_RUN") == "1":
-                    console.print("\nDry run enabled. Not committing changes.")
-                else:
-                    git_service.stage_and_commit(message.render())
 
+        def arguments(args: tuple, kwargs: dict) -> dict[str, Any]:
+            """The call's arguments by parameter name, without the Run, for fingerprinting."""
+            bound = inspect.signature(func).bind(*call_args(Run(), args), **kwargs)
+            bound.apply_defaults()
+            return {name: value for name, value in bound.arguments.items() if not isinstance(value, Run)}
+
+        def cached_result(commit: ExperimentCommit) -> Any:
+            _announce_reuse(commit)
+            metrics = commit.experiment_run.metrics
+            returns = _return_model(func)
+            return returns.model_validate(metrics) if returns else metrics
+
+        def execute(*args, **kwargs) -> tuple[Any, ExperimentRun]:
+            """Run the experiment and build its ExperimentRun, without recording it."""
+            run = Run()
+            metrics = func(*call_args(run, args), **kwargs)
+            return metrics, experiment_run(run, metrics, kwargs, _store_artifacts(run))
+
+        def record(experiment: ExperimentRun, git_service: Optional["GitService"] = None) -> None:
+            """Commit a finished run, or add it to the active batch."""
+            if batch := _active_batch():
+                if batch.add(experiment):
+                    batch.flush()
+                return
+
+            git_service = git_service or _git_service()
+            message = experiment.as_commit_message(template=template).render()
+            if git_service.should_commit(strategy, paths) and _announce(message):
+                staging = git_service.staging(strategy, paths)
+                git_service.stage_and_commit(message, staging, wait=not _in_background(background))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # Look up the repository first, so that a run outside of one fails before doing any work.
+            git_service = None if _active_batch() else _git_service()
+            if cache:
+                fingerprint, hit = _lookup(func, arguments(args, kwargs), strategy, paths, cache_ttl)
+                if hit:
+                    return cached_result(hit)
+            metrics, experiment = execute(*args, **kwargs)
+            if cache:
+                experiment = _with_fingerprint(experiment, fingerprint)
+            record(experiment, git_service)
             return metrics
 
-        return wrapper
+        # Used by logis.sweep to run experiments in worker processes and record them in this one.
+        wrapper.execute = execute  # type: ignore[attr-defined]
+        wrapper.record = record  # type: ignore[attr-defined]
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            # Git runs off the event loop, so other runs keep going while this one is committed.
+            batch = _active_batch()
+            git_service = None if batch else _async_git_service()
+            if cache:
+                lookup = (func, arguments(args, kwargs), strategy, paths, cache_ttl)
+                # It uses the same repository as the git thread.
+                fingerprint, hit = await (git_service or _async_git_service()).run(_lookup, *lookup)
+                if hit:
+                    return cached_result(hit)
+            run = Run()
+
+            metrics = await func(*call_args(run, args), **kwargs)
+            stored = await asyncio.to_thread(_store_artifacts, run) if run.has_artifacts else {}
+            experiment = experiment_run(run, metrics, kwargs, stored)
+            if cache:
+                experiment = _with_fingerprint(experiment, fingerprint)
+
+            if batch:
+                if batch.add(experiment):
+                    await asyncio.to_thread(batch.flush)
+                return metrics
+
+            message = experiment.as_commit_message(template=template).render()
+            if await git_service.should_commit(strategy, paths) and _announce(message):
+                staging = await git_service.staging(strategy, paths)
+                await git_service.stage_and_commit(message, staging, wait=not _in_background(background))
+
+            return metrics
+
+        return cast(Callable[..., R], async_wrapper) if inspect.iscoroutinefunction(func) else wrapper
 
     if fn is None:
         return decorator
     return decorator(fn)
 
 
+class Batch:
+    """Collects the runs of @commit-decorated functions and records them together, in a single commit.
+
+    Use it as a context manager, e.g. around a sweep. The batch is committed when the block exits, or
+    every `size` runs:
+
+        with logis.batch():
+            for lr in (0.1, 0.01, 0.001):
+                train(lr=lr)
+
+    Each run is still queried individually.
+    """
+
+    def __init__(
+        self,
+        template: str = "batch of {count} runs",
+        strategy: StageStrategy = StageStrategy.ALL,
+        size: Optional[int] = None,
+        paths: Sequence[str] = (),
+    ):
+        self.template = template
+        self.strategy = strategy
+        self.paths = paths
+        self.size = size
+        self.runs: list[ExperimentRun] = []
+        self._lock = threading.Lock()
+
+    def add(self, run: ExperimentRun) -> bool:
+        """Add a run to the batch, returning whether it's full and should be flushed."""
+        with self._lock:
+            self.runs.append(run)
+            return self.size is not None and len(self.runs) >= self.size
+
+    def flush(self, wait: Optional[bool] = None) -> None:
+        """Commit the runs collected so far, if any.
+
+        Args:
+            wait: Whether to wait for the commit, rather than make it in the background. Defaults to waiting,
+                unless `LOGIS_BACKGROUND=1` is set.
+        """
+        with self._lock:
+            runs, self.runs = self.runs, []
+        if not runs:
+            return
+
+        git_service = _git_service()
+        message = ExperimentBatch(runs=runs).as_commit_message(template=self.template).render()
+        if git_service.should_commit(self.strategy, self.paths) and _announce(message):
+            staging = git_service.staging(self.strategy, self.paths)
+            git_service.stage_and_commit(message, staging, wait=not _in_background() if wait is None else wait)
+
+    def __enter__(self) -> "Batch":
+        _batches.append(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _batches.remove(self)
+        self.flush()  # Keep the runs that finished, even if the block raised
+
+
+def batch(
+    template: str = "batch of {count} runs",
+    strategy: StageStrategy = StageStrategy.ALL,
+    size: Optional[int] = None,
+    paths: Sequence[str] = (),
+) -> Batch:
+    """Record the runs made inside a `with` block as a single commit, see Batch.
+
+    The template can use `{count}` (number of runs) and `{experiments}` (their names).
+    """
+    return Batch(template=template, strategy=strategy, size=size, paths=paths)
+
+
+_batches: list[Batch] = []
+
+
+def flush() -> None:
+    """Wait for the commits of runs made with `@commit(background=True)` or `LOGIS_BACKGROUND=1`.
+
+    Raises:
+        LogisError: If any of them failed. They stay queued, and are retried by the next commit.
+    """
+    from logis.service.commit_queue import BackgroundCommits
+
+    if BackgroundCommits._instance is not None:
+        BackgroundCommits._instance.flush()
+
+
+def _active_batch() -> Optional[Batch]:
+    """The innermost `with batch()` block, or the process-wide batch enabled with `LOGIS_BATCH=<size>`."""
+    if _batches:
+        return _batches[-1]
+    return _env_batch(os.getenv("LOGIS_BATCH"))
+
+
+@cache
+def _env_batch(setting: Optional[str]) -> Optional[Batch]:
+    try:
+        size = int(setting or 0)
+    except ValueError:
+        raise LogisError(f"LOGIS_BATCH must be a number of runs per commit, got {setting!r}")
+    if size <= 1:
+        return None
+    env_batch = Batch(size=size)
+    # Look up the repository now: the batch's last runs are committed at exit, after threading has shut down,
+    # when importing the services fails (they register thread pools).
+    _git_service()
+    atexit.register(env_batch.flush, wait=True)  # Background commits were already flushed by then
+    return env_batch
+
+
+def _in_background(background: bool = False) -> bool:
+    """Whether to commit runs on a background thread, see `@commit(background=True)`."""
+    return background or os.getenv("LOGIS_BACKGROUND") == "1"
+
+
+def _store_artifacts(run: Run) -> dict[str, Any]:
+    """Save the run's arrays and logged series, returning the metadata fields that reference them."""
+    if not run.has_artifacts:
+        return {}
+    from logis.service.artifact import ArtifactService
+    from logis.util.session import session
+
+    artifact_service = session()[ArtifactService]
+    stored: dict[str, Any] = {}
+    if run.arrays:
+        stored["artifacts"] = artifact_service.store_all(run.arrays)
+    if run._series is not None:
+        stored["series"] = artifact_service.store_series(run._series)
+    return stored
+
+
+def _lookup(
+    func: Callable[..., Any],
+    arguments: dict[str, Any],
+    strategy: StageStrategy,
+    paths: Sequence[str],
+    ttl: Optional[timedelta],
+) -> tuple[str, Optional[ExperimentCommit]]:
+    """Fingerprint a run of a cached experiment, and find a recorded run with that fingerprint."""
+    from logis.service.cache import ResultCache
+    from logis.util.session import session
+
+    result_cache = session()[ResultCache]
+    fingerprint = result_cache.fingerprint(f"{func.__module__}.{func.__qualname__}", arguments, strategy, paths)
+    if os.getenv("LOGIS_NO_CACHE") == "1":
+        return fingerprint, None
+    return fingerprint, result_cache.lookup(fingerprint, ttl)
+
+
+def _with_fingerprint(experiment: ExperimentRun, fingerprint: str) -> ExperimentRun:
+    annotations = {**(experiment.annotations or {}), CACHE_ANNOTATION: fingerprint}
+    return experiment.model_copy(update={"annotations": annotations})
+
+
+@cache
+def _return_model(func: Callable[..., Any]) -> Optional[type[BaseModel]]:
+    """The pydantic model a function is annotated to return, if any."""
+    try:
+        returns = get_type_hints(func).get("return")
+    except Exception:  # Unresolvable forward references
+        return None
+    return returns if isinstance(returns, type) and issubclass(returns, BaseModel) else None
+
+
+def _announce_reuse(commit: ExperimentCommit) -> None:
+    from logis.util.session import session
+
+    session().console.print(
+        f"Reusing the results of run {commit.sha[:7]} from {commit.date:%Y-%m-%d %H:%M}, "
+        "the code and arguments haven't changed. Set LOGIS_NO_CACHE=1 to run it again."
+    )
+
+
+def _announce(message: str) -> bool:
+    """Print the commit message, returning whether to actually commit."""
+    from rich.padding import Padding
+
+    from logis.util.session import session
+
+    console = session().console
+    console.print("Generating commit with message:\n")
+    console.print(Padding(message, pad=(0, 0, 0, 4)))  # Indent by 4 spaces.
+    if os.getenv("LOGIS_DRY_RUN") == "1":
+        console.print("\nDry run enabled. Not committing changes.")
+        return False
+    return True
+
+
+def _git_service() -> "GitService":
+    # Deferred so that importing logis in an experiment script stays cheap.
+    from logis.service.git import GitService
+    from logis.util.session import session
+
+    return session()[GitService]
+
+
+def _async_git_service() -> "AsyncGitService":
+    """The session's AsyncGitService, shared so that concurrent runs queue up on the same commit lock."""
+    from logis.service.aio import AsyncGitService
+    from logis.util.session import session
+
+    return session()[AsyncGitService]
+
+
 if __name__ == "__main__":
     os.environ["LOGIS_DRY_RUN"] = "1"
 
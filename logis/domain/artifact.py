@@ -0,0 +1,21 @@
+from typing import Any
+
+from logis.util.model import Model
+
+
+class Artifact(Model):
+    """A reference to an array stored outside the run metadata, by the SHA-256 of its `.npy` file"""
+
+    sha256: str
+    dtype: str
+    shape: list[int]
+
+    @property
+    def path(self) -> str:
+        """Path of the `.npy` file inside the object directory, fanned out by the first two hex digits."""
+        return f"{self.sha256[:2]}/{self.sha256[2:]}.npy"
+
+    @staticmethod
+    def is_reference(value: Any) -> bool:
+        """Whether a metadata value is a serialized Artifact."""
+        return isinstance(value, dict) and isinstance(value.get("sha256"), str) and "shape" in value
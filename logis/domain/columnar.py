@@ -0,0 +1,143 @@
+from typing import Any, Optional, Sequence
+
+from logis.domain.query import FLIPPED_OPS, ORDERING_OPS, QueryPlan, field_path
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+
+def has_numpy() -> bool:
+    return np is not None
+
+
+class ColumnarLog:
+    """Column-oriented view of an experiment log for vectorized filtering.
+
+    Every scalar field of the run metadata is flattened to a dotted key (e.g. `metrics.accuracy`) and
+    stored as one array, alongside a mask of the records it is present in. Columns whose values are all
+    numbers are float64 arrays; anything else is kept as an object array. Requires numpy, install with
+    `logis[columnar]`.
+    """
+
+    def __init__(
+        self,
+        shas: "np.ndarray",
+        columns: dict[str, "np.ndarray"],
+        present: dict[str, "np.ndarray"],
+        containers: Optional[set[str]] = None,
+    ):
+        self.shas = shas
+        self.columns = columns
+        self.present = present
+        self.containers = containers or set()  # Keys holding nested objects, which aren't columns
+
+    def __len__(self) -> int:
+        return len(self.shas)
+
+    @classmethod
+    def from_runs(cls, shas: Sequence[str], runs: Sequence[dict]) -> "ColumnarLog":
+        """Build the columns from run metadata dicts, in the given order."""
+        if np is None:
+            raise ImportError("Columnar queries require numpy, install logis[columnar]")
+
+        values: dict[str, list[Any]] = {}
+        containers: set[str] = set()
+        for i, run in enumerate(runs):
+            for key, value in _flatten(run, containers):
+                if key not in values:
+                    values[key] = [None] * len(runs)
+                values[key][i] = value
+
+        columns, present = {}, {}
+        for key, column in values.items():
+            mask = np.fromiter((value is not None for value in column), dtype=bool, count=len(column))
+            if all(_is_number(value) for value in column if value is not None):
+                columns[key] = np.array([np.nan if value is None else value for value in column], dtype=np.float64)
+            else:
+                # Fill element-wise so list values don't turn into extra dimensions.
+                columns[key] = np.empty(len(column), dtype=object)
+                columns[key][:] = column
+            present[key] = mask
+
+        return cls(shas=np.array(shas, dtype=object), columns=columns, present=present, containers=containers)
+
+    def mask(self, plan: QueryPlan) -> Optional["np.ndarray"]:
+        """Evaluate a filter plan over every record at once.
+
+        Returns:
+            A boolean mask of matching records, or None if the condition can't be vectorized
+        """
+        if plan.condition is None or not plan.planned:
+            return None
+        return self._evaluate(plan.condition)
+
+    def _evaluate(self, node: dict) -> Optional["np.ndarray"]:
+        match node["type"]:
+            case "and_expression" | "or_expression":
+                left, right = (self._evaluate(child) for child in node["children"])
+                if left is None or right is None:
+                    return None
+                return left & right if node["type"] == "and_expression" else left | right
+            case "not_expression":
+                inner = self._evaluate(node["children"][0])
+                return None if inner is None else ~inner
+            case "comparator":
+                return self._compare(node)
+        return None
+
+    def _compare(self, node: dict) -> Optional["np.ndarray"]:
+        left, right = node["children"]
+        op = node["value"]
+        if left["type"] == "literal":
+            left, right, op = right, left, FLIPPED_OPS[op]
+        path = field_path(left)
+        if path is None or right["type"] != "literal":
+            return None
+        value = right["value"]
+
+        key = ".".join(path)
+        if key in self.containers:
+            return None
+        if key not in self.columns:
+            # The field is null everywhere, which only equals null and is never ordered.
+            if op in ("eq", "ne"):
+                return np.full(len(self), (value is None) != (op == "ne"), dtype=bool)
+            return np.zeros(len(self), dtype=bool)
+        column, present = self.columns[key], self.present[key]
+        numeric = column.dtype == np.float64
+
+        if op in ("eq", "ne"):
+            if numeric and _is_number(value):
+                equal = present & (column == value)
+            elif not numeric and isinstance(value, str):
+                equal = present & (column == value).astype(bool)
+            elif numeric or value is None:
+                # Numbers never equal non-numbers, and null only equals missing fields.
+                equal = ~present if value is None else np.zeros(len(self), dtype=bool)
+            else:
+                return None
+            return ~equal if op == "ne" else equal
+
+        if numeric and _is_number(value):
+            with np.errstate(invalid="ignore"):
+                return present & ORDERING_OPS[op](column, value)
+        if numeric:
+            return np.zeros(len(self), dtype=bool)
+        return None
+
+
+def _flatten(value: Any, containers: set[str], prefix: str = "") -> list[tuple[str, Any]]:
+    if isinstance(value, dict):
+        if prefix:
+            containers.add(prefix[:-1])
+        items = []
+        for key, child in value.items():
+            items.extend(_flatten(child, containers, f"{prefix}{key}."))
+        return items
+    return [(prefix[:-1], value)] if prefix else []
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
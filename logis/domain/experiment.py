@@ -1,5 +1,7 @@
+import base64
 import json
 import logging
+import zlib
 
 from datetime import datetime
 from enum import StrEnum
@@ -8,7 +10,7 @@ from uuid import uuid4
 
 from pydantic import UUID4, Field
 
-from logis.config import BODY_METADATA_SEPARATOR, SUMMARY_BODY_SEPARATOR
+from logis.config import BATCH_RUNS_FIELD, BODY_METADATA_SEPARATOR, ENCODED_METADATA_PREFIX, SUMMARY_BODY_SEPARATOR
 from logis.util.model import Model
 
 if TYPE_CHECKING:
@@ -16,6 +18,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+ZLIB_METADATA_HEADER = f"{ENCODED_METADATA_PREFIX}v1:zlib+b64"
+
 
 class ExperimentRun(Model):
     """The core data from an experiment run"""
@@ -25,8 +29,9 @@ class ExperimentRun(Model):
     metrics: dict
     uuid: UUID4 = Field(default_factory=uuid4)
     artifacts: Optional[dict] = None  # Any generated files/data
+    series: Optional[dict] = None  # Summaries of the metrics logged with Run.log, by name
     annotations: Optional[dict] = None
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=datetime.now)
 
     def as_commit_message(self, template: str) -> "SemanticMessage":
         """Convert this experiment run into a commit"""
@@ -46,6 +51,119 @@ class ExperimentRun(Model):
 
         return ExperimentRun.model_validate(message.metadata)
 
+    @staticmethod
+    def parse_metadata(message: str) -> Optional[dict[str, Any]]:
+        """Extract the raw run metadata from an experiment commit message, without building any models.
+
+        This is the fast path used when querying: a single JSON parse plus a structural check of the
+        required fields. Full validation happens when an ExperimentRun is built from the result.
+
+        Returns:
+            The metadata dict, or None if the message doesn't hold an experiment run. For a batch commit
+            (see ExperimentBatch) this is `{"runs": [...]}`, use `split_runs` to get the runs.
+        """
+        header, separator, body = message.partition(SUMMARY_BODY_SEPARATOR)
+        if not separator or CommitKind.from_header(header) is not CommitKind.EXP:
+            return None
+        try:
+            _, raw_metadata = body.split(BODY_METADATA_SEPARATOR)
+        except ValueError:
+            return None
+        return ExperimentRun.parse_note(raw_metadata)
+
+    @staticmethod
+    def parse_note(note: str) -> Optional[dict[str, Any]]:
+        """Extract the raw run metadata from a git note (see `LOGIS_STORAGE=notes`), like `parse_metadata`."""
+        try:
+            metadata = MetadataEncoding.load(note)
+        except ValueError:
+            return None
+
+        if isinstance(metadata, dict) and isinstance(runs := metadata.get(BATCH_RUNS_FIELD), list):
+            return metadata if runs and all(_is_run(run) for run in runs) else None
+        return metadata if _is_run(metadata) else None
+
+    @staticmethod
+    def detach_metadata(message: str) -> tuple[str, Optional[dict[str, Any]]]:
+        """Split an experiment commit message into the message without its metadata, and the metadata.
+
+        Messages that don't hold an experiment run are returned unchanged, with None.
+        """
+        metadata = ExperimentRun.parse_metadata(message)
+        if metadata is None:
+            return message, None
+        header, _, body = message.partition(SUMMARY_BODY_SEPARATOR)
+        body = body.split(BODY_METADATA_SEPARATOR)[0].strip()
+        return (f"{header}{SUMMARY_BODY_SEPARATOR}{body}" if body else header), metadata
+
+    @staticmethod
+    def attach_metadata(message: str, metadata: dict[str, Any], encoding: "MetadataEncoding") -> str:
+        """Append metadata to a commit message without any, the reverse of `detach_metadata`."""
+        separator = f"{SUMMARY_BODY_SEPARATOR}{BODY_METADATA_SEPARATOR}{SUMMARY_BODY_SEPARATOR}"
+        return f"{message}{separator}{encoding.dump(metadata)}"
+
+    @staticmethod
+    def split_runs(metadata: dict[str, Any]) -> list[dict[str, Any]]:
+        """The runs in a commit's metadata: one for a regular commit, or each run of a batch commit."""
+        return metadata[BATCH_RUNS_FIELD] if BATCH_RUNS_FIELD in metadata else [metadata]
+
+
+class ExperimentBatch(Model):
+    """Several experiment runs recorded in a single commit"""
+
+    runs: list[ExperimentRun]
+
+    def as_commit_message(self, template: str) -> "SemanticMessage":
+        """Convert the batch into one commit, whose metadata holds the list of runs"""
+        experiments = ", ".join(dict.fromkeys(run.experiment for run in self.runs))
+        return SemanticMessage(
+            kind=CommitKind.EXP,
+            summary=template.format(count=len(self.runs), experiments=experiments),
+            metadata={BATCH_RUNS_FIELD: [run.model_dump(mode="json") for run in self.runs]},
+        )
+
+
+def _is_run(metadata: Any) -> bool:
+    return (
+        isinstance(metadata, dict)
+        and isinstance(metadata.get("experiment"), str)
+        and isinstance(metadata.get("hyperparameters"), dict)
+        and isinstance(metadata.get("metrics"), dict)
+    )
+
+
+class MetadataEncoding(StrEnum):
+    """How run metadata is written, set with `LOGIS_ENCODING`. Every encoding is detected when reading."""
+
+    JSON = "json"  # Indented JSON, easy to read in `git log`
+    COMPACT = "compact"  # Minified JSON
+    ZLIB = "zlib"  # Minified JSON, compressed and base64-encoded, after a `logis:v1:zlib+b64` header line
+
+    def dump(self, metadata: dict[str, Any]) -> str:
+        match self:
+            case MetadataEncoding.JSON:
+                return json.dumps(metadata, indent=2)
+            case MetadataEncoding.COMPACT:
+                return json.dumps(metadata, separators=(",", ":"))
+            case MetadataEncoding.ZLIB:
+                compressed = zlib.compress(json.dumps(metadata, separators=(",", ":")).encode(), 9)
+                return f"{ZLIB_METADATA_HEADER}\n{base64.b64encode(compressed).decode()}"
+        raise ValueError(f"Unknown metadata encoding: {self}")
+
+    @staticmethod
+    def load(raw: str) -> Any:
+        """Decode metadata written with any encoding. Raises a ValueError if it's malformed."""
+        raw = raw.strip()
+        if not raw.startswith(ENCODED_METADATA_PREFIX):
+            return json.loads(raw)  # Indented and minified JSON alike
+        header, _, payload = raw.partition("\n")
+        if header != ZLIB_METADATA_HEADER:
+            raise ValueError(f"Unknown metadata encoding: {header!r}")
+        try:
+            return json.loads(zlib.decompress(base64.b64decode(payload, validate=True)))
+        except zlib.error as e:
+            raise ValueError(f"Corrupt compressed metadata: {e}") from None
+
 
 class CommitKind(StrEnum):
     """Types of semantic commits"""
@@ -79,12 +197,12 @@ class SemanticMessage(Model):
     body: Optional[str] = None
     metadata: Optional[dict[str, Any]] = None
 
-    def render(self) -> str:
+    def render(self, encoding: MetadataEncoding = MetadataEncoding.JSON) -> str:
         msg = f"{self.kind.value}: {self.summary}"
         if self.body:
             msg += f"\n\n{self.body}"
         if self.metadata:
-            msg += f"\n\n{BODY_METADATA_SEPARATOR}\n\n{json.dumps(self.metadata, indent=2)}"
+            msg += f"\n\n{BODY_METADATA_SEPARATOR}\n\n{encoding.dump(self.metadata)}"
         return msg
 
     @classmethod
@@ -105,7 +223,7 @@ class SemanticMessage(Model):
             body = parts[1]
             if kind.has_metadata:
                 body, raw_metadata = body.split(BODY_METADATA_SEPARATOR)
-                metadata = json.loads(raw_metadata)
+                metadata = MetadataEncoding.load(raw_metadata)
                 assert isinstance(metadata, dict)
             else:
                 metadata = None
@@ -1,12 +1,13 @@
 from datetime import datetime
-from enum import Enum, auto
-from typing import Optional
-
-import git
+from enum import Enum, StrEnum, auto
+from typing import TYPE_CHECKING, Any, Iterable, Optional
 
 from logis.domain.experiment import ExperimentRun, SemanticMessage
 from logis.util.model import Model
 
+if TYPE_CHECKING:
+    import git
+
 
 class Commit(Model):
     """Represents a git commit"""
@@ -14,9 +15,10 @@ class Commit(Model):
     sha: str
     message: str
     date: datetime
+    note: Optional[str] = None  # The logis git note on the commit, if any (see MetadataStorage.NOTES)
 
     @staticmethod
-    def from_git(commit: git.Commit) -> "Commit":
+    def from_git(commit: "git.Commit") -> "Commit":
         message = commit.message if isinstance(commit.message, str) else commit.message.decode()
         return Commit(
             sha=commit.hexsha,
@@ -47,7 +49,89 @@ class ExperimentCommit(Commit):
         return None
 
 
+class ExperimentRecord:
+    """Lightweight experiment commit holding the raw run metadata.
+
+    Used on the query hot path, where building and dumping pydantic models per commit dominates. The
+    typed ExperimentRun is only validated when `experiment_run` is accessed.
+    """
+
+    __slots__ = ("sha", "date", "message", "metadata", "_run")
+
+    def __init__(self, sha: str, date: datetime, message: str, metadata: dict[str, Any]):
+        self.sha = sha
+        self.date = date
+        self.message = message
+        self.metadata = metadata
+        self._run: Optional[ExperimentRun] = None
+
+    @classmethod
+    def from_commit(cls, commit: Commit) -> list["ExperimentRecord"]:
+        """One record per run in the commit: none if it isn't an experiment, several for a batch commit.
+
+        Metadata in the commit's note takes precedence over metadata in its message.
+        """
+        metadata = ExperimentRun.parse_note(commit.note) if commit.note else None
+        if metadata is None:
+            metadata = ExperimentRun.parse_metadata(commit.message)
+        if metadata is None:
+            return []
+        return [
+            cls(sha=commit.sha, date=commit.date, message=commit.message, metadata=run)
+            for run in ExperimentRun.split_runs(metadata)
+        ]
+
+    @property
+    def experiment_run(self) -> ExperimentRun:
+        """The validated run. Raises a ValidationError if the metadata is malformed."""
+        if self._run is None:
+            self._run = ExperimentRun.model_validate(self.metadata)
+        return self._run
+
+    def to_commit(self) -> ExperimentCommit:
+        return ExperimentCommit(sha=self.sha, message=self.message, date=self.date, experiment_run=self.experiment_run)
+
+
+class MetadataStorage(StrEnum):
+    """Where run metadata is written, set with `LOGIS_STORAGE`"""
+
+    MESSAGE = "message"  # In the commit message, below the summary
+    NOTES = "notes"  # In a git note on the commit, under NOTES_REF, leaving the message short
+
+
 class StageStrategy(Enum):
     """Strategy for staging files in git"""
 
-    ALL = auto()
+    ALL = auto()  # Everything in the working tree (`git add -A`)
+    TRACKED = auto()  # Changes to tracked files only, untracked files (data, checkpoints) are left alone
+    PATHS = auto()  # Files matching explicit glob patterns
+    IMPORTS = auto()  # Source files, inside the repository, of the modules the experiment imported
+    CHANGED = auto()  # Files whose mtime or size changed since the last logis commit
+
+
+class Staging(Model):
+    """What to stage for a commit: everything, changes to tracked files, and/or specific pathspecs."""
+
+    all: bool = False
+    tracked: bool = False
+    pathspecs: list[str] = []
+    # For StageStrategy.CHANGED: the (mtime_ns, size) of each selected file when it was selected, None if it
+    # was deleted. They go into the stat cache once the commit has landed, see StatCache.
+    stats: dict[str, Optional[tuple[int, int]]] = {}
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.all or self.tracked or self.pathspecs)
+
+    @staticmethod
+    def combine(stagings: Iterable["Staging"]) -> "Staging":
+        """Stage what any of the given stagings would, in one go."""
+        stagings = list(stagings)
+        stats = {path: stat for staging in stagings for path, stat in staging.stats.items()}
+        if any(staging.all for staging in stagings):
+            return Staging(all=True, stats=stats)
+        return Staging(
+            tracked=any(staging.tracked for staging in stagings),
+            pathspecs=list(dict.fromkeys(spec for staging in stagings for spec in staging.pathspecs)),
+            stats=stats,
+        )
@@ -0,0 +1,130 @@
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+from typing import Any, Optional, Sequence
+
+from logis.domain.git import ExperimentRecord
+from logis.domain.query import FLIPPED_OPS, QueryPlan, field_path, lookup
+
+EXPERIMENT_FIELD = ("experiment",)
+TIMESTAMP_FIELD = ("timestamp",)
+
+
+class SortedIndex:
+    """Record positions sorted by the value of one field, for range lookups with bisect."""
+
+    def __init__(self, keys: list[Any], positions: list[int]):
+        self.keys = keys
+        self.positions = positions
+
+    @classmethod
+    def build(cls, records: Sequence[ExperimentRecord], path: tuple[str, ...], kind: type) -> "SortedIndex":
+        """Index the records whose value at `path` is of the given kind (numbers or strings)."""
+        entries = []
+        for position, record in enumerate(records):
+            value = lookup(record.metadata, path)
+            if _is_kind(value, kind):
+                entries.append((value, position))
+        entries.sort()
+        return cls(keys=[key for key, _ in entries], positions=[position for _, position in entries])
+
+    def range(self, op: str, value: Any) -> list[int]:
+        """Positions of records whose key compares true against `value`."""
+        match op:
+            case "eq":
+                lo, hi = bisect_left(self.keys, value), bisect_right(self.keys, value)
+            case "gt":
+                lo, hi = bisect_right(self.keys, value), len(self.keys)
+            case "gte":
+                lo, hi = bisect_left(self.keys, value), len(self.keys)
+            case "lt":
+                lo, hi = 0, bisect_left(self.keys, value)
+            case "lte":
+                lo, hi = 0, bisect_right(self.keys, value)
+            case _:
+                raise ValueError(f"Unsupported operator for a range lookup: {op}")
+        return self.positions[lo:hi]
+
+
+class SecondaryIndexes:
+    """In-memory secondary indexes over an experiment log.
+
+    Positions refer to the order of the records the indexes were built from (newest first). Each index
+    is built the first time a query can use it:
+
+    * a hash index from experiment name to positions,
+    * a sorted index on `timestamp`,
+    * sorted indexes on numeric fields such as `metrics.accuracy`.
+    """
+
+    def __init__(self, records: Sequence[ExperimentRecord]):
+        self.records = records
+        self._numeric: dict[tuple[str, ...], SortedIndex] = {}
+
+    @cached_property
+    def by_experiment(self) -> dict[str, list[int]]:
+        index: dict[str, list[int]] = {}
+        for position, record in enumerate(self.records):
+            index.setdefault(record.metadata.get("experiment"), []).append(position)
+        return index
+
+    @cached_property
+    def by_timestamp(self) -> SortedIndex:
+        return SortedIndex.build(self.records, TIMESTAMP_FIELD, str)
+
+    def numeric(self, path: tuple[str, ...]) -> SortedIndex:
+        """Get the sorted index on a numeric field, building it on first use."""
+        if path not in self._numeric:
+            self._numeric[path] = SortedIndex.build(self.records, path, float)
+        return self._numeric[path]
+
+    def candidates(self, plan: QueryPlan) -> Optional[list[int]]:
+        """Positions of the records a filter can match, narrowed with the indexes.
+
+        The candidates are a superset of the matches: callers still evaluate the full predicate on them.
+
+        Returns:
+            Sorted positions, or None if no index applies and every record has to be scanned
+        """
+        if not plan.planned or plan.condition is None:
+            return None
+        candidates = self._lookup(plan.condition)
+        return None if candidates is None else sorted(candidates)
+
+    def top(self, path: tuple[str, ...], descending: bool = True) -> list[int]:
+        """Positions of the records with a numeric value at `path`, ordered by that value."""
+        positions = self.numeric(path).positions
+        return positions[::-1] if descending else positions
+
+    def _lookup(self, node: dict) -> Optional[set[int]]:
+        if node["type"] == "and_expression":
+            left, right = (self._lookup(child) for child in node["children"])
+            if left is None or right is None:
+                return left if right is None else right
+            return left & right
+        if node["type"] == "comparator":
+            return self._compare(node)
+        return None
+
+    def _compare(self, node: dict) -> Optional[set[int]]:
+        left, right = node["children"]
+        op = node["value"]
+        if left["type"] == "literal":
+            left, right, op = right, left, FLIPPED_OPS[op]
+        path = field_path(left)
+        if path is None or right["type"] != "literal" or op == "ne":
+            return None
+        value = right["value"]
+
+        if path == EXPERIMENT_FIELD and op == "eq" and isinstance(value, str):
+            return set(self.by_experiment.get(value, []))
+        if path == TIMESTAMP_FIELD and isinstance(value, str):
+            return set(self.by_timestamp.range(op, value))
+        if _is_kind(value, float):
+            return set(self.numeric(path).range(op, value))
+        return None
+
+
+def _is_kind(value: Any, kind: type) -> bool:
+    if kind is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value  # Skip NaN
+    return isinstance(value, kind)
@@ -1,10 +1,17 @@
-from typing import Sequence
+import math
+import operator
+import re
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence
 
 import jmespath
 
 from jmespath.parser import ParsedResult
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
+from logis.config import QUERY_PLAN_CACHE_SIZE
 from logis.domain.git import ExperimentCommit
 
 # SimpleQueryOp = Literal[">", "<", ">=", "<=", "=="]
@@ -22,6 +29,24 @@ class Query(BaseModel):
         """Compile the JMESPath expression."""
         return jmespath.compile(self.expression)
 
+    def plan(self) -> "QueryPlan":
+        """Get the (cached) execution plan for this query."""
+        return compile_plan(self.expression)
+
+    def __and__(self, other: "Query") -> "Query":
+        """Combine two filter queries into one that matches records satisfying both."""
+        conditions = []
+        for query in (self, other):
+            if not query.plan().is_row_filter or not query.expression.strip().startswith("[?"):
+                raise ValueError(f"Only filter queries can be combined: {query.expression}")
+            conditions.append(query.expression.strip()[2:-1])
+        return Query(expression=f"[?({conditions[0]}) && ({conditions[1]})]")
+
+    @staticmethod
+    def everything() -> "Query":
+        """Create a query that matches every experiment."""
+        return Query(expression="[?`true`]")
+
     @staticmethod
     def from_expression(expr: str) -> "Query":
         """Create a query from a JMESPath expression."""
@@ -66,3 +91,259 @@ class QueryResult(BaseModel):
     @property
     def is_empty(self) -> bool:
         return len(self.commits) == 0
+
+
+class OrderBy(BaseModel):
+    """Order query results by a numeric field. Runs without a numeric value are left out."""
+
+    field: str
+    descending: bool = True
+
+    @property
+    def path(self) -> tuple[str, ...]:
+        return tuple(self.field.split("."))
+
+
+class Aggregate(BaseModel):
+    """An aggregate over a numeric field: count, sum, mean, min, max or a percentile like p90."""
+
+    function: str
+    field: Optional[str] = None
+
+    @field_validator("function")
+    @classmethod
+    def _validate_function(cls, function: str) -> str:
+        if function in AGGREGATE_FUNCTIONS:
+            return function
+        if (match := re.fullmatch(r"p(\d{1,3})", function)) and int(match.group(1)) <= 100:
+            return function
+        raise ValueError(f"Invalid aggregate function: {function}")
+
+    @property
+    def label(self) -> str:
+        return f"{self.function}({self.field})" if self.field else self.function
+
+    @property
+    def path(self) -> Optional[tuple[str, ...]]:
+        return tuple(self.field.split(".")) if self.field else None
+
+    @staticmethod
+    def parse(spec: str) -> "Aggregate":
+        """Parse an aggregate from `function:field`, e.g. `mean:metrics.loss`, or just `count`."""
+        function, _, field = spec.partition(":")
+        if function != "count" and not field:
+            raise ValueError(f"Aggregate '{function}' needs a field, e.g. {function}:metrics.loss")
+        return Aggregate(function=function, field=field or None)
+
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "mean", "min", "max")
+
+
+class AggregateGroup(BaseModel):
+    """Aggregated values for one group of runs, keyed by aggregate label."""
+
+    key: Any
+    count: int
+    values: dict[str, Optional[float]]
+
+
+class AggregateResult(BaseModel):
+    """Result of aggregating the runs matching a query."""
+
+    groups: Sequence[AggregateGroup]
+    group_by: Optional[str]
+    query: Query
+    num_searched: int
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.groups) == 0
+
+
+@dataclass
+class AggregateState:
+    """Running state of one aggregate over a stream of values.
+
+    Count, sum, min and max are updated in place; the values themselves are only kept when a
+    percentile is requested.
+    """
+
+    aggregate: Aggregate
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    values: list[float] = field(default_factory=list)
+
+    def add(self, row: "Row") -> None:
+        if self.aggregate.path is None:
+            self.count += 1
+            return
+        value = lookup(row, self.aggregate.path)
+        if not _is_number(value):
+            return
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.aggregate.function.startswith("p"):
+            self.values.append(value)
+
+    def result(self) -> Optional[float]:
+        match self.aggregate.function:
+            case "count":
+                return self.count
+            case "sum":
+                return self.total
+            case "mean":
+                return self.total / self.count if self.count else None
+            case "min":
+                return self.min
+            case "max":
+                return self.max
+        return _percentile(sorted(self.values), int(self.aggregate.function[1:]))
+
+
+Row = dict[str, Any]
+Predicate = Callable[[Row], bool]
+
+ORDERING_OPS = {"lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge}
+FLIPPED_OPS = {"lt": "gt", "lte": "gte", "gt": "lt", "gte": "lte", "eq": "eq", "ne": "ne"}
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """An executable plan for a query expression, evaluated against experiment run dicts.
+
+    Filter expressions (`[?...]`) get a per-record `predicate`. Where the condition is made of field
+    comparisons against literals, combined with `&&`, `||` and `!`, the predicate reads the fields
+    straight from the record (`planned`). Other filter conditions are evaluated with JMESPath one record
+    at a time. Anything else (pipes, functions, slices, ...) falls back to JMESPath over all records.
+    """
+
+    expression: str
+    compiled: ParsedResult
+    predicate: Optional[Predicate] = None
+    planned: bool = False
+    condition: Optional[dict] = None  # The filter's condition node, if this is a row filter
+
+    @property
+    def is_row_filter(self) -> bool:
+        return self.predicate is not None
+
+    def matches(self, row: Row) -> bool:
+        assert self.predicate is not None, "Only row filters can be evaluated per record"
+        return self.predicate(row)
+
+    def search(self, rows: list[Row]) -> list[Row]:
+        """Evaluate the full expression over all records, returning the records it selects."""
+        result = self.compiled.search(rows)
+        return [row for row in result if isinstance(row, dict)] if isinstance(result, list) else []
+
+
+@lru_cache(maxsize=QUERY_PLAN_CACHE_SIZE)
+def compile_plan(expression: str) -> QueryPlan:
+    """Parse an expression once and build its plan. Plans are cached by expression."""
+    compiled = jmespath.compile(expression)
+    parsed = compiled.parsed
+    is_filter = parsed["type"] == "filter_projection" and all(
+        child["type"] == "identity" for child in parsed["children"][:2]
+    )
+    if not is_filter:
+        return QueryPlan(expression=expression, compiled=compiled)
+
+    condition = parsed["children"][2]
+    if (predicate := _plan_condition(condition)) is not None:
+        return QueryPlan(expression, compiled, predicate=predicate, planned=True, condition=condition)
+
+    fallback = ParsedResult(expression, condition)
+    return QueryPlan(expression, compiled, predicate=lambda row: _is_true(fallback.search(row)), condition=condition)
+
+
+def _plan_condition(node: dict) -> Optional[Predicate]:
+    """Build a Python predicate for a JMESPath condition node, or None if it can't be planned."""
+    match node["type"]:
+        case "and_expression" | "or_expression":
+            left, right = (_plan_condition(child) for child in node["children"])
+            if left is None or right is None:
+                return None
+            if node["type"] == "and_expression":
+                return lambda row: left(row) and right(row)
+            return lambda row: left(row) or right(row)
+        case "not_expression":
+            inner = _plan_condition(node["children"][0])
+            return None if inner is None else lambda row: not inner(row)
+        case "literal":
+            truth = _is_true(node["value"])
+            return lambda row: truth
+        case "field" | "subexpression":
+            path = field_path(node)
+            return None if path is None else lambda row: _is_true(lookup(row, path))
+        case "comparator":
+            return _plan_comparison(node)
+    return None
+
+
+def _plan_comparison(node: dict) -> Optional[Predicate]:
+    left, right = node["children"]
+    op = node["value"]
+    if left["type"] == "literal":
+        left, right, op = right, left, FLIPPED_OPS[op]
+    path = field_path(left)
+    if path is None or right["type"] != "literal":
+        return None
+    value = right["value"]
+
+    # Mirror JMESPath semantics: equality never matches bools against 0/1, ordering needs two numbers
+    # or two strings and is otherwise false.
+    if op in ("eq", "ne"):
+        negate = op == "ne"
+        return lambda row: _equals(lookup(row, path), value) != negate
+
+    compare = ORDERING_OPS[op]
+    if _is_number(value):
+        return lambda row: _is_number(field := lookup(row, path)) and compare(field, value)
+    if isinstance(value, str):
+        return lambda row: isinstance(field := lookup(row, path), str) and compare(field, value)
+    return lambda row: False
+
+
+def field_path(node: dict) -> Optional[tuple[str, ...]]:
+    if node["type"] == "field":
+        return (node["value"],)
+    if node["type"] == "subexpression" and all(child["type"] == "field" for child in node["children"]):
+        return tuple(child["value"] for child in node["children"])
+    return None
+
+
+def lookup(row: Any, path: tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(row, dict):
+            return None
+        row = row.get(key)
+    return row
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _equals(a: Any, b: Any) -> bool:
+    if (_is_number(a) and a in (0, 1) and isinstance(b, bool)) or (
+        _is_number(b) and b in (0, 1) and isinstance(a, bool)
+    ):
+        return False
+    return a == b
+
+
+def _is_true(value: Any) -> bool:
+    return not (value == "" or value == [] or value == {} or value is None or value is False)
+
+
+def _percentile(values: list[float], percentile: int) -> Optional[float]:
+    """Linearly interpolated percentile of sorted values."""
+    if not values:
+        return None
+    rank = (len(values) - 1) * percentile / 100
+    lo, hi = math.floor(rank), math.ceil(rank)
+    return values[lo] + (values[hi] - values[lo]) * (rank - lo)
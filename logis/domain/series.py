@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass
+class SeriesSummary:
+    """Running summary of a metric logged over the steps of a run, updated as each point is appended.
+
+    It is recorded in the run's metadata, so queries can filter and sort on e.g. `series.loss.min`
+    without reading the series itself.
+    """
+
+    count: int = 0
+    last: Optional[float] = None
+    last_step: Optional[float] = None
+    min: Optional[float] = None
+    min_step: Optional[float] = None
+    max: Optional[float] = None
+    max_step: Optional[float] = None
+
+    def add(self, step: float, value: float) -> None:
+        self.count += 1
+        self.last, self.last_step = value, step
+        if self.min is None or value < self.min:
+            self.min, self.min_step = value, step
+        if self.max is None or value > self.max:
+            self.max, self.max_step = value, step
+
+    def to_metadata(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "last": self.last,
+            "last_step": self.last_step,
+            "min": self.min,
+            "min_step": self.min_step,
+            "max": self.max,
+            "max_step": self.max_step,
+        }
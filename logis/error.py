@@ -1,2 +1,6 @@
 class LogisError(Exception):
     """Something went wrong."""
+
+
+class CommitConflictError(LogisError):
+    """A deferred commit changes files that were changed differently since its snapshot was taken."""
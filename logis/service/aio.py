@@ -0,0 +1,78 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, Sequence, TypeVar
+
+from logis.domain.experiment import CommitKind
+from logis.domain.git import Commit, StageStrategy, Staging
+from logis.domain.query import Aggregate, AggregateResult, OrderBy, Query, QueryResult, SimpleQueryOp, SimpleQueryValue
+from logis.service.git import GitService
+from logis.service.query import QueryService
+
+T = TypeVar("T")
+
+
+class AsyncGitService:
+    """Async façade over GitService for asyncio programs.
+
+    Git I/O runs on a dedicated thread instead of the event loop, so many concurrent runs can be recorded
+    from one process. Calls run one at a time: they share a git.Repo, whose persistent git processes
+    can't be used from several threads at once.
+    """
+
+    def __init__(self, git_service: GitService):
+        self.git_service = git_service
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="logis-git")
+
+    async def head_sha(self) -> Optional[str]:
+        return await self.run(self.git_service.head_sha)
+
+    async def get_all_commits(self, kind: Optional[CommitKind] = None, rev: Optional[str] = None) -> list[Commit]:
+        return await self.run(self.git_service.get_all_commits, kind, rev)
+
+    async def should_commit(self, strategy: StageStrategy, patterns: Sequence[str] = ()) -> bool:
+        return await self.run(self.git_service.should_commit, strategy, patterns)
+
+    async def staging(self, strategy: StageStrategy, patterns: Sequence[str] = ()) -> Staging:
+        return await self.run(self.git_service.staging, strategy, patterns)
+
+    async def stage_and_commit(self, message: str, staging: Optional[Staging] = None, wait: bool = True) -> None:
+        await self.run(partial(self.git_service.stage_and_commit, wait=wait), message, staging)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Call fn on the git thread, for any other work that uses the repository, e.g. a ResultCache lookup."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+
+class AsyncQueryService:
+    """Async façade over QueryService for asyncio programs.
+
+    Queries share the experiment index, which isn't thread-safe, so they run one at a time on a dedicated
+    thread, off the event loop.
+    """
+
+    def __init__(self, query_service: QueryService):
+        self.query_service = query_service
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="logis-query")
+
+    async def execute(
+        self, query: Query, limit: Optional[int] = None, order_by: Optional[OrderBy] = None
+    ) -> QueryResult:
+        return await self._run(self.query_service.execute, query, limit, order_by)
+
+    async def execute_simple(
+        self, metric: str, op: SimpleQueryOp, value: SimpleQueryValue, limit: Optional[int] = None
+    ) -> QueryResult:
+        return await self._run(self.query_service.execute_simple, metric, op, value, limit)
+
+    async def top_k(self, field: str, k: int, descending: bool = True, query: Optional[Query] = None) -> QueryResult:
+        return await self._run(self.query_service.top_k, field, k, descending, query)
+
+    async def aggregate(
+        self, query: Query, aggregates: Sequence[Aggregate], group_by: Optional[str] = None
+    ) -> AggregateResult:
+        return await self._run(self.query_service.aggregate, query, aggregates, group_by)
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
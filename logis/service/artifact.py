@@ -0,0 +1,120 @@
+import hashlib
+import os
+
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, Mapping
+
+from logis.config import ARTIFACT_DIR, LOGIS_DIR
+from logis.domain.artifact import Artifact
+from logis.domain.experiment import ExperimentRun
+from logis.error import LogisError
+from logis.service.git import GitService
+from logis.service.series import SeriesWriter
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class ArtifactService:
+    """Content-addressed store for arrays logged with runs, under `.git/logis/objects`.
+
+    Each array is saved once as a `.npy` file named by the SHA-256 of its contents, and the run's metadata
+    only holds a reference to it (see Artifact). Queries never read the arrays. They are memory-mapped when
+    a caller asks for one, so only the parts that are touched are read from disk. Requires numpy, install
+    with `logis[columnar]`.
+    """
+
+    def __init__(self, git_service: GitService):
+        self.git_service = git_service
+
+    @property
+    def directory(self) -> Path:
+        return self.git_service.git_dir / LOGIS_DIR / ARTIFACT_DIR
+
+    def store(self, array: Any) -> Artifact:
+        """Save an array, unless the same contents are stored already, returning the reference to it."""
+        np = _numpy()
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise LogisError(f"Can't store arrays of Python objects ({array.dtype}), only numeric ones")
+
+        buffer = BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        data = buffer.getbuffer()
+        artifact = Artifact(sha256=hashlib.sha256(data).hexdigest(), dtype=str(array.dtype), shape=list(array.shape))
+        path = self.directory / artifact.path
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Never let readers map a half-written file
+        return artifact
+
+    def store_all(self, arrays: Mapping[str, Any]) -> dict[str, Any]:
+        """Save arrays by name, returning the metadata to record in `ExperimentRun.artifacts`."""
+        return {name: self.store(array).model_dump() for name, array in arrays.items()}
+
+    def store_series(self, writer: SeriesWriter) -> dict[str, Any]:
+        """Save the series a run logged, returning the metadata to record in `ExperimentRun.series`.
+
+        Each metric is stored as an (n, 2) array of (step, value) rows, next to its summary.
+        """
+        np = _numpy()
+        try:
+            files = writer.finish()
+            return {
+                name: {
+                    **summary.to_metadata(),
+                    "artifact": self.store(np.fromfile(files[name], dtype=np.float64).reshape(-1, 2)).model_dump(),
+                }
+                for name, summary in writer.summaries.items()
+            }
+        finally:
+            writer.close()
+
+    def load(self, artifact: Artifact, mmap: bool = True) -> "np.ndarray":
+        """Read a stored array, memory-mapped read-only by default."""
+        np = _numpy()
+        path = self.directory / artifact.path
+        if not path.exists():
+            raise LogisError(f"Artifact {artifact.sha256} is not in {self.directory}")
+        return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+    def arrays(self, run: ExperimentRun) -> "RunArrays":
+        """The arrays logged with a run, by name. Each one is only mapped when it's first accessed."""
+        return RunArrays(self, run.artifacts or {})
+
+    def series(self, run: ExperimentRun) -> "RunArrays":
+        """The series a run logged, by metric, as (step, value) rows. Each is only mapped when first accessed."""
+        return RunArrays(self, {name: series["artifact"] for name, series in (run.series or {}).items()})
+
+
+class RunArrays(Mapping[str, "np.ndarray"]):
+    """Lazily loaded arrays of a run, see ArtifactService.arrays"""
+
+    def __init__(self, service: ArtifactService, artifacts: dict[str, Any]):
+        self._service = service
+        self._artifacts = {name: value for name, value in artifacts.items() if Artifact.is_reference(value)}
+        self._loaded: dict[str, "np.ndarray"] = {}
+
+    def __getitem__(self, name: str) -> "np.ndarray":
+        if name not in self._loaded:
+            self._loaded[name] = self._service.load(Artifact.model_validate(self._artifacts[name]))
+        return self._loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._artifacts)
+
+    def __len__(self) -> int:
+        return len(self._artifacts)
+
+
+def _numpy() -> Any:
+    # Imported on demand, numpy is slow to import and an optional dependency.
+    try:
+        import numpy as np
+    except ImportError:
+        raise LogisError("Storing arrays requires numpy, install with `logis[columnar]`") from None
+    return np
@@ -0,0 +1,66 @@
+import hashlib
+import json
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Sequence
+
+from pydantic import BaseModel
+
+from logis.config import CACHE_ANNOTATION
+from logis.domain.git import ExperimentCommit, StageStrategy
+from logis.domain.query import Query
+from logis.service.git import GitService
+from logis.service.query import QueryService
+
+
+class ResultCache:
+    """Finds runs already recorded for the same code and arguments, for `@commit(cache=True)`.
+
+    A run's fingerprint hashes the tree its commit would record (the working tree as the staging strategy
+    stages it), the experiment's qualified name and its arguments. It's stored in the run's `fingerprint`
+    annotation, so the experiment log itself is the cache: nothing is kept anywhere else.
+    """
+
+    def __init__(self, git_service: GitService, query_service: QueryService):
+        self.git_service = git_service
+        self.query_service = query_service
+
+    def fingerprint(
+        self, experiment: str, arguments: dict[str, Any], strategy: StageStrategy, paths: Sequence[str] = ()
+    ) -> str:
+        """Fingerprint a run of an experiment before it starts.
+
+        This has no side effects on what the run's commit stages. The tree is written from a copy of the
+        index, and working out the staging doesn't update the stat cache used by StageStrategy.CHANGED.
+
+        Args:
+            experiment: Qualified name of the experiment function
+            arguments: The arguments it's called with, by parameter name
+            strategy: The staging strategy its commit uses
+            paths: Glob patterns for StageStrategy.PATHS
+        """
+        tree = self.git_service.tree_sha(self.git_service.staging(strategy, paths))
+        key = json.dumps(
+            {"experiment": experiment, "tree": tree, "arguments": arguments}, sort_keys=True, default=_jsonable
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def lookup(self, fingerprint: str, ttl: Optional[timedelta] = None) -> Optional[ExperimentCommit]:
+        """The latest run recorded with a fingerprint, or None.
+
+        Args:
+            fingerprint: See `fingerprint()`
+            ttl: Ignore runs committed longer ago than this
+        """
+        query = Query.where(f"annotations.{CACHE_ANNOTATION}", "==", json.dumps(fingerprint))
+        commits = self.query_service.execute(query).commits
+        if ttl is not None:
+            cutoff = datetime.now(timezone.utc) - ttl
+            commits = [commit for commit in commits if commit.date >= cutoff]
+        return max(commits, key=lambda commit: commit.date, default=None)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return repr(value)
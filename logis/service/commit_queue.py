@@ -0,0 +1,278 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from uuid import uuid4
+
+import git
+
+from logis.config import (
+    COMMIT_CLAIMED_DIR,
+    COMMIT_FAILED_DIR,
+    COMMIT_LOCK_FILE,
+    COMMIT_QUEUE_DIR,
+    LOCK_TIMEOUT,
+    LOGIS_DIR,
+)
+from logis.domain.git import Staging
+from logis.error import CommitConflictError, LogisError
+from logis.service.lock import FileLock, backoff, retry_on_lock
+
+if TYPE_CHECKING:
+    from logis.service.git import GitService
+
+logger = logging.getLogger(__name__)
+
+
+class CommitQueue:
+    """Serializes commits from parallel runs in one checkout.
+
+    Each commit message is first written to a queue under `.git/logis/queue`, along with what to stage and
+    the run's note, if its metadata is kept in git notes.
+    Whichever process gets the commit lock stages once for all of them and commits every queued message in
+    order, so a burst of runs finishing together is committed in one go instead of each run waiting for
+    the lock in turn. The others only wait until their message has left the queue.
+    """
+
+    def __init__(self, git_service: "GitService"):
+        self.git_service = git_service
+        self.directory = git_service.git_dir / LOGIS_DIR / COMMIT_QUEUE_DIR
+        self.claimed = git_service.git_dir / LOGIS_DIR / COMMIT_CLAIMED_DIR
+        self.failed = git_service.git_dir / LOGIS_DIR / COMMIT_FAILED_DIR
+        self.lock = FileLock(git_service.git_dir / LOGIS_DIR / COMMIT_LOCK_FILE)
+
+    def submit(self, message: str, staging: Staging, note: Optional[str] = None, timeout: float = LOCK_TIMEOUT) -> None:
+        """Queue a commit and wait until it has been made, by this process or another one."""
+        self.wait(self._enqueue(message, staging, note), timeout)
+
+    def defer(self, message: str, staging: Staging, tree: str, base: Optional[str], note: Optional[str] = None) -> None:
+        """Queue the commit of a snapshotted tree, and return without waiting for it, see BackgroundCommits.
+
+        Args:
+            message: The commit message
+            staging: What the snapshot staged, recorded once it's committed (see GitService.record_staged)
+            tree: SHA of the tree to commit, see GitService.tree_sha
+            base: SHA of what the tree was snapshotted on top of: the commit HEAD was at (None if HEAD was
+                unborn), or the tree of an earlier snapshot still waiting for its commit (see `last_snapshot()`)
+            note: The run's note, if its metadata is kept in git notes
+        """
+        entry = self._enqueue(message, staging, note, snapshot={"tree": tree, "base": base})
+        BackgroundCommits.get().add(self.git_service.git_dir, entry)
+
+    def wait(self, entry: Path, timeout: float = LOCK_TIMEOUT, keep: bool = False) -> None:
+        """Wait until a queued commit has been made, draining the queue if the commit lock is free.
+
+        On timeout, the entry is taken off the queue, unless `keep` is set, so a later drain still commits it.
+        An entry a drain has claimed already can't be taken off the queue anymore, it's committed regardless.
+        """
+        try:
+            for _ in backoff(timeout):
+                if not self._pending(entry):
+                    break
+                if self.lock.try_acquire():
+                    try:
+                        self.drain()
+                    finally:
+                        self.lock.release()
+                    break
+        except LogisError:
+            timed_out = LogisError(f"Timed out waiting to commit, is another process holding {self.lock.path}?")
+            if not keep:
+                try:
+                    entry.unlink()
+                except FileNotFoundError:
+                    pass  # Claimed by a drain in the meantime
+                else:
+                    raise timed_out from None
+            if self._pending(entry):
+                raise timed_out from None
+        self._raise_if_failed(entry)
+
+    def last_snapshot(self) -> Optional[str]:
+        """SHA of the tree of the latest queued snapshot that isn't committed yet, or None."""
+        # Claimed entries were queued before the ones still in the queue.
+        queued = sorted(self.directory.glob("*.msg"), reverse=True) + sorted(self.claimed.glob("*.msg"), reverse=True)
+        for entry in queued:
+            try:
+                commit = json.loads(entry.read_text())
+            except FileNotFoundError:
+                try:
+                    commit = json.loads((self.claimed / entry.name).read_text())  # Claimed in the meantime
+                except FileNotFoundError:
+                    continue  # Committed already
+            if commit.get("snapshot") and commit.get("sha") is None:
+                return commit["snapshot"]["tree"]
+        return None
+
+    def drain(self) -> None:
+        """Snapshot what every queued commit asks to stage, then commit them, oldest first. Requires the commit lock.
+
+        The snapshot is written from a temporary index (see GitService.tree_sha), so the user's staging area
+        is left alone apart from the paths the commits change. The notes of all the commits are added
+        afterwards, in one notes commit.
+
+        Entries are first claimed, moved out of the queue to `.git/logis/committing`, so a submitter that
+        times out can't take them back while they're committed. Each one records the SHA of its commit once
+        it's made, and is removed once its note is written too. A drain that fails partway leaves the rest
+        claimed, and the next one picks up where it stopped instead of committing anything twice.
+        """
+        self.claimed.mkdir(parents=True, exist_ok=True)
+        for entry in sorted(self.directory.glob("*.msg")):
+            try:
+                os.replace(entry, self.claimed / entry.name)
+            except FileNotFoundError:
+                pass  # Taken off the queue by a submitter that timed out
+        entries = sorted(self.claimed.glob("*.msg"))
+        if not entries:
+            return
+        queued = [json.loads(entry.read_text()) for entry in entries]
+        stagings = [Staging.model_validate(commit["staging"]) for commit in queued]
+        # Snapshots were staged already, and so were the commits made by an earlier drain.
+        staging = Staging.combine(
+            pending
+            for pending, commit in zip(stagings, queued)
+            if not commit.get("snapshot") and commit.get("sha") is None
+        )
+        staged: Optional[tuple[Optional[str], str]] = None  # HEAD and the tree `staging` gives on top of it
+        notes, noted = {}, []
+        for entry, commit, entry_staging in zip(entries, queued, stagings):
+            if commit.get("sha") is not None:
+                sha = commit["sha"]  # Committed by an earlier drain, which failed before writing the note
+            else:
+                if snapshot := commit.get("snapshot"):
+                    try:
+                        sha = retry_on_lock(
+                            self.git_service.commit_tree, snapshot["tree"], snapshot["base"], commit["message"]
+                        )
+                    except CommitConflictError as e:
+                        # Retrying can't help, set it aside for its submitter to report.
+                        logger.error("Not committing %s: %s", entry.name, e)
+                        self.failed.mkdir(parents=True, exist_ok=True)
+                        _write_atomically(self.failed / entry.name, {**commit, "error": str(e)})
+                        entry.unlink(missing_ok=True)
+                        continue
+                    staged = None  # Its commit updates the index, snapshot again for the next ones
+                else:
+                    if staged is None:
+                        staged = (self.git_service.head_sha(), self.git_service.tree_sha(staging))
+                    base, tree = staged
+                    sha = retry_on_lock(self.git_service.commit_tree, tree, base, commit["message"])
+                    staged = (sha, tree)
+                if commit.get("note") is not None:
+                    _write_atomically(entry, {**commit, "sha": sha})
+                self.git_service.record_staged(entry_staging)
+            if commit.get("note") is None:
+                entry.unlink(missing_ok=True)
+            else:
+                # Keep the entry, and its submitter waiting, until the note is written too.
+                notes[sha] = commit["note"]
+                noted.append(entry)
+        if notes:
+            retry_on_lock(self.git_service.add_notes, notes)
+            for entry in noted:
+                entry.unlink(missing_ok=True)
+        logger.debug("Committed %d queued run(s)", len(entries))
+
+    def _pending(self, entry: Path) -> bool:
+        """Whether a queued entry is still waiting for its commit, or its note."""
+        return entry.exists() or (self.claimed / entry.name).exists()
+
+    def _raise_if_failed(self, entry: Path) -> None:
+        failed = self.failed / entry.name
+        try:
+            commit = json.loads(failed.read_text())
+        except FileNotFoundError:
+            return
+        failed.unlink(missing_ok=True)
+        raise CommitConflictError(commit["error"])
+
+    def _enqueue(
+        self, message: str, staging: Staging, note: Optional[str] = None, snapshot: Optional[dict] = None
+    ) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid4().hex}"
+        entry = self.directory / f"{name}.msg"
+        _write_atomically(
+            entry, {"message": message, "staging": staging.model_dump(), "note": note, "snapshot": snapshot}
+        )
+        return entry
+
+
+class BackgroundCommits:
+    """The thread that makes this process's deferred commits (see CommitQueue.defer), one at a time.
+
+    It opens its own handle on each repository, since GitPython's persistent git processes can't be shared
+    with the threads running experiments. `flush()` waits until the commits are all made, and is called
+    when the process exits.
+    """
+
+    _instance: Optional["BackgroundCommits"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._queue: queue.Queue[tuple[Path, Path]] = queue.Queue()
+        self._errors: list[Exception] = []
+        self._thread = threading.Thread(target=self._run, name="logis-commits", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "BackgroundCommits":
+        """The process's background committer, started on first use."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = BackgroundCommits()
+                atexit.register(cls._instance.flush)
+            return cls._instance
+
+    def add(self, git_dir: Path, entry: Path) -> None:
+        """Make the commit queued as `entry`, in the repository at `git_dir`."""
+        self._queue.put((git_dir, entry))
+
+    def flush(self) -> None:
+        """Wait until every deferred commit is made.
+
+        Raises:
+            LogisError: If any failed. Their queue entries are kept, so the next drain of the queue retries them,
+                unless they conflict with what was committed since their snapshot (see CommitConflictError).
+        """
+        self._queue.join()
+        errors, self._errors = self._errors, []
+        if errors:
+            raise LogisError(f"{len(errors)} background commit(s) failed: {errors[0]}") from errors[0]
+
+    def _run(self) -> None:
+        from logis.service.git import GitService
+
+        commit_queues: dict[Path, CommitQueue] = {}
+        while True:
+            git_dir, entry = self._queue.get()
+            try:
+                if git_dir not in commit_queues:
+                    commit_queues[git_dir] = CommitQueue(GitService(git.Repo(git_dir)))
+                commit_queues[git_dir].wait(entry, keep=True)
+            except Exception as e:
+                logger.error("Background commit of %s failed: %s", entry.name, e)
+                self._errors.append(e)
+            finally:
+                self._queue.task_done()
+
+
+def _write_atomically(entry: Path, commit: dict) -> None:
+    tmp = entry.with_suffix(".tmp")
+    tmp.write_text(json.dumps(commit))
+    os.replace(tmp, entry)  # Never let a drain see a half-written message
+
+
+def _forget_background_commits() -> None:
+    # The thread doesn't survive a fork. The parent still makes the commits it deferred.
+    BackgroundCommits._instance = None
+    BackgroundCommits._instance_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_background_commits)
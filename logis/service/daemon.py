@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from pydantic import ValidationError
+
+from logis.config import DAEMON_POLL_INTERVAL, DAEMON_SOCKET, LOGIS_DIR, NOTES_REF
+from logis.domain.query import Aggregate, AggregateResult, OrderBy, Query, QueryResult
+from logis.error import LogisError
+from logis.service.git import GitService
+from logis.service.index import IndexService
+from logis.service.query import QueryService
+
+logger = logging.getLogger(__name__)
+
+PING_TIMEOUT = 1.0  # Seconds to wait for a daemon before falling back to querying in-process
+
+
+def socket_path(git_dir: Path) -> Path:
+    return git_dir / LOGIS_DIR / DAEMON_SOCKET
+
+
+class QueryServer(socketserver.ThreadingUnixStreamServer):
+    """Answers queries over a Unix domain socket, keeping the repository and the index warm.
+
+    The protocol is JSON lines: each request is one object, e.g.
+    `{"method": "execute", "query": "[?metrics.accuracy > `0.9`]", "limit": 5}`, answered by one
+    `{"result": ...}` or `{"error": "..."}` line. A connection can carry any number of requests.
+
+    Each connection gets a thread, but requests are answered one at a time since the services aren't
+    thread-safe. In between, the server polls HEAD and brings the index up to date as soon as new
+    commits appear.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, git_service: GitService, index_service: IndexService, query_service: QueryService):
+        self.git_service = git_service
+        self.index_service = index_service
+        self.query_service = query_service
+        self.path = socket_path(git_service.git_dir)
+        self._refs: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            if DaemonClient(self.path).ping():
+                raise LogisError(f"A logis daemon is already serving {self.path}")
+            self.path.unlink()  # Left behind by a daemon that didn't shut down cleanly
+        super().__init__(str(self.path), QueryRequestHandler)
+
+    def serve_forever(self, poll_interval: float = DAEMON_POLL_INTERVAL) -> None:
+        self.refresh()
+        super().serve_forever(poll_interval)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.path.unlink(missing_ok=True)
+
+    def service_actions(self) -> None:
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Update the index if HEAD, or the branch it points to, moved since the last check."""
+        refs = self._refs_fingerprint()
+        if refs != self._refs:
+            with self._lock:
+                self._refs = refs
+                self.index_service.update()
+
+    def handle(self, request: dict[str, Any]) -> Any:
+        """Dispatch one request to the query service, returning a JSON-serializable result."""
+        with self._lock:
+            return self._dispatch(request)
+
+    def _dispatch(self, request: dict[str, Any]) -> Any:
+        match request.get("method"):
+            case "ping":
+                return True
+            case "execute":
+                query = Query(expression=request["query"])
+                order_by = OrderBy.model_validate(request["order_by"]) if request.get("order_by") else None
+                return self.query_service.execute(query, limit=request.get("limit"), order_by=order_by).model_dump(
+                    mode="json"
+                )
+            case "aggregate":
+                query = Query(expression=request["query"])
+                aggregates = [Aggregate.model_validate(aggregate) for aggregate in request["aggregates"]]
+                return self.query_service.aggregate(query, aggregates, group_by=request.get("group_by")).model_dump(
+                    mode="json"
+                )
+        raise ValueError(f"Unknown method: {request.get('method')}")
+
+    def _refs_fingerprint(self) -> tuple:
+        git_dir = self.git_service.git_dir
+        paths = [git_dir / "HEAD", git_dir / "packed-refs"]
+        try:
+            head = (git_dir / "HEAD").read_text().strip()
+        except OSError:
+            head = ""
+        if head.startswith("ref: "):
+            paths.append(git_dir / head.removeprefix("ref: "))
+        paths.append(git_dir / NOTES_REF)
+
+        fingerprint: list[Any] = [head]
+        for path in paths:
+            try:
+                stat = path.stat()
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+
+class QueryRequestHandler(socketserver.StreamRequestHandler):
+    server: QueryServer
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                response = {"result": self.server.handle(json.loads(line))}
+            except (KeyError, ValueError, ValidationError, LogisError) as e:
+                response = {"error": str(e) or type(e).__name__}
+            except Exception as e:  # Keep serving other clients
+                logger.exception("Failed to handle request")
+                response = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class DaemonClient:
+    """Client for a running `logis serve`, with the same query methods as QueryService."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @classmethod
+    def connect(cls, git_dir: Path) -> Optional["DaemonClient"]:
+        """Get a client for the repository's daemon if one is running, unless `LOGIS_NO_DAEMON=1`."""
+        if os.getenv("LOGIS_NO_DAEMON") == "1":
+            return None
+        client = cls(socket_path(git_dir))
+        return client if client.ping() else None
+
+    def ping(self) -> bool:
+        try:
+            return self._request({"method": "ping"}, timeout=PING_TIMEOUT) is True
+        except (OSError, LogisError):
+            return False
+
+    def execute(self, query: Query, limit: Optional[int] = None, order_by: Optional[OrderBy] = None) -> QueryResult:
+        request = {"method": "execute", "query": query.expression, "limit": limit}
+        if order_by is not None:
+            request["order_by"] = order_by.model_dump()
+        return QueryResult.model_validate(self._request(request))
+
+    def aggregate(
+        self, query: Query, aggregates: Sequence[Aggregate], group_by: Optional[str] = None
+    ) -> AggregateResult:
+        request = {
+            "method": "aggregate",
+            "query": query.expression,
+            "aggregates": [aggregate.model_dump() for aggregate in aggregates],
+            "group_by": group_by,
+        }
+        return AggregateResult.model_validate(self._request(request))
+
+    def _request(self, request: dict[str, Any], timeout: Optional[float] = None) -> Any:
+        if not self.path.exists():
+            raise LogisError(f"No logis daemon at {self.path}")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(self.path))
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(request).encode() + b"\n")
+                stream.flush()
+                line = stream.readline()
+        if not line:
+            raise LogisError("The logis daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise LogisError(response["error"])
+        return response["result"]
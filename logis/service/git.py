@@ -1,44 +1,471 @@
-from typing import Optional
+import logging
+import os
+import shutil
+import tempfile
+
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Sequence
 
 import git
 
-from logis.domain.experiment import CommitKind
-from logis.domain.git import Commit, StageStrategy
+from git.db import IStream
+
+from logis.config import LOGIS_DIR, NOTES_REF, STAT_CACHE_FILE
+from logis.domain.experiment import CommitKind, ExperimentRun, MetadataEncoding
+from logis.domain.git import Commit, MetadataStorage, StageStrategy, Staging
+from logis.error import CommitConflictError, LogisError
+from logis.service.commit_queue import CommitQueue
+from logis.service.lock import retry_on_lock
+from logis.service.stage import StatCache, imported_files
+
+logger = logging.getLogger(__name__)
+
+LOG_FIELD_SEPARATOR = "\x1f"
+LOG_FORMAT = "%H%x1f%cI%x1f%B"
+NOTES_LOG_FORMAT = "%H%x1f%cI%x1f%N%x1f%B"
+NOTE_MODE = 0o100644
+NOTES_COMMIT_MESSAGE = "Notes added by 'logis'"
+READ_CHUNK_SIZE = 1 << 16
+PATHSPEC_BATCH_SIZE = 1000  # Paths per `git add` call, to stay under the command line length limit
+# Files git keeps in .git while an operation is in progress
+IN_PROGRESS_MARKERS = ("MERGE_HEAD", "CHERRY_PICK_HEAD", "REVERT_HEAD", "rebase-merge", "rebase-apply")
 
 
 class GitService:
     def __init__(self, repo: git.Repo):
         self._repo = repo
 
-    def get_all_commits(self, kind: Optional[CommitKind] = None) -> list[Commit]:
+    @property
+    def git_dir(self) -> Path:
+        """Path to the repository's `.git` directory."""
+        return Path(self._repo.git_dir)
+
+    @property
+    def storage(self) -> MetadataStorage:
+        """Where new runs' metadata is written, from `LOGIS_STORAGE` (`message`, the default, or `notes`)."""
+        setting = os.getenv("LOGIS_STORAGE") or MetadataStorage.MESSAGE
+        try:
+            return MetadataStorage(setting)
+        except ValueError:
+            choices = ", ".join(MetadataStorage)
+            raise LogisError(f"LOGIS_STORAGE must be one of {choices}, got {setting!r}") from None
+
+    @property
+    def encoding(self) -> MetadataEncoding:
+        """How new runs' metadata is encoded, from `LOGIS_ENCODING` (`json`, the default, `compact` or `zlib`)."""
+        setting = os.getenv("LOGIS_ENCODING") or MetadataEncoding.JSON
+        try:
+            return MetadataEncoding(setting)
+        except ValueError:
+            choices = ", ".join(MetadataEncoding)
+            raise LogisError(f"LOGIS_ENCODING must be one of {choices}, got {setting!r}") from None
+
+    def head_sha(self) -> Optional[str]:
+        """Get the SHA of the commit HEAD points to, or None if HEAD is unborn."""
+        try:
+            return self._repo.head.commit.hexsha
+        except ValueError:
+            return None
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """Check whether `ancestor` is reachable from `descendant`.
+
+        Returns False if either commit no longer exists, e.g. after a rewrite and gc.
+        """
+        try:
+            return self._repo.is_ancestor(ancestor, descendant)
+        except git.GitCommandError:
+            return False
+
+    def iter_commits(self, kind: Optional[CommitKind] = None, rev: Optional[str] = None) -> Iterator[Commit]:
+        """Lazily walk the history, newest first.
+
+        The whole range is read from a single `git log -z` stream and parsed in bulk, instead of
+        loading each commit object through GitPython. Commits are read as the iterator is consumed,
+        so callers that stop early never walk the rest of the history. Each commit's logis note, if
+        any, is read in the same stream.
+
+        Args:
+            kind: Optional commit kind to filter on. The filter is pushed down into `git log --grep`,
+                so commits of other kinds never reach Python.
+            rev: Optional revision range to walk, e.g. `<sha>..HEAD`. Defaults to HEAD.
+        """
+        notes = self.notes_sha() is not None
+        args = ["-z", f"--format={NOTES_LOG_FORMAT if notes else LOG_FORMAT}"]
+        if notes:
+            args.append(f"--notes={NOTES_REF}")
+        if kind:
+            args.append(f"--grep=^{kind.value}:")
+        if rev:
+            args.append(rev)
+
+        process = self._repo.git.log(*args, as_process=True)
+        exhausted = False
+        try:
+            for record in _split_records(process.stdout):
+                if notes:
+                    sha, date, note, message = record.split(LOG_FIELD_SEPARATOR, 3)
+                else:
+                    (sha, date, message), note = record.split(LOG_FIELD_SEPARATOR, 2), ""
+                # `--grep` matches any line of the message, so confirm the header.
+                if kind and CommitKind.from_header(message.split("\n", 1)[0]) is not kind:
+                    continue
+                # The fields are already typed, so skip pydantic validation.
+                yield Commit.model_construct(
+                    sha=sha, message=message, date=datetime.fromisoformat(date), note=note.strip() or None
+                )
+            exhausted = True
+        finally:
+            if exhausted:
+                process.wait()  # Raises GitCommandError if git failed.
+            else:
+                process.kill()
+
+    def get_all_commits(self, kind: Optional[CommitKind] = None, rev: Optional[str] = None) -> list[Commit]:
         """Get all commits in the repository.
 
+        Args:
+            kind: Optional commit kind to filter on
+            rev: Optional revision range to walk, e.g. `<sha>..HEAD`. Defaults to HEAD.
+
         Returns:
             List of Commit objects representing the git history
         """
-        commits = []
-        for commit in self._repo.iter_commits():
-            commits.append(Commit.from_git(commit))
+        return list(self.iter_commits(kind=kind, rev=rev))
 
-        if kind:
-            pass  # @todo: filter by kind
-        return commits
+    @property
+    def work_tree(self) -> Path:
+        """Path to the root of the working tree."""
+        return Path(self._repo.working_tree_dir or self._repo.git_dir)
+
+    def stage_and_commit(self, message: str, staging: Optional[Staging] = None, wait: bool = True):
+        """Stage changes and create a commit with the given message.
 
-    def stage_and_commit(self, message: str):
-        """Stage all changes and create a commit with the given message.
+        Safe to call from parallel runs in the same checkout: commits go through a CommitQueue and are
+        made one at a time.
 
         Args:
             message: CommitMessage object containing commit metadata
+            staging: What to stage, see `staging()`. Defaults to everything.
+            wait: With False, only snapshot the tree that would be committed and return. The commit is made
+                on a background thread, see CommitQueue.defer.
+        """
+        note = None
+        storage, encoding = self.storage, self.encoding
+        if storage is MetadataStorage.NOTES or encoding is not MetadataEncoding.JSON:
+            message, metadata = ExperimentRun.detach_metadata(message)
+            if metadata is not None and storage is MetadataStorage.NOTES:
+                note = encoding.dump(metadata)
+            elif metadata is not None:
+                message = ExperimentRun.attach_metadata(message, metadata, encoding)
+        staging = staging or Staging(all=True)
+        if wait:
+            CommitQueue(self).submit(message, staging, note=note)
+        else:
+            queue = CommitQueue(self)
+            # Snapshot on top of the runs still waiting for their commits, they're committed first. Their tree
+            # is looked up before HEAD, in case one of them is committed in between.
+            pending = queue.last_snapshot()
+            base = pending or self.head_sha()
+            queue.defer(message, staging, self.tree_sha(staging, on=pending), base, note=note)
+
+    def staging(self, strategy: StageStrategy, patterns: Sequence[str] = ()) -> Staging:
+        """Work out what a staging strategy stages, so staging only touches those files.
+
+        Args:
+            strategy: The staging strategy
+            patterns: Glob patterns relative to the repository root, for StageStrategy.PATHS
+        """
+        match strategy:
+            case StageStrategy.ALL:
+                return Staging(all=True)
+            case StageStrategy.TRACKED:
+                return Staging(tracked=True)
+            case StageStrategy.PATHS:
+                return Staging(pathspecs=[f":(glob){pattern}" for pattern in patterns])
+            case StageStrategy.IMPORTS:
+                # Only look up the imported files, leaving out ignored ones, which `git add` would refuse.
+                imported = [f":(literal){path}" for path in imported_files(self.work_tree)]
+                files = self.candidate_files(imported) if imported else []
+                return Staging(pathspecs=[f":(literal){path}" for path in files])
+            case StageStrategy.CHANGED:
+                changed = self._stat_cache().changed(self.work_tree, self.candidate_files())
+                return Staging(pathspecs=[f":(literal){path}" for path in changed], stats=changed)
+        raise ValueError(f"Unknown staging strategy: {strategy}")
+
+    def record_staged(self, staging: Staging) -> None:
+        """Note that a staging's changes were committed, so StageStrategy.CHANGED doesn't select them again."""
+        if staging.stats:
+            self._stat_cache().update(staging.stats)
+
+    def _stat_cache(self) -> StatCache:
+        return StatCache(self.git_dir / LOGIS_DIR / STAT_CACHE_FILE)
+
+    def candidate_files(self, pathspecs: Sequence[str] = ()) -> list[str]:
+        """Tracked files plus untracked ones that aren't ignored, relative to the working tree root.
+
+        Args:
+            pathspecs: Only list files matching these pathspecs
+        """
+        output = self._repo.git.ls_files("-z", "--cached", "--others", "--exclude-standard", "--", *pathspecs)
+        return list(dict.fromkeys(path for path in output.split("\0") if path))
+
+    def stage(self, staging: Staging, env: Optional[dict[str, str]] = None) -> None:
+        """Stage the changes selected by a Staging. Nothing is scanned when it's empty.
+
+        Args:
+            staging: What to stage
+            env: Extra environment for git, e.g. GIT_INDEX_FILE to stage into another index
         """
-        self._repo.git.add(A=True)
+        if staging.all:
+            self._repo.git.add(A=True, env=env)
+            return
+        if staging.tracked:
+            self._repo.git.add(u=True, env=env)
+        for i in range(0, len(staging.pathspecs), PATHSPEC_BATCH_SIZE):
+            self._repo.git.add("-A", "--", *staging.pathspecs[i : i + PATHSPEC_BATCH_SIZE], env=env)
+
+    def tree_sha(self, staging: Staging, on: Optional[str] = None) -> str:
+        """SHA of the tree a commit would record with this staging, leaving the index untouched.
+
+        The changes are staged into a copy of the index, so files that didn't change are not hashed again.
 
-        self._repo.index.commit(message)
+        Args:
+            staging: What to stage
+            on: A tree to stage the changes on top of instead of the index's content, e.g. an earlier
+                snapshot that isn't committed yet
+        """
+        with tempfile.TemporaryDirectory(prefix="logis-index-") as directory:
+            index = Path(directory) / "index"
+            if (self.git_dir / "index").exists():
+                shutil.copyfile(self.git_dir / "index", index)
+            env = {"GIT_INDEX_FILE": str(index)}
+            if on is not None:
+                # Keeps the index's stat info for the files it doesn't change. Unlike `-m`, it doesn't refuse
+                # when a file it changes was modified in the work tree since it was staged.
+                self._repo.git.read_tree("--reset", on, env=env)
+            self.stage(staging, env=env)
+            return self._repo.git.write_tree(env=env)
 
-    def should_commit(self, strategy: StageStrategy) -> bool:
+    def commit(self, message: str) -> str:
+        """Commit the index with the given message, returning the new commit's SHA."""
+        return self._repo.index.commit(message).hexsha
+
+    def commit_tree(self, tree: str, base: Optional[str], message: str) -> str:
+        """Commit a tree snapshotted earlier (see `tree_sha`) on top of HEAD, returning the new commit's SHA.
+
+        If HEAD has moved on from `base`, what the snapshot was taken on top of (a commit, or the tree of an
+        earlier snapshot), the changes from `base` to the snapshot are applied to HEAD's tree instead, so
+        nothing committed in between is undone. The index is updated for the paths the commit changed, as if
+        they had been staged. Requires the commit lock (see CommitQueue).
+
+        Raises:
+            CommitConflictError: If a path the snapshot changed was changed differently in between
+        """
+        head = self.head_sha()
+        if head != base:
+            base_tree, head_tree = self._tree(base), self._tree(head)
+            if head_tree != base_tree:
+                tree = self._apply_changes(base_tree, tree, head_tree)
+        parents = [self._repo.commit(head)] if head else []
+        sha = git.Commit.create_from_tree(
+            self._repo, git.Tree(self._repo, bytes.fromhex(tree)), message, parents
+        ).hexsha
+        # Fails rather than dropping a commit if HEAD moved in the meantime. The reflog reads like `git commit`'s.
+        summary = message.split("\n", 1)[0]
+        reflog = f"commit: {summary}" if head else f"commit (initial): {summary}"
+        self._repo.git.update_ref("-m", reflog, "HEAD", sha, head or git.Object.NULL_HEX_SHA)
+
+        # Retried here, retrying the whole call once HEAD has moved would commit twice.
+        retry_on_lock(self._update_index, head, sha)
+        return sha
+
+    def _update_index(self, old: Optional[str], new: str) -> None:
+        """Set the index entries of the paths that changed between two commits to their content in `new`."""
+        changed = self._repo.git.diff_tree("-r", "-z", "--name-only", "--no-renames", old or self._empty_tree(), new)
+        paths = [f":(literal){path}" for path in changed.split("\0") if path]
+        for i in range(0, len(paths), PATHSPEC_BATCH_SIZE):
+            self._repo.git.reset("-q", new, "--", *paths[i : i + PATHSPEC_BATCH_SIZE])
+
+    def _apply_changes(self, base: str, tree: str, head: str) -> str:
+        """The tree `head` with the changes from the tree `base` to `tree` applied, written to a temporary index."""
+        ours, theirs = self._changes(base, tree), self._changes(base, head)
+        conflicts = sorted(path for path, change in ours.items() if theirs.get(path, change) != change)
+        if conflicts:
+            raise CommitConflictError(
+                f"{len(conflicts)} path(s) the run changed were also changed since it started: {', '.join(conflicts)}"
+            )
+
+        # Deletions have mode 0, which removes the path.
+        return self._update_tree(head, [f"{mode} {sha}\t{path}" for path, (mode, sha) in ours.items()])
+
+    def _update_tree(self, tree: Optional[str], entries: Sequence[str]) -> str:
+        """A tree with some entries changed, written to a temporary index so the rest isn't read in Python.
+
+        Args:
+            tree: The tree to start from, None for an empty one
+            entries: `<mode> <blob sha> TAB <path>` lines, see `git update-index --index-info`. Mode 0 removes
+                the path.
+        """
+        with tempfile.TemporaryDirectory(prefix="logis-index-") as directory:
+            env = {"GIT_INDEX_FILE": str(Path(directory) / "index")}
+            if tree is not None:
+                self._repo.git.read_tree(tree, env=env)
+            info_path = Path(directory) / "info"
+            info_path.write_text("".join(f"{entry}\0" for entry in entries))
+            with open(info_path, "rb") as istream:
+                self._repo.git.update_index("-z", "--index-info", istream=istream, env=env)
+            return self._repo.git.write_tree(env=env)
+
+    def _changes(self, old: str, new: str) -> dict[str, tuple[str, str]]:
+        """The new mode and blob SHA of each path that differs between two trees, mode 0 if it was deleted."""
+        diff = self._repo.git.diff_tree("-r", "-z", "--no-renames", old, new)
+        # Raw records: `:<old mode> <new mode> <old sha> <new sha> <status>`, then the path.
+        fields = diff.split("\0")
+        changes = {}
+        for record, path in zip(fields[0::2], fields[1::2]):
+            _, mode, _, sha, _ = record.lstrip(":").split(" ")
+            changes[path] = (mode, sha)
+        return changes
+
+    def _tree(self, commit_or_tree: Optional[str]) -> str:
+        if commit_or_tree is None:  # Unborn HEAD
+            return self._empty_tree()
+        return self._repo.git.rev_parse(f"{commit_or_tree}^{{tree}}")
+
+    def _empty_tree(self) -> str:
+        return self._store(git.Tree.type, b"").hex()
+
+    def notes_sha(self) -> Optional[str]:
+        """Get the SHA the logis notes ref (NOTES_REF) points to, or None if no notes were written yet."""
+        try:
+            return git.Reference(self._repo, NOTES_REF).object.hexsha
+        except ValueError:
+            return None
+
+    def read_notes(self, shas: Optional[Iterable[str]] = None) -> dict[str, str]:
+        """Read logis notes, by the SHA of the commit they're attached to.
+
+        This reads the notes tree directly, without walking the history.
+
+        Args:
+            shas: Only read the notes of these commits. Defaults to every note.
+        """
+        blobs = self._note_blobs()
+        if shas is not None:
+            blobs = {sha: blobs[sha] for sha in shas if sha in blobs}
+        return {sha: self._repo.odb.stream(bytes.fromhex(blob)).read().decode() for sha, blob in blobs.items()}
+
+    def add_notes(self, notes: dict[str, str]) -> None:
+        """Attach logis notes to commits (commit SHA -> note), replacing any they already have.
+
+        Only the new notes are added to the current notes tree (see `_update_tree`), and a single notes commit
+        is made for all of them, instead of running `git notes add` once per commit. Requires the commit lock
+        (see CommitQueue).
+        """
+        if not notes:
+            return
+        old = self.notes_sha()
+        entries = []
+        for sha, note in notes.items():
+            blob = self._store(git.Blob.type, note.encode()).hex()
+            # Notes written by git itself may fan out into directories, e.g. `ab/cdef...`: replace those too.
+            entries += [f"0 {git.Object.NULL_HEX_SHA}\t{path}" for path in _fanout_paths(sha)]
+            entries.append(f"{NOTE_MODE:o} {blob}\t{sha}")
+        tree = self._update_tree(old, entries)
+        parents = [self._repo.commit(old)] if old else []
+        commit = git.Commit.create_from_tree(
+            self._repo, git.Tree(self._repo, bytes.fromhex(tree)), NOTES_COMMIT_MESSAGE, parents
+        )
+        # Fails rather than dropping notes if the ref moved in the meantime.
+        self._repo.git.update_ref(NOTES_REF, commit.hexsha, old or git.Object.NULL_HEX_SHA)
+
+    def changed_notes(self, old: Optional[str], new: Optional[str]) -> Optional[set[str]]:
+        """SHAs of the commits whose logis note differs between two versions of the notes ref.
+
+        Returns None if that can't be worked out, e.g. the notes ref was deleted or the old version was
+        garbage collected.
+        """
+        if new is None:
+            return None if old else set()
+        try:
+            if old is None:
+                output = self._repo.git.ls_tree("-r", "--name-only", new)
+            else:
+                output = self._repo.git.diff_tree("-r", "--name-only", old, new)
+        except git.GitCommandError:
+            return None
+        # Large notes trees fan out into directories, e.g. `ab/cdef...`.
+        return {path.replace("/", "") for path in output.splitlines()}
+
+    def backfill_notes(self) -> int:
+        """Copy run metadata from the messages of experiment commits reachable from HEAD into logis notes.
+
+        Commits that already have a note are left alone. Returns the number of notes added.
+        """
+        if self.head_sha() is None:
+            return 0
+        encoding = self.encoding
+        with CommitQueue(self).lock:
+            notes = {}
+            for commit in self.iter_commits(CommitKind.EXP):
+                if commit.note is None and (metadata := ExperimentRun.parse_metadata(commit.message)) is not None:
+                    notes[commit.sha] = encoding.dump(metadata)
+            self.add_notes(notes)
+        return len(notes)
+
+    def _note_blobs(self) -> dict[str, str]:
+        """The blob SHA of every logis note, by the SHA of the commit it's attached to."""
+        notes = self.notes_sha()
+        if notes is None:
+            return {}
+        blobs = {}
+        # `<mode> <type> <blob sha> TAB <path>`, paths of fanned out notes are split into directories.
+        for entry in self._repo.git.ls_tree("-r", "-z", notes).split("\0"):
+            if entry:
+                info, path = entry.split("\t", 1)
+                blobs[path.replace("/", "")] = info.split()[2]
+        return blobs
+
+    def _store(self, kind: str, data: bytes) -> bytes:
+        """Write an object to the object database, returning its binary SHA."""
+        return self._repo.odb.store(IStream(kind, len(data), BytesIO(data))).binsha
+
+    def should_commit(self, strategy: StageStrategy, patterns: Sequence[str] = ()) -> bool:
         """Determine if the repo state can be staged and committed
 
-        Returns:
-            @todo: decide if the unstaged files are suitable for committing
+        Runs aren't committed in the middle of a merge, rebase, cherry-pick or revert, where a commit would
+        pick up (or fail on) the half-finished operation. Nor with StageStrategy.PATHS and no patterns,
+        which can't select anything.
         """
-        if strategy == StageStrategy.ALL:
-            return True
+        if strategy is StageStrategy.PATHS and not patterns:
+            logger.warning("StageStrategy.PATHS needs glob patterns, not committing")
+            return False
+        git_dir = self.git_dir
+        if in_progress := [name for name in IN_PROGRESS_MARKERS if (git_dir / name).exists()]:
+            logger.warning("Not committing while a git operation is in progress (%s)", ", ".join(in_progress))
+            return False
+        return True
+
+
+def _split_records(stream: IO[bytes], separator: bytes = b"\0") -> Iterator[str]:
+    """Split a byte stream into separator-terminated records, decoding each straight from the read buffer."""
+    buffer = bytearray()
+    while chunk := stream.read1(READ_CHUNK_SIZE):  # type: ignore[attr-defined]
+        buffer += chunk
+        start = 0
+        with memoryview(buffer) as view:
+            while (end := buffer.find(separator, start)) != -1:
+                yield str(view[start:end], "utf-8", "replace")
+                start = end + 1
+        del buffer[:start]
+
+    if buffer:
+        yield buffer.decode("utf-8", "replace")
+
+
+def _fanout_paths(sha: str) -> list[str]:
+    """Where git may have put the note of a commit in a large notes tree, instead of at its SHA."""
+    return [f"{sha[:2]}/{sha[2:]}", f"{sha[:2]}/{sha[2:4]}/{sha[4:]}"]
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from logis.config import INDEX_FILE, INDEX_VERSION, LOGIS_DIR
+from logis.domain.experiment import CommitKind
+from logis.domain.git import Commit, ExperimentRecord
+from logis.domain.index import SecondaryIndexes
+from logis.service.git import GitService
+from logis.service.parse import parse_experiment_commits
+
+if TYPE_CHECKING:
+    from logis.domain.columnar import ColumnarLog
+
+logger = logging.getLogger(__name__)
+
+
+class IndexService:
+    """Persistent index of parsed experiment runs, stored under `.git/logis/`.
+
+    The index records the HEAD it was built at (the tip). On each access only the commits in
+    `tip..HEAD` are walked and parsed. If the tip is no longer an ancestor of HEAD (history was
+    rewritten or a different branch is checked out), the index is rebuilt from scratch, reusing
+    already-parsed runs by SHA.
+
+    It also records the version of the logis notes ref it has seen. New notes on the new commits are
+    picked up incrementally. Notes added to (or changed on) older commits, e.g. by `logis migrate`, are
+    read from the notes tree and only those commits' runs are parsed again, without walking the history.
+    """
+
+    def __init__(self, git_service: GitService):
+        self.git_service = git_service
+        self._tip: Optional[str] = None
+        self._notes: Optional[str] = None
+        self._records: Optional[list[ExperimentRecord]] = None
+        self._columnar: Optional[tuple[Optional[str], "ColumnarLog"]] = None
+        self._secondary: Optional[tuple[Optional[str], SecondaryIndexes]] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether queries should read from the index, set `LOGIS_NO_INDEX=1` to walk history directly."""
+        return os.getenv("LOGIS_NO_INDEX") != "1"
+
+    @property
+    def path(self) -> Path:
+        return self.git_service.git_dir / LOGIS_DIR / INDEX_FILE
+
+    def experiment_records(self) -> list[ExperimentRecord]:
+        """Get all experiment runs reachable from HEAD, newest first."""
+        self.update()
+        return self._records or []
+
+    @property
+    def tip(self) -> Optional[str]:
+        """The commit the index was last updated to, see `update()`."""
+        return self._tip
+
+    def has_columnar(self) -> bool:
+        """Whether the columnar view of the current runs is built already, see `columnar()`."""
+        return self._columnar is not None and self._columnar[0] == self._tip
+
+    def columnar(self) -> "ColumnarLog":
+        """Get a columnar view of the experiment runs, in the same order. Requires numpy."""
+        from logis.domain.columnar import ColumnarLog
+
+        records = self.experiment_records()
+        if self._columnar is None or self._columnar[0] != self._tip:
+            log = ColumnarLog.from_runs([record.sha for record in records], [record.metadata for record in records])
+            self._columnar = (self._tip, log)
+        return self._columnar[1]
+
+    def secondary(self) -> SecondaryIndexes:
+        """Get the secondary indexes over the experiment runs, rebuilt in memory when HEAD moves."""
+        records = self.experiment_records()
+        if self._secondary is None or self._secondary[0] != self._tip:
+            self._secondary = (self._tip, SecondaryIndexes(records))
+        return self._secondary[1]
+
+    def update(self) -> None:
+        """Bring the index up to date with HEAD, persisting it if anything changed."""
+        if self._records is None:
+            self._load()
+
+        head = self.git_service.head_sha()
+        notes = self.git_service.notes_sha()
+        if head == self._tip and notes == self._notes:
+            return
+
+        changed = set() if notes == self._notes else self.git_service.changed_notes(self._notes, notes)
+        if head is None:
+            self._tip, self._records = None, []
+        elif (records := self._update_incrementally(head, changed)) is not None:
+            self._tip, self._records = head, records
+        else:
+            logger.debug("Index tip %s is not an ancestor of HEAD or older notes changed, rebuilding", self._tip)
+            known: dict[str, list[ExperimentRecord]] = {}
+            for record in self._records or []:
+                if changed is not None and record.sha not in changed:
+                    known.setdefault(record.sha, []).append(record)
+            self._tip, self._records = head, self._parse(self.git_service.iter_commits(CommitKind.EXP, rev=head), known)
+        self._notes = notes
+
+        self._save()
+
+    def rebuild(self) -> None:
+        """Discard the index and rebuild it from the full history."""
+        self._tip, self._notes, self._records = None, None, []
+        self.update()
+
+    def _update_incrementally(self, head: str, changed: Optional[set[str]]) -> Optional[list[ExperimentRecord]]:
+        """The records with the runs in `tip..head` added, or None if the index has to be rebuilt instead."""
+        if not self._tip or changed is None or not self.git_service.is_ancestor(self._tip, head):
+            return None
+        commits = (
+            [] if head == self._tip else list(self.git_service.iter_commits(CommitKind.EXP, rev=f"{self._tip}..{head}"))
+        )
+        records = self._records or []
+        if renoted := changed - {commit.sha for commit in commits}:
+            records = self._renote(records, renoted)
+            if records is None:
+                return None
+        return self._parse(commits) + records
+
+    def _renote(self, records: list[ExperimentRecord], shas: set[str]) -> Optional[list[ExperimentRecord]]:
+        """The records with the runs of some indexed commits parsed again from their current notes.
+
+        The notes are read straight from the notes tree (see GitService.read_notes), so e.g. `logis migrate`
+        doesn't make the next query walk the history. Returns None if one of the commits isn't indexed, in
+        which case it has to be found in the history.
+        """
+        indexed = {record.sha: record for record in reversed(records)}
+        if not shas <= indexed.keys():
+            return None
+        notes = self.git_service.read_notes(shas)
+        commits = [
+            Commit.model_construct(sha=sha, message=indexed[sha].message, date=indexed[sha].date, note=notes.get(sha))
+            for sha in shas
+        ]
+        parsed = dict(zip((commit.sha for commit in commits), parse_experiment_commits(commits)))
+        renoted = []
+        for record in records:
+            if record.sha not in parsed:
+                renoted.append(record)
+            elif record is indexed[record.sha]:  # The first run of a batch commit stands for all of them
+                renoted.extend(parsed[record.sha])
+        return renoted
+
+    @staticmethod
+    def _parse(
+        commits: Iterable[Commit], known: Optional[dict[str, list[ExperimentRecord]]] = None
+    ) -> list[ExperimentRecord]:
+        known = known or {}
+        commits = list(commits)
+        pending = [commit for commit in commits if commit.sha not in known]
+        new = dict(zip((commit.sha for commit in pending), parse_experiment_commits(pending)))
+
+        parsed = []
+        for commit in commits:
+            parsed.extend(known.get(commit.sha) or new.get(commit.sha) or [])
+        return parsed
+
+    def _load(self) -> None:
+        self._tip, self._notes, self._records = None, None, []
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable index at %s: %s", self.path, e)
+            return
+
+        if data.get("version") != INDEX_VERSION:
+            return
+        try:
+            records = []
+            for sha, date, message, metadata in data["records"]:
+                message = records[-1].message if message is None else message
+                records.append(
+                    ExperimentRecord(sha=sha, date=datetime.fromisoformat(date), message=message, metadata=metadata)
+                )
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            logger.warning("Ignoring corrupt index at %s: %s", self.path, e)
+            return
+        self._tip, self._notes, self._records = data.get("tip"), data.get("notes"), records
+
+    def _save(self) -> None:
+        rows, previous_sha = [], None
+        for record in self._records or []:
+            # Runs of a batch commit share its message, so only store it with the first one.
+            message = None if record.sha == previous_sha else record.message
+            rows.append((record.sha, record.date.isoformat(), message, record.metadata))
+            previous_sha = record.sha
+        data = {"version": INDEX_VERSION, "tip": self._tip, "notes": self._notes, "records": rows}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see a partial index.
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write index to %s: %s", self.path, e)
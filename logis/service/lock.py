@@ -0,0 +1,103 @@
+import logging
+import os
+import random
+import time
+
+from pathlib import Path
+from typing import Callable, Iterator, Optional, TypeVar
+
+import git
+
+from logis.config import LOCK_BACKOFF_INITIAL, LOCK_BACKOFF_MAX, LOCK_TIMEOUT
+from logis.error import LogisError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def backoff(timeout: float = LOCK_TIMEOUT) -> Iterator[float]:
+    """Sleep with exponential backoff (plus jitter, so waiters don't retry in lockstep) until `timeout`.
+
+    Yields the time waited so far before each retry, and raises LogisError once the timeout is reached.
+    """
+    start = time.monotonic()
+    delay = LOCK_BACKOFF_INITIAL
+    while (waited := time.monotonic() - start) < timeout:
+        yield waited
+        time.sleep(min(delay * random.uniform(0.5, 1.5), max(0.0, timeout - waited)))
+        delay = min(delay * 2, LOCK_BACKOFF_MAX)
+    raise LogisError(f"Timed out after {timeout:.0f}s")
+
+
+def retry_on_lock(fn: Callable[..., T], *args) -> T:
+    """Call fn, retrying with backoff while git's own index.lock is held, e.g. by an editor."""
+    for _ in backoff():
+        try:
+            return fn(*args)
+        except (git.GitCommandError, OSError) as e:
+            if "lock" not in str(e).lower():
+                raise
+            logger.debug("Index is locked, retrying: %s", e)
+    raise AssertionError("unreachable")
+
+
+class FileLock:
+    """An exclusive, inter-process lock on a file, e.g. `.git/logis/commit.lock`.
+
+    The lock is held by an open file description (flock on POSIX), so it is also exclusive between threads
+    of one process that use separate FileLocks, and is released by the OS if its holder dies.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if it's free, without waiting."""
+        if self._fd is not None:
+            raise LogisError(f"Lock {self.path} is already held")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:  # pragma: no cover - Windows
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def acquire(self, timeout: float = LOCK_TIMEOUT) -> None:
+        """Wait for the lock, retrying with backoff. Raises LogisError after `timeout` seconds."""
+        try:
+            for _ in backoff(timeout):
+                if self.try_acquire():
+                    return
+        except LogisError:
+            raise LogisError(f"Timed out waiting for lock {self.path}") from None
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:  # pragma: no cover - Windows
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,53 @@
+import logging
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+from logis.config import PARALLEL_PARSE_CHUNK_SIZE, PARALLEL_PARSE_THRESHOLD
+from logis.domain.git import Commit, ExperimentRecord
+
+logger = logging.getLogger(__name__)
+
+
+def parse_workers() -> int:
+    """Number of worker processes for parsing, from `LOGIS_WORKERS` (defaults to the CPU count, 1 disables)."""
+    workers = os.getenv("LOGIS_WORKERS")
+    if workers:
+        try:
+            return max(1, int(workers))
+        except ValueError:
+            logger.warning("Ignoring invalid LOGIS_WORKERS=%r", workers)
+    return os.cpu_count() or 1
+
+
+def parse_experiment_commits(commits: Sequence[Commit], workers: Optional[int] = None) -> list[list[ExperimentRecord]]:
+    """Parse experiment metadata from commits, in the same order.
+
+    Parsing (JSON decoding) is CPU-bound, so large batches are split into chunks and parsed across a
+    process pool. Below `PARALLEL_PARSE_THRESHOLD` commits the pool costs more than it saves, and
+    commits are parsed in this process.
+
+    Returns:
+        One entry per commit: its runs (see ExperimentRecord.from_commit)
+    """
+    workers = workers or parse_workers()
+    if workers <= 1 or len(commits) < PARALLEL_PARSE_THRESHOLD:
+        return _parse_chunk(commits)
+
+    chunks = [commits[i : i + PARALLEL_PARSE_CHUNK_SIZE] for i in range(0, len(commits), PARALLEL_PARSE_CHUNK_SIZE)]
+    parsed: list[list[ExperimentRecord]] = []
+    # Forking a process that runs threads (the daemon, the async API) can deadlock, so start workers from a
+    # fork server where there is one.
+    context = (
+        multiprocessing.get_context("forkserver") if "forkserver" in multiprocessing.get_all_start_methods() else None
+    )
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+        for chunk in executor.map(_parse_chunk, chunks):  # map() yields in submission order
+            parsed.extend(chunk)
+    return parsed
+
+
+def _parse_chunk(commits: Sequence[Commit]) -> list[list[ExperimentRecord]]:
+    return [ExperimentRecord.from_commit(commit) for commit in commits]
@@ -1,48 +1,111 @@
-from typing import Optional
+import heapq
+import json
+import logging
 
-from logis.domain.git import ExperimentCommit
-from logis.domain.query import Query, QueryResult, SimpleQueryOp, SimpleQueryValue
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from pydantic import ValidationError
+
+from logis.config import COLUMNAR_MIN_SCANS, COLUMNAR_THRESHOLD
+from logis.domain.experiment import CommitKind
+from logis.domain.git import ExperimentCommit, ExperimentRecord
+from logis.domain.query import (
+    Aggregate,
+    AggregateGroup,
+    AggregateResult,
+    AggregateState,
+    OrderBy,
+    Query,
+    QueryPlan,
+    QueryResult,
+    SimpleQueryOp,
+    SimpleQueryValue,
+    lookup,
+)
 from logis.service.git import GitService
+from logis.service.index import IndexService
+from logis.service.parse import parse_experiment_commits
+
+logger = logging.getLogger(__name__)
 
 
 class QueryService:
     """Service for querying experiment commits."""
 
-    def __init__(self, git_service: GitService):
+    def __init__(self, git_service: GitService, index_service: IndexService):
         self.git_service = git_service
+        self.index_service = index_service
+        self._scans: tuple[Optional[str], int] = (None, 0)  # Row scans of a large log, by index tip
 
-    def execute(self, query: Query, limit: Optional[int] = None) -> QueryResult:
+    def execute(self, query: Query, limit: Optional[int] = None, order_by: Optional[OrderBy] = None) -> QueryResult:
         """Execute a query against the experiment commit history.
 
+        The expression is evaluated against each run's metadata, e.g. `metrics.accuracy`. Filter queries
+        are evaluated as a stream (commits -> experiments -> predicate -> take N), so a query with a limit
+        stops reading history as soon as enough matches are found.
+
+        With the index, filters on the experiment name, timestamp ranges or numeric ranges only scan the
+        candidates found in the secondary indexes. Otherwise, on large logs that are queried repeatedly,
+        planned filters are evaluated as boolean masks over a columnar view of the whole log (see ColumnarLog).
+
+        With `order_by`, the limit becomes a top-k: see `_execute_ordered`.
+
         Args:
             query: The query to execute
             limit: Optional maximum number of results to return
+            order_by: Optional numeric field to order the results by
 
         Returns:
             QueryResult containing matching commits
         """
-        commits = self.git_service.get_all_commits()
-        total = len(commits)
-
-        # Convert regular commits to experiment commits
-        exp_commits = [
-            {"commit": exp_commit, "run": exp_commit.experiment_run.model_dump()}
-            for commit in commits
-            if (exp_commit := ExperimentCommit.from_commit(commit))
-        ]
+        if order_by is not None:
+            return self._execute_ordered(query, limit, order_by)
 
-        query_str = query.expression.replace("metrics.", "run.metrics.").replace(
-            "hyperparameters.", "run.hyperparameters."
-        )
-        modified_query = Query(expression=query_str)
-        search = modified_query.compile().search(exp_commits)
-        matching: list[ExperimentCommit] = [match["commit"] for match in search]
+        plan = query.plan()
+        source: Optional[Iterable[ExperimentRecord]] = None
+        if plan.is_row_filter and self.index_service.enabled:
+            candidates = self.index_service.secondary().candidates(plan)
+            if candidates is not None:
+                records = self.index_service.experiment_records()
+                source = (records[i] for i in candidates)
+            elif self._use_columnar():
+                log = self.index_service.columnar()
+                if (mask := log.mask(plan)) is not None:
+                    records = self.index_service.experiment_records()
+                    indices = mask.nonzero()[0]
+                    if limit and limit > 0:
+                        indices = indices[:limit]
+                    commits = self._to_commits(records[i] for i in indices)
+                    return QueryResult(commits=commits, query=query, num_searched=len(log))
 
-        results = matching or []
-        if limit and limit > 0:
-            results = results[:limit]
+        num_searched = 0
+
+        def searched(records: Iterable[ExperimentRecord]) -> Iterator[ExperimentRecord]:
+            nonlocal num_searched
+            for record in records:
+                num_searched += 1
+                yield record
 
-        return QueryResult(commits=results, query=query, num_searched=total)
+        if plan.is_row_filter:
+            source = source if source is not None else self._experiment_records(limit)
+            matches = (record for record in searched(source) if plan.matches(record.metadata))
+            if limit and limit > 0:
+                matches = islice(matches, limit)
+            results = self._to_commits(matches)
+        else:
+            # Arbitrary expressions (pipes, functions, ...) need to see every record at once.
+            records = {id(record.metadata): record for record in searched(self._experiment_records())}
+            rows = [record.metadata for record in records.values()]
+            selected = [records[id(row)] for row in plan.search(rows) if id(row) in records]
+            if limit and limit > 0:
+                selected = selected[:limit]
+            results = self._to_commits(selected)
+
+        if self.index_service.enabled:
+            # Runs skipped via the index or the limit were still searched, as far as the caller is concerned.
+            num_searched = len(self.index_service.experiment_records())
+        return QueryResult(commits=results, query=query, num_searched=num_searched)
 
     def execute_simple(
         self,
@@ -64,3 +127,159 @@ class QueryService:
         """
         query = Query.where(metric, op, value)
         return self.execute(query, limit=limit)
+
+    def top_k(self, field: str, k: int, descending: bool = True, query: Optional[Query] = None) -> QueryResult:
+        """Find the k runs with the highest (or lowest) numeric value of a field.
+
+        Args:
+            field: Dotted path of a numeric field, e.g. `metrics.accuracy`
+            k: Number of runs to return
+            descending: Return the highest values first, otherwise the lowest
+            query: Optional filter query the runs must match
+
+        Returns:
+            QueryResult containing the matching commits, best first
+        """
+        return self.execute(query or Query.everything(), limit=k, order_by=OrderBy(field=field, descending=descending))
+
+    def aggregate(
+        self, query: Query, aggregates: Sequence[Aggregate], group_by: Optional[str] = None
+    ) -> AggregateResult:
+        """Aggregate numeric fields over the runs matching a filter query, optionally grouped by a field.
+
+        Runs are aggregated in a single pass: each group keeps a running count, sum, min and max per
+        aggregate (plus the values themselves for percentiles), and no commits are materialized.
+
+        Args:
+            query: Filter query selecting the runs to aggregate
+            aggregates: Aggregates to compute, e.g. `Aggregate.parse("mean:metrics.loss")`
+            group_by: Optional dotted path of the field to group runs by, e.g. `hyperparameters.lr`
+
+        Returns:
+            AggregateResult with one group per distinct value of `group_by` (or a single group), in order
+            of first appearance
+        """
+        plan = self._row_filter(query)
+        group_path = tuple(group_by.split(".")) if group_by else ()
+
+        source: Optional[Iterable[ExperimentRecord]] = None
+        if self.index_service.enabled and (candidates := self.index_service.secondary().candidates(plan)) is not None:
+            records = self.index_service.experiment_records()
+            source = (records[i] for i in candidates)
+
+        num_searched = 0
+        keys: dict[str, Any] = {}
+        counts: dict[str, int] = {}
+        states: dict[str, list[AggregateState]] = {}
+        for record in source if source is not None else self._experiment_records():
+            num_searched += 1
+            if not plan.matches(record.metadata):
+                continue
+            key = lookup(record.metadata, group_path) if group_path else None
+            hashed = json.dumps(key, sort_keys=True)  # Group keys can be lists or dicts, which aren't hashable
+            if hashed not in keys:
+                keys[hashed], counts[hashed] = key, 0
+                states[hashed] = [AggregateState(aggregate) for aggregate in aggregates]
+            counts[hashed] += 1
+            for state in states[hashed]:
+                state.add(record.metadata)
+
+        if self.index_service.enabled:
+            num_searched = len(self.index_service.experiment_records())
+        groups = [
+            AggregateGroup(
+                key=keys[hashed],
+                count=counts[hashed],
+                values={state.aggregate.label: state.result() for state in states[hashed]},
+            )
+            for hashed in keys
+        ]
+        return AggregateResult(groups=groups, group_by=group_by, query=query, num_searched=num_searched)
+
+    def _execute_ordered(self, query: Query, limit: Optional[int], order_by: OrderBy) -> QueryResult:
+        """Execute a filter query, ordering the matches by a numeric field.
+
+        With the index, runs are read in order from the field's sorted index until enough of them match.
+        Otherwise the matches are streamed through a bounded heap, so only the best `limit` runs are kept.
+        """
+        plan = self._row_filter(query)
+        limit = limit if limit and limit > 0 else None
+
+        num_searched = 0
+        if self.index_service.enabled:
+            records = self.index_service.experiment_records()
+            ranked = []
+            for position in self.index_service.secondary().top(order_by.path, order_by.descending):
+                num_searched += 1
+                if plan.matches(records[position].metadata):
+                    ranked.append(records[position])
+                    if len(ranked) == limit:
+                        break
+        else:
+            scored = []
+            for record in self._experiment_records():
+                num_searched += 1
+                value = lookup(record.metadata, order_by.path)
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and plan.matches(record.metadata):
+                    scored.append((value, num_searched, record))
+            if limit is None:
+                scored.sort(key=lambda item: item[0], reverse=order_by.descending)
+            else:
+                select = heapq.nlargest if order_by.descending else heapq.nsmallest
+                scored = select(limit, scored, key=lambda item: item[0])
+            ranked = [record for _, _, record in scored]
+
+        return QueryResult(commits=self._to_commits(ranked), query=query, num_searched=num_searched)
+
+    @staticmethod
+    def _row_filter(query: Query) -> QueryPlan:
+        plan = query.plan()
+        if not plan.is_row_filter:
+            raise ValueError(f"Only filter queries can be ordered or aggregated: {query.expression}")
+        return plan
+
+    def _use_columnar(self) -> bool:
+        """Vectorized filtering pays off for large indexed logs that are queried repeatedly, if numpy is installed.
+
+        The columnar view is used if it's built already, and built once COLUMNAR_MIN_SCANS queries scanned the
+        rows of the same log.
+        """
+        if not self.index_service.enabled or len(self.index_service.experiment_records()) < COLUMNAR_THRESHOLD:
+            return False
+        if not self.index_service.has_columnar():
+            tip, scans = self._scans
+            scans = scans + 1 if tip == self.index_service.tip else 1
+            self._scans = (self.index_service.tip, scans)
+            if scans <= COLUMNAR_MIN_SCANS:
+                return False
+        from logis.domain.columnar import has_numpy  # Importing numpy is slow, only do it for large logs
+
+        return has_numpy()
+
+    def _experiment_records(self, limit: Optional[int] = None) -> Iterator[ExperimentRecord]:
+        """Stream experiment runs, newest first, from the index or straight from the history.
+
+        Without the index, a limited query parses commits one at a time so it can stop early, while an
+        unlimited one reads the whole history and parses it in parallel.
+        """
+        if self.index_service.enabled:
+            yield from self.index_service.experiment_records()
+            return
+
+        commits = self.git_service.iter_commits(CommitKind.EXP)
+        if limit and limit > 0:
+            for commit in commits:
+                yield from ExperimentRecord.from_commit(commit)
+        else:
+            yield from chain.from_iterable(parse_experiment_commits(list(commits)))
+
+    @staticmethod
+    def _to_commits(records: Iterable[ExperimentRecord]) -> list[ExperimentCommit]:
+        """Validate matched records into typed commits, skipping any with malformed metadata."""
+        commits = []
+        for record in records:
+            try:
+                commits.append(record.to_commit())
+            except ValidationError as e:
+                logger.debug("Skipping commit %s with invalid metadata: %s", record.sha, e)
+        return commits
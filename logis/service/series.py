@@ -0,0 +1,75 @@
+import tempfile
+
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Mapping, Optional
+
+from logis.config import SERIES_CHUNK_SIZE, SERIES_MAX_PENDING_CHUNKS
+from logis.domain.series import SeriesSummary
+
+
+class SeriesWriter:
+    """Spools the points a run logs with `Run.log` to disk, one file of float64 (step, value) pairs per metric.
+
+    Points are buffered per metric and appended to a temporary file in chunks of `chunk_size`, on a
+    background thread so the run isn't blocked on disk. At most SERIES_MAX_PENDING_CHUNKS chunks wait to be
+    written, so memory stays bounded however long the run is. A SeriesSummary of each metric is kept up to
+    date as points come in.
+    """
+
+    def __init__(self, chunk_size: int = SERIES_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.summaries: dict[str, SeriesSummary] = {}
+        self._buffers: dict[str, array] = {}
+        self._files: dict[str, Path] = {}
+        self._directory = tempfile.TemporaryDirectory(prefix="logis-series-")  # Removed on close() or exit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: deque[Future] = deque()
+
+    def append(self, step: float, metrics: Mapping[str, float]) -> None:
+        """Add the values of some metrics at a step."""
+        for name, value in metrics.items():
+            value = float(value)
+            if name not in self.summaries:
+                self.summaries[name] = SeriesSummary()
+                self._buffers[name] = array("d")
+                # Metric names may not be valid file names, e.g. `train/loss`.
+                self._files[name] = Path(self._directory.name) / f"{len(self._files)}.bin"
+            self.summaries[name].add(step, value)
+            buffer = self._buffers[name]
+            buffer.append(step)
+            buffer.append(value)
+            if len(buffer) >= 2 * self.chunk_size:
+                self._flush(name)
+
+    def finish(self) -> dict[str, Path]:
+        """Write out what's still buffered and wait for all writes, returning the file of each metric."""
+        for name, buffer in self._buffers.items():
+            if buffer:
+                self._flush(name)
+        while self._pending:
+            self._pending.popleft().result()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        return dict(self._files)
+
+    def close(self) -> None:
+        """Remove the spooled files."""
+        self._directory.cleanup()
+
+    def _flush(self, name: str) -> None:
+        chunk, self._buffers[name] = self._buffers[name], array("d")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="logis-series")
+        # Surface write errors early, and wait for the disk if it falls behind.
+        while self._pending and (self._pending[0].done() or len(self._pending) >= SERIES_MAX_PENDING_CHUNKS):
+            self._pending.popleft().result()
+        self._pending.append(self._executor.submit(_append, self._files[name], chunk))
+
+
+def _append(path: Path, chunk: array) -> None:
+    with open(path, "ab") as f:
+        chunk.tofile(f)
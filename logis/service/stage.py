@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import sys
+
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+Stat = tuple[int, int]  # (mtime_ns, size)
+
+
+class StatCache:
+    """The mtime and size of every file as of the last logis commit, e.g. in `.git/logis/stat-cache.json`.
+
+    Comparing against it finds the files changed since then with one stat() per file, without reading
+    or hashing any of them, so only those need to be handed to `git add`. It's only updated once their
+    commit has landed, so changes that were never committed are picked up again next time.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def changed(self, root: Path, paths: Iterable[str]) -> dict[str, Optional[Stat]]:
+        """Paths (relative to root) that were added, modified or deleted since the cache was last updated.
+
+        Returns the current stat of each, None if it was deleted, to pass to `update` once the changes are
+        committed. Without a cache, every path counts as changed.
+        """
+        previous = self._load()
+        changed = {}
+        for path in paths:
+            stat = _stat(root / path)
+            if previous is None or previous.get(path) != stat:
+                changed[path] = stat
+        return changed
+
+    def update(self, stats: dict[str, Optional[Stat]]) -> None:
+        """Record the stats of committed files, as returned by `changed`."""
+        cached = self._load() or {}
+        for path, stat in stats.items():
+            if stat is None:
+                cached.pop(path, None)
+            else:
+                cached[path] = (stat[0], stat[1])
+        self._save(cached)
+
+    def _load(self) -> Optional[dict[str, Stat]]:
+        try:
+            with open(self.path) as f:
+                return {path: (stat[0], stat[1]) for path, stat in json.load(f).items()}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, IndexError, AttributeError) as e:
+            logger.warning("Ignoring unreadable stat cache at %s: %s", self.path, e)
+            return None
+
+    def _save(self, stats: dict[str, Stat]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f)
+            # Like git's racy index entries: a file modified in the same timestamp tick as the cache is written
+            # could change again without its mtime or size changing, so leave it out to count as changed next time.
+            written = tmp_path.stat().st_mtime_ns
+            racy = {path for path, (mtime, _) in stats.items() if mtime >= written}
+            if racy:
+                with open(tmp_path, "w") as f:
+                    json.dump({path: stat for path, stat in stats.items() if path not in racy}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write stat cache to %s: %s", self.path, e)
+
+
+def imported_files(root: Path) -> list[str]:
+    """Source files inside `root` of the modules imported so far, relative to `root`.
+
+    Installed packages are skipped, even if the environment lives inside the repository (e.g. `.venv`).
+    """
+    root = root.resolve()
+    environments = {Path(prefix).resolve() for prefix in (sys.prefix, sys.base_prefix, sys.exec_prefix)}
+    files = set()
+    for module in list(sys.modules.values()):
+        file = getattr(module, "__file__", None)
+        if not file:
+            continue
+        path = Path(file).resolve()
+        if (
+            path.suffix == ".py"
+            and path.is_relative_to(root)
+            and not any(path.is_relative_to(environment) for environment in environments)
+        ):
+            files.add(path.relative_to(root).as_posix())
+    return sorted(files)
+
+
+def _stat(path: Path) -> Optional[Stat]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,157 @@
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+from pydantic import BaseModel
+
+from logis.config import SWEEP_ANNOTATION
+from logis.domain.experiment import ExperimentRun
+from logis.error import LogisError
+
+logger = logging.getLogger(__name__)
+
+
+def sweep(
+    experiment: Callable[..., Any],
+    space: Mapping[str, Sequence[Any]],
+    workers: Optional[int] = None,
+    samples: Optional[int] = None,
+    seed: int = 0,
+    skip_existing: bool = True,
+) -> list[ExperimentRun]:
+    """Run a @commit-decorated experiment over a parameter space, across a pool of worker processes.
+
+    Every combination of the values in `space` (a grid) is passed to the experiment as keyword arguments,
+    e.g. `{"lr": [0.1, 0.01], "hypers": [Hypers(...), ...]}`. With `samples`, only that many combinations
+    are drawn at random instead.
+
+    Runs execute in the workers, while the commits are all made from this process as results come in, so
+    workers never wait on each other for the repository. Each run records its configuration in the
+    `sweep` annotation, and configurations the log already holds for this experiment are skipped, so an
+    interrupted sweep can simply be started again.
+
+    Workers are started with the fork server (or spawn) method, so the experiment has to be importable,
+    e.g. defined at the top level of a script that calls `sweep` under `if __name__ == "__main__":`.
+
+    Args:
+        experiment: A function decorated with `@logis.commit`
+        space: Values to try for each argument of the experiment
+        workers: Number of worker processes, defaults to one per CPU. With 1, runs execute in this process.
+        samples: Run this many random configurations instead of the whole grid
+        seed: Random seed for `samples`
+        skip_existing: Skip configurations that were already recorded
+
+    Returns:
+        The runs recorded, in the order they finished
+
+    Raises:
+        LogisError: If any run failed. The others are still recorded.
+    """
+    execute, record = getattr(experiment, "execute", None), getattr(experiment, "record", None)
+    if execute is None or record is None:
+        raise LogisError("sweep() needs a synchronous function decorated with @logis.commit")
+
+    configs = configurations(space, samples, seed)
+    if skip_existing:
+        recorded = _recorded_configs(experiment.__name__)
+        skipped = [config for config in configs if _config_key(config) in recorded]
+        if skipped:
+            logger.info("Skipping %d configuration(s) already in the log", len(skipped))
+        configs = [config for config in configs if _config_key(config) not in recorded]
+    if not configs:
+        return []
+
+    runs: list[ExperimentRun] = []
+    failures: list[tuple[dict[str, Any], BaseException]] = []
+
+    def finish(config: dict[str, Any], run: ExperimentRun) -> None:
+        annotations = {**(run.annotations or {}), SWEEP_ANNOTATION: _config_json(config)}
+        run = run.model_copy(update={"annotations": annotations})
+        record(run)
+        runs.append(run)
+
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    if workers <= 1:
+        for config in configs:
+            try:
+                run = _execute(experiment, config)
+            except Exception as e:
+                logger.error("Run with %s failed: %s", config, e)
+                failures.append((config, e))
+                continue
+            finish(config, run)
+    else:
+        # Forking a process that runs threads can deadlock, so start workers from a fork server where there is one.
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures: dict[Future, dict[str, Any]] = {
+                executor.submit(_execute, experiment, config): config for config in configs
+            }
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    run = future.result()
+                except Exception as e:
+                    logger.error("Run with %s failed: %s", config, e)
+                    failures.append((config, e))
+                    continue
+                finish(config, run)
+
+    if failures:
+        config, error = failures[0]
+        raise LogisError(f"{len(failures)} of {len(configs)} run(s) failed, first with {config}") from error
+    return runs
+
+
+def configurations(
+    space: Mapping[str, Sequence[Any]], samples: Optional[int] = None, seed: int = 0
+) -> list[dict[str, Any]]:
+    """Every combination of the values in a parameter space, or `samples` of them drawn at random."""
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    if samples is not None and samples < len(grid):
+        grid = random.Random(seed).sample(grid, samples)
+    return grid
+
+
+def _execute(experiment: Callable[..., Any], config: dict[str, Any]) -> ExperimentRun:
+    # Runs in a worker process. Only the ExperimentRun is sent back, the experiment's return value may not
+    # be picklable.
+    _, run = experiment.execute(**config)  # type: ignore[attr-defined]
+    return run
+
+
+def _recorded_configs(experiment: str) -> set[str]:
+    """Keys of the sweep configurations already recorded for an experiment."""
+    from logis.domain.query import Query
+    from logis.service.query import QueryService
+    from logis.util.session import session
+
+    result = session()[QueryService].execute(Query.where("experiment", "==", json.dumps(experiment)))
+    return {
+        json.dumps(annotations[SWEEP_ANNOTATION], sort_keys=True)
+        for commit in result.commits
+        if SWEEP_ANNOTATION in (annotations := commit.experiment_run.annotations or {})
+    }
+
+
+def _config_json(config: dict[str, Any]) -> dict[str, Any]:
+    return json.loads(json.dumps(config, default=_jsonable))
+
+
+def _config_key(config: dict[str, Any]) -> str:
+    return json.dumps(_config_json(config), sort_keys=True)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
@@ -1,15 +1,24 @@
-from typing import Type, TypeVar
+from importlib import import_module
+from typing import Any, Callable, Iterable, Iterator, Optional, Type, TypeVar, get_args, get_type_hints
 
-from dishka import Provider, Scope, make_container, provide
+from dishka import FromComponent, Provider, Scope, make_container, provide
 from git import Repo
 
-from logis.service.codebase import CodebaseService
-from logis.service.experiment import ExperimentService
-from logis.service.git import GitService
-from logis.service.query import QueryService
-
 T = TypeVar("T")
 
+# Every service the container can provide. Their modules are only imported by a container that needs them.
+SERVICES = (
+    "logis.service.git.GitService",
+    "logis.service.index.IndexService",
+    "logis.service.experiment.ExperimentService",
+    "logis.service.codebase.CodebaseService",
+    "logis.service.query.QueryService",
+    "logis.service.aio.AsyncGitService",
+    "logis.service.aio.AsyncQueryService",
+    "logis.service.artifact.ArtifactService",
+    "logis.service.cache.ResultCache",
+)
+
 
 class GitProvider(Provider):
     @provide(scope=Scope.APP)
@@ -22,9 +31,20 @@ class GitProvider(Provider):
 
 
 class DI:
-    def __init__(self):
+    def __init__(self, services: Optional[Iterable[type]] = None):
+        """
+        Args:
+            services: Only provide these services and the ones they depend on, so the modules of the others
+                aren't imported. Defaults to every service in SERVICES.
+        """
+        self._services = list(services) if services is not None else [_import(path) for path in SERVICES]
         self._container = make_container(self.services, self.git)
 
+    @classmethod
+    def for_function(cls, fn: Callable[..., Any]) -> "DI":
+        """A container for the services a function asks for with FromDishka, e.g. a CLI command."""
+        return cls(_injected(fn))
+
     @property
     def container(self):
         return self._container
@@ -39,12 +59,36 @@ class DI:
     @property
     def services(self) -> Provider:
         provider = Provider(scope=Scope.APP)
-        provider.provide(GitService)
-        provider.provide(ExperimentService)
-        provider.provide(CodebaseService)
-        provider.provide(QueryService)
+        for service in _with_dependencies(self._services):
+            provider.provide(service)
 
         return provider
 
     def __getitem__(self, item: Type[T]) -> T:
         return self._container.get(item)
+
+
+def _import(path: str) -> type:
+    module, _, name = path.rpartition(".")
+    return getattr(import_module(module), name)
+
+
+def _injected(fn: Callable[..., Any]) -> list[type]:
+    """The services a function's FromDishka parameters ask for."""
+    marker = type(FromComponent())
+    hints = get_type_hints(fn, include_extras=True).values()
+    return [args[0] for args in map(get_args, hints) if any(isinstance(arg, marker) for arg in args[1:])]
+
+
+def _with_dependencies(services: Iterable[type]) -> Iterator[type]:
+    """The services, and the services their constructors take, recursively. Each one once."""
+    seen: set[type] = set()
+    pending = list(services)
+    while pending:
+        service = pending.pop()
+        if service in seen or service is Repo:
+            continue
+        seen.add(service)
+        yield service
+        hints = get_type_hints(service.__init__)
+        pending += [hint for name, hint in hints.items() if name != "return" and isinstance(hint, type)]
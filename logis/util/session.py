@@ -0,0 +1,116 @@
+import atexit
+import os
+import threading
+
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Type, TypeVar
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+    from logis.util.di import DI
+
+T = TypeVar("T")
+
+
+class Session:
+    """Services shared by every run of @commit-decorated functions in a process.
+
+    Building the DI container opens the repository, which reads its config, and starts git's persistent
+    `cat-file` processes on first use. A session does this once, for the working directory it's opened in,
+    and keeps the repository, those processes, the warm index and the console for the following runs.
+
+    Use `session()` to get the current one. It's replaced when the working directory changes, and a forked
+    child starts its own instead of sharing the parent's git processes. Close it with `close_session()`, or
+    use it as a context manager; it's closed when the process exits otherwise.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._di: Optional["DI"] = None
+
+    @property
+    def di(self) -> "DI":
+        if self._di is None:
+            # Imported here, building the container pulls in every service.
+            from logis.util.di import DI
+
+            self._di = DI()
+        return self._di
+
+    @cached_property
+    def console(self) -> "Console":
+        from rich.console import Console
+
+        return Console()
+
+    def __getitem__(self, item: Type[T]) -> T:
+        return self.di[item]
+
+    def close(self) -> None:
+        """Stop the git processes and release the repository. They're set up again if the session is used."""
+        if self._di is None:
+            return
+        from git import Repo
+
+        di, self._di = self._di, None
+        di[Repo].close()
+        di.container.close()
+
+    def detach(self) -> None:
+        """Forget the git processes without stopping them, in a forked child that doesn't own them."""
+        if self._di is None:
+            return
+        from git import Repo
+
+        di, self._di = self._di, None
+        git = di[Repo].git
+        for command in (git.cat_file_all, git.cat_file_header):
+            if command is not None:
+                command.proc = None  # Otherwise they're killed when garbage collected
+        git.cat_file_all = git.cat_file_header = None
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()  # Reopened if it's used again
+
+
+_session: Optional[Session] = None
+_lock = threading.Lock()
+
+
+def session() -> Session:
+    """The session for the current working directory, opening one if needed. See Session."""
+    global _session
+    directory = Path.cwd()
+    with _lock:
+        if _session is not None and _session.directory != directory:
+            _session.close()
+            _session = None
+        if _session is None:
+            _session = Session(directory)
+        return _session
+
+
+def close_session() -> None:
+    """Close the current session, if any. The next `session()` opens a new one."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _after_fork_in_child() -> None:
+    global _session, _lock
+    _lock = threading.Lock()  # It may have been held by another thread of the parent
+    if _session is not None:
+        _session.detach()
+        _session = None
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(close_session)
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import git
+import pytest
+
+import logis
+
+ROOT = Path(logis.__file__).parents[1]
+CLI = "from logis.cli.app import start; start()"
+
+# Total import time budgets in milliseconds, as reported by `python -X importtime`. These are a few times
+# the current cost, to catch an eager import of a heavy dependency rather than small regressions. A query
+# has to import dishka, git, pydantic and rich, so its budget leaves less room: about 1.5 times its cost.
+IMPORT_LOGIS_BUDGET = 100
+CLI_HELP_BUDGET = 250
+CLI_QUERY_BUDGET = 650
+
+# Dependencies that must stay out of `import logis` and `logis --help`.
+HEAVY_MODULES = {"dishka", "git", "jmespath", "numpy", "pydantic", "rich"}
+
+
+def import_time(code: str, *args: str, cwd: Path = ROOT) -> tuple[float, set[str]]:
+    """Run Python code with `-X importtime`, returning the total import time (ms) and the modules imported."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, *args],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, modules = 0, set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        total += int(self_us)
+        modules.add(name.strip())
+    return total / 1000, modules
+
+
+def top_level(modules: set[str]) -> set[str]:
+    return {module.split(".")[0] for module in modules}
+
+
+@pytest.fixture
+def repo(repo: git.Repo) -> Path:
+    metadata = '{"experiment": "test", "hyperparameters": {"lr": 0.1}, "metrics": {"accuracy": 0.9}}'
+    repo.index.commit(f"exp: run test\n\n---\n\n{metadata}")
+    return Path(repo.working_tree_dir)
+
+
+def test_import_logis_is_cheap():
+    total, modules = import_time("import logis")
+
+    assert not top_level(modules) & HEAVY_MODULES
+    assert total < IMPORT_LOGIS_BUDGET
+
+
+def test_cli_help_is_cheap():
+    total, modules = import_time(CLI, "--help")
+
+    assert not top_level(modules) & HEAVY_MODULES
+    assert total < CLI_HELP_BUDGET
+
+
+def test_cli_query_import_budget(repo: Path):
+    total, modules = import_time(CLI, "query", "--experiment", "test", cwd=repo)
+
+    assert "logis.service.query" in modules
+    assert "numpy" not in modules  # Only needed for columnar queries over large logs
+    # Nor the services and commands a query doesn't use.
+    assert not {"anot", "logis.service.codebase", "logis.service.aio", "logis.cli.commands.sweep"} & modules
+    assert total < CLI_QUERY_BUDGET
@@ -0,0 +1,31 @@
+from pathlib import Path
+from typing import Iterator
+
+import git
+import pytest
+
+from logis.util.session import close_session
+
+# Toggles read from the environment, cleared so they don't leak in from the shell running the tests.
+LOGIS_ENV = (
+    "LOGIS_DRY_RUN",
+    "LOGIS_BATCH",
+    "LOGIS_BACKGROUND",
+    "LOGIS_NO_CACHE",
+    "LOGIS_NO_INDEX",
+    "LOGIS_STORAGE",
+    "LOGIS_ENCODING",
+)
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[git.Repo]:
+    """An empty repository in `tmp_path`, which is made the working directory."""
+    repo = git.Repo.init(tmp_path)
+    repo.config_writer().set_value("user", "name", "Test User").release()
+    repo.config_writer().set_value("user", "email", "test@example.com").release()
+    monkeypatch.chdir(tmp_path)
+    for name in LOGIS_ENV:
+        monkeypatch.delenv(name, raising=False)
+    yield repo
+    close_session()  # Stops the git processes of @commit runs in it
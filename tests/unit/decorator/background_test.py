@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import git
+
+import logis
+
+
+@logis.commit(background=True)
+def train(run: logis.Run, lr: float):
+    Path("model.txt").write_text(f"lr={lr}")
+    run.set_hyperparameters({"lr": lr})
+    run.set_metrics({"accuracy": 1 - lr})
+
+
+def test_background_commits_snapshot_the_tree_at_the_end_of_the_run(repo: git.Repo):
+    for lr in (0.1, 0.2, 0.3):
+        train(lr)
+        Path("model.txt").write_text("overwritten by the next run")
+    logis.flush()
+
+    commits = list(repo.iter_commits())
+    assert len(commits) == 3
+    assert [commit.tree["model.txt"].data_stream.read() for commit in commits] == [b"lr=0.3", b"lr=0.2", b"lr=0.1"]
+
+
+def test_background_commits_from_env(repo: git.Repo, monkeypatch):
+    monkeypatch.setenv("LOGIS_BACKGROUND", "1")
+    with logis.batch():
+        train(0.1)
+        train(0.2)
+    logis.flush()
+
+    [commit] = list(repo.iter_commits())
+    assert commit.tree["model.txt"].data_stream.read() == b"lr=0.2"
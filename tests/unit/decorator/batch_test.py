@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import git
+import pytest
+
+import logis
+
+from logis.decorator import _env_batch
+from logis.service.git import GitService
+from logis.service.index import IndexService
+
+
+@logis.commit
+def train(run: logis.Run, lr: float):
+    run.set_hyperparameters({"lr": lr})
+    run.set_metrics({"accuracy": 1 - lr})
+
+
+def test_batch_records_runs_in_one_commit(repo: git.Repo):
+    with logis.batch(template="sweep of {count} {experiments} runs"):
+        for lr in (0.1, 0.2, 0.3):
+            train(lr)
+
+    [commit] = list(repo.iter_commits())
+    assert commit.summary == "exp: sweep of 3 train runs"
+    records = IndexService(GitService(repo)).experiment_records()
+    assert [record.metadata["hyperparameters"]["lr"] for record in records] == [0.1, 0.2, 0.3]
+
+
+def test_batch_keeps_finished_runs_on_error(repo: git.Repo):
+    with pytest.raises(RuntimeError):
+        with logis.batch():
+            train(0.1)
+            raise RuntimeError("crashed")
+
+    assert len(list(repo.iter_commits())) == 1
+
+
+def test_batch_size_from_env(repo: git.Repo, monkeypatch):
+    monkeypatch.setenv("LOGIS_BATCH", "2")
+    _env_batch.cache_clear()
+
+    for lr in (0.1, 0.2, 0.3):
+        train(lr)
+    assert len(list(repo.iter_commits())) == 1
+
+    _env_batch("2").flush()  # Normally done at exit
+    assert [commit.summary for commit in repo.iter_commits()] == ["exp: batch of 1 runs", "exp: batch of 2 runs"]
+    _env_batch.cache_clear()
+
+
+SCRIPT = """
+import logis
+
+@logis.commit
+def train(run, lr):
+    run.set_hyperparameters({"lr": lr})
+    run.set_metrics({"accuracy": 1 - lr})
+
+for i in range(int(RUNS)):
+    train(i / 10)
+"""
+
+
+def run_script(repo: git.Repo, runs: int, batch_size: int) -> subprocess.CompletedProcess:
+    """Run experiments in a new interpreter with LOGIS_BATCH set, so the last batch is committed at exit."""
+    root = Path(logis.__file__).parents[1]
+    return subprocess.run(
+        [sys.executable, "-c", SCRIPT.replace("RUNS", str(runs))],
+        cwd=repo.working_dir,
+        env={**os.environ, "PYTHONPATH": str(root), "LOGIS_BATCH": str(batch_size)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_batch_from_env_is_committed_at_exit(repo: git.Repo):
+    process = run_script(repo, runs=3, batch_size=10)
+
+    assert "Traceback" not in process.stderr
+    [commit] = list(repo.iter_commits())
+    assert commit.summary == "exp: batch of 3 runs"
+
+
+def test_batch_from_env_commits_full_batches_then_the_rest_at_exit(repo: git.Repo):
+    run_script(repo, runs=5, batch_size=2)
+
+    summaries = [commit.summary for commit in repo.iter_commits()]
+    assert summaries == ["exp: batch of 1 runs", "exp: batch of 2 runs", "exp: batch of 2 runs"]
+    records = IndexService(GitService(repo)).experiment_records()
+    assert sorted(record.metadata["hyperparameters"]["lr"] for record in records) == [0.0, 0.1, 0.2, 0.3, 0.4]
@@ -0,0 +1,136 @@
+import asyncio
+
+from datetime import timedelta
+from pathlib import Path
+
+import git
+import pytest
+
+from pydantic import BaseModel
+
+import logis
+
+from logis.config import CACHE_ANNOTATION
+from logis.domain.git import StageStrategy
+from logis.service.git import GitService
+from logis.service.index import IndexService
+
+
+@pytest.fixture
+def repo(repo: git.Repo) -> git.Repo:
+    Path(repo.working_tree_dir, "train.py").write_text("LAYERS = 2\n")
+    return repo
+
+
+calls: list[float] = []
+
+
+@logis.commit(cache=True)
+def train(run: logis.Run, lr: float):
+    calls.append(lr)
+    run.set_hyperparameters({"lr": lr})
+    run.set_metrics({"accuracy": 1 - lr})
+
+
+class Hypers(BaseModel):
+    lr: float
+
+
+class Metrics(BaseModel):
+    accuracy: float
+
+
+@logis.commit(implicit=True, cache=True, cache_ttl=timedelta(hours=1))
+def evaluate(hypers: Hypers) -> Metrics:
+    calls.append(hypers.lr)
+    return Metrics(accuracy=1 - hypers.lr)
+
+
+@logis.commit(implicit=True, cache=True, cache_ttl=timedelta(0))
+def evaluate_uncached(hypers: Hypers) -> Metrics:
+    calls.append(hypers.lr)
+    return Metrics(accuracy=1 - hypers.lr)
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+def test_unchanged_runs_are_reused(repo: git.Repo):
+    train(0.1)
+    assert train(lr=0.1) == {"accuracy": 0.9}
+    assert calls == [0.1]
+
+    [record] = IndexService(GitService(repo)).experiment_records()
+    assert CACHE_ANNOTATION in record.metadata["annotations"]
+
+
+def test_changed_arguments_or_code_run_again(repo: git.Repo):
+    train(0.1)
+    train(0.2)
+    Path(repo.working_tree_dir, "train.py").write_text("LAYERS = 3\n")
+    train(0.1)
+
+    assert calls == [0.1, 0.2, 0.1]
+    assert len(list(repo.iter_commits())) == 3
+
+
+def test_force_rerun(repo: git.Repo, monkeypatch):
+    train(0.1)
+    monkeypatch.setenv("LOGIS_NO_CACHE", "1")
+    train(0.1)
+
+    assert calls == [0.1, 0.1]
+
+
+def test_reused_metrics_have_the_return_type(repo: git.Repo):
+    evaluate(hypers=Hypers(lr=0.1))
+    assert evaluate(hypers=Hypers(lr=0.1)) == Metrics(accuracy=0.9)
+
+    assert calls == [0.1]
+
+
+def test_expired_runs_are_not_reused(repo: git.Repo):
+    evaluate_uncached(hypers=Hypers(lr=0.1))
+    evaluate_uncached(hypers=Hypers(lr=0.1))
+
+    assert calls == [0.1, 0.1]
+
+
+@logis.commit(cache=True, strategy=StageStrategy.CHANGED)
+def train_changed(run: logis.Run, lr: float):
+    calls.append(lr)
+    run.set_hyperparameters({"lr": lr})
+    run.set_metrics({"accuracy": 1 - lr})
+
+
+def test_fingerprint_leaves_changed_files_to_the_commit(repo: git.Repo):
+    train_changed(0.1)
+    Path(repo.working_tree_dir, "train.py").write_text("LAYERS = 3\n")
+    train_changed(0.1)
+
+    first, second = reversed(list(repo.iter_commits()))
+    assert "train.py" in first.stats.files
+    assert second.stats.files == {"train.py": second.stats.files["train.py"]}
+    assert calls == [0.1, 0.1]
+
+
+@logis.commit(cache=True)
+async def train_async(run: logis.Run, lr: float):
+    await asyncio.sleep(0)
+    calls.append(lr)
+    run.set_hyperparameters({"lr": lr})
+    run.set_metrics({"accuracy": 1 - lr})
+
+
+def test_concurrent_async_runs_are_reused(repo: git.Repo):
+    async def sweep() -> list:
+        runs = (train_async(lr) for lr in (0.1, 0.2, 0.3))
+        return await asyncio.wait_for(asyncio.gather(*runs), timeout=30)
+
+    asyncio.run(sweep())
+    asyncio.run(sweep())
+
+    assert sorted(calls) == [0.1, 0.2, 0.3]
+    assert len(list(repo.iter_commits())) == 3
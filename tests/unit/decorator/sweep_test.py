@@ -0,0 +1,55 @@
+import git
+import pytest
+
+import logis
+
+from logis.error import LogisError
+from logis.service.git import GitService
+from logis.service.index import IndexService
+
+
+@logis.commit
+def train(run: logis.Run, lr: float, layers: int):
+    if lr < 0:
+        raise ValueError("negative learning rate")
+    run.set_hyperparameters({"lr": lr, "layers": layers})
+    run.set_metrics({"accuracy": 1 - lr / layers})
+
+
+def recorded(repo: git.Repo) -> list[dict]:
+    return [record.metadata["annotations"]["sweep"] for record in IndexService(GitService(repo)).experiment_records()]
+
+
+def test_sweep_records_each_configuration_once(repo: git.Repo):
+    runs = logis.sweep(train, {"lr": [0.1, 0.2], "layers": [1, 2]}, workers=1)
+
+    assert len(runs) == 4
+    assert sorted(map(str, recorded(repo))) == sorted(
+        str({"lr": lr, "layers": layers}) for lr in (0.1, 0.2) for layers in (1, 2)
+    )
+
+    # Running the sweep again only runs the new configurations.
+    runs = logis.sweep(train, {"lr": [0.1, 0.2, 0.3], "layers": [1, 2]}, workers=1)
+    assert sorted((run.hyperparameters["lr"], run.hyperparameters["layers"]) for run in runs) == [(0.3, 1), (0.3, 2)]
+    assert len(recorded(repo)) == 6
+
+
+def test_sweep_across_worker_processes(repo: git.Repo):
+    runs = logis.sweep(train, {"lr": [0.1, 0.2, 0.3], "layers": [1]}, workers=2)
+
+    assert sorted(run.hyperparameters["lr"] for run in runs) == [0.1, 0.2, 0.3]
+    assert len(list(repo.iter_commits())) == 3
+
+
+def test_failed_runs_dont_stop_the_sweep(repo: git.Repo):
+    with pytest.raises(LogisError, match="1 of 3"):
+        logis.sweep(train, {"lr": [0.1, -1, 0.2], "layers": [1]}, workers=1)
+
+    assert len(recorded(repo)) == 2
+
+
+def test_random_samples(repo: git.Repo):
+    runs = logis.sweep(train, {"lr": [0.1, 0.2, 0.3, 0.4], "layers": [1, 2, 3]}, samples=5, workers=1)
+
+    assert len(runs) == 5
+    assert len({(run.hyperparameters["lr"], run.hyperparameters["layers"]) for run in runs}) == 5
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from logis.domain.query import Query, compile_plan
+
+np = pytest.importorskip("numpy")
+
+from logis.domain.columnar import ColumnarLog  # noqa: E402
+
+
+@pytest.fixture
+def runs() -> list[dict]:
+    rng = random.Random(0)
+    runs = []
+    for i in range(200):
+        run = {
+            "experiment": rng.choice(["a", "b"]),
+            "metrics": {"accuracy": rng.random(), "loss": rng.choice([rng.random(), None])},
+            "hyperparameters": {"lr": rng.choice([0, 1, 0.1]), "opt": rng.choice(["adam", "sgd", True])},
+        }
+        if i % 7 == 0:
+            del run["metrics"]["accuracy"]
+        runs.append(run)
+    return runs
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        Query.where("metrics.accuracy", ">", 0.5),
+        Query.where("metrics.loss", "<=", 0.2),
+        Query.where("hyperparameters.lr", "==", 1),
+        Query.where("metrics.accuracy", ">", 0.5) & Query.where("experiment", "==", '"a"'),
+        Query.from_expression("[?metrics.missing != `1` || !(metrics.accuracy < `0.3`)]"),
+        Query.from_expression("[?metrics.loss == `null`]"),
+        Query.from_expression("[?metrics.accuracy > 'a']"),
+    ],
+)
+def test_mask_matches_row_predicate(runs: list[dict], query: Query):
+    plan = query.plan()
+    log = ColumnarLog.from_runs([str(i) for i in range(len(runs))], runs)
+
+    mask = log.mask(plan)
+
+    assert mask is not None
+    assert mask.tolist() == [plan.matches(run) for run in runs]
+
+
+def test_unvectorizable_conditions_fall_back(runs: list[dict]):
+    log = ColumnarLog.from_runs([str(i) for i in range(len(runs))], runs)
+
+    # Mixed string/bool column ordering, and comparisons against nested objects.
+    assert log.mask(compile_plan("[?hyperparameters.opt > 'b']")) is None
+    assert log.mask(compile_plan("[?metrics == `{}`]")) is None
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+from logis.domain.experiment import (
+    ZLIB_METADATA_HEADER,
+    ExperimentBatch,
+    ExperimentRun,
+    MetadataEncoding,
+    SemanticMessage,
+)
+from logis.domain.git import Commit, ExperimentRecord
+
+
+def make_commit(message: str) -> Commit:
+    return Commit(sha="abc123", message=message, date=datetime(2024, 1, 1))
+
+
+def test_parse_metadata_round_trips_rendered_message():
+    run = ExperimentRun(experiment="test", hyperparameters={"lr": 0.1}, metrics={"accuracy": 0.9})
+    message = run.as_commit_message(template="run {experiment}").render()
+
+    assert ExperimentRun.parse_metadata(message) == run.model_dump(mode="json")
+
+
+def test_runs_are_timestamped_when_created():
+    before = datetime.now()
+    run = ExperimentRun(experiment="test", hyperparameters={}, metrics={})
+
+    assert before <= run.timestamp <= datetime.now()
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "feat: not an experiment",
+        "exp: no metadata",
+        "exp: bad json\n\n---\n\n{not json",
+        'exp: not a run\n\n---\n\n{"experiment": "test"}',
+        "exp: two separators\n\n---\n\n{}\n---\n",
+    ],
+)
+def test_parse_metadata_rejects_non_experiments(message: str):
+    assert ExperimentRun.parse_metadata(message) is None
+    assert ExperimentRecord.from_commit(make_commit(message)) == []
+
+
+def test_record_validates_lazily(mocker):
+    validate = mocker.spy(ExperimentRun, "model_validate")
+    message = 'exp: test\n\n---\n\n{"experiment": "test", "hyperparameters": {}, "metrics": {"accuracy": 0.9}}'
+
+    [record] = ExperimentRecord.from_commit(make_commit(message))
+
+    assert record.metadata["metrics"] == {"accuracy": 0.9}
+    validate.assert_not_called()
+
+    commit = record.to_commit()
+    assert commit.experiment_run.metrics == {"accuracy": 0.9}
+    assert record.experiment_run is commit.experiment_run
+    validate.assert_called_once()
+
+
+def test_batch_commit_holds_one_record_per_run():
+    runs = [
+        ExperimentRun(experiment=name, hyperparameters={"lr": lr}, metrics={"accuracy": lr * 10})
+        for name, lr in [("a", 0.01), ("b", 0.02), ("a", 0.03)]
+    ]
+    message = ExperimentBatch(runs=runs).as_commit_message(template="{count} runs of {experiments}").render()
+
+    records = ExperimentRecord.from_commit(make_commit(message))
+
+    assert message.startswith("exp: 3 runs of a, b\n")
+    assert [record.metadata for record in records] == [run.model_dump(mode="json") for run in runs]
+    assert [record.to_commit().experiment_run.experiment for record in records] == ["a", "b", "a"]
+    assert {record.sha for record in records} == {"abc123"}
+
+
+@pytest.mark.parametrize("runs", ["[]", '[{"experiment": "a"}]', '{"experiment": "a"}'])
+def test_malformed_batches_are_rejected(runs: str):
+    assert ExperimentRun.parse_metadata(f'exp: batch\n\n---\n\n{{"runs": {runs}}}') is None
+
+
+def test_detach_metadata():
+    run = ExperimentRun(experiment="train", hyperparameters={}, metrics={"loss": 0.1})
+    message = run.as_commit_message(template="run {experiment}").render()
+
+    stripped, metadata = ExperimentRun.detach_metadata(message)
+
+    assert stripped == "exp: run train"
+    assert metadata == run.model_dump(mode="json")
+    assert ExperimentRun.detach_metadata("fix: typo") == ("fix: typo", None)
+
+
+@pytest.mark.parametrize("encoding", list(MetadataEncoding))
+def test_metadata_encodings_are_detected(encoding: MetadataEncoding):
+    run = ExperimentRun(experiment="curve", hyperparameters={}, metrics={"loss": [1 / (i + 1) for i in range(100)]})
+    message = run.as_commit_message(template="run {experiment}").render(encoding)
+
+    assert ExperimentRun.parse_metadata(message) == run.model_dump(mode="json")
+    assert SemanticMessage.from_commit(make_commit(message)).metadata == run.model_dump(mode="json")
+
+
+def test_corrupt_compressed_metadata_is_ignored():
+    message = f"exp: run\n\n---\n\n{ZLIB_METADATA_HEADER}\nbm90IHpsaWI="
+
+    assert ExperimentRun.parse_metadata(message) is None
+    assert ExperimentRecord.from_commit(make_commit(message)) == []
@@ -0,0 +1,81 @@
+import jmespath
+import pytest
+
+from logis.domain.query import Aggregate, AggregateState, Query, compile_plan
+
+ROWS = [
+    {"experiment": "a", "metrics": {"accuracy": 0.9, "loss": 0.1}, "hyperparameters": {"lr": 0.01, "opt": "adam"}},
+    {"experiment": "b", "metrics": {"accuracy": 0.7, "loss": 0.3}, "hyperparameters": {"lr": 0.1, "opt": "sgd"}},
+    {"experiment": "a", "metrics": {"accuracy": 1, "flag": True}, "hyperparameters": {"lr": 0, "opt": None}},
+    {"experiment": "c", "metrics": {}, "hyperparameters": {}},
+]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "[?metrics.accuracy > `0.8`]",
+        "[?metrics.accuracy <= `0.9`]",
+        "[?`0.8` < metrics.accuracy]",
+        "[?experiment == 'a']",
+        '[?experiment != `"a"`]',
+        "[?metrics.flag == `1`]",
+        "[?hyperparameters.lr == `0`]",
+        "[?hyperparameters.opt > 'b']",
+        "[?metrics.accuracy > `0.8` && hyperparameters.lr < `0.05`]",
+        "[?metrics.loss > `0.2` || experiment == 'c']",
+        "[?!(metrics.accuracy > `0.8`)]",
+        "[?metrics.flag]",
+    ],
+)
+def test_planned_predicates_match_jmespath(expression: str):
+    plan = compile_plan(expression)
+
+    assert plan.planned
+    assert [row for row in ROWS if plan.matches(row)] == jmespath.search(expression, ROWS)
+
+
+def test_unplannable_filter_falls_back_to_jmespath_per_record():
+    plan = compile_plan("[?contains(experiment, 'a')]")
+
+    assert plan.is_row_filter and not plan.planned
+    assert [row for row in ROWS if plan.matches(row)] == [ROWS[0], ROWS[2]]
+
+
+def test_non_filter_expression_searches_all_records():
+    plan = compile_plan("sort_by([?metrics.accuracy], &metrics.accuracy)")
+
+    assert not plan.is_row_filter
+    assert plan.search(ROWS) == [ROWS[1], ROWS[0], ROWS[2]]
+
+
+def test_plans_are_cached_by_expression():
+    assert Query.where("metrics.accuracy", ">", 0.5).plan() is Query.where("metrics.accuracy", ">", 0.5).plan()
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("count", None),
+        ("count:metrics.accuracy", 3),
+        ("sum:metrics.accuracy", 2.6),
+        ("mean:metrics.accuracy", 2.6 / 3),
+        ("min:metrics.accuracy", 0.7),
+        ("max:metrics.accuracy", 1),
+        ("p50:metrics.accuracy", 0.9),
+        ("p75:metrics.accuracy", 0.95),
+        ("p50:metrics.missing", None),
+    ],
+)
+def test_aggregates_skip_non_numeric_values(spec: str, expected):
+    state = AggregateState(Aggregate.parse(spec))
+    for row in ROWS:
+        state.add(row)
+
+    assert state.result() == pytest.approx(expected if spec != "count" else len(ROWS))
+
+
+@pytest.mark.parametrize("spec", ["mean", "median:metrics.loss", "p101:metrics.loss"])
+def test_invalid_aggregates(spec: str):
+    with pytest.raises(ValueError):
+        Aggregate.parse(spec)
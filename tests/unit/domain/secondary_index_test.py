@@ -0,0 +1,63 @@
+import random
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from logis.domain.git import ExperimentRecord
+from logis.domain.index import SecondaryIndexes
+from logis.domain.query import Query
+
+
+@pytest.fixture
+def records() -> list[ExperimentRecord]:
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    records = []
+    for i in range(100):
+        metadata = {
+            "experiment": rng.choice(["a", "b", "c"]),
+            "hyperparameters": {"lr": rng.choice([0.1, 0.01])},
+            "metrics": {"accuracy": rng.choice([rng.random(), None, True])},
+            "timestamp": (start + timedelta(hours=i)).isoformat(),
+        }
+        records.append(ExperimentRecord(sha=f"{i:040x}", date=start, message="", metadata=metadata))
+    return records
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        Query.where("experiment", "==", '"a"'),
+        Query.where("timestamp", ">=", '"2024-01-03T00:00:00"'),
+        Query.where("metrics.accuracy", ">", 0.5),
+        Query.where("metrics.accuracy", "==", 1),
+        Query.where("experiment", "==", '"b"') & Query.where("metrics.accuracy", "<=", 0.3),
+        Query.where("experiment", "==", '"c"') & Query.from_expression("[?hyperparameters.lr != `0.1`]"),
+    ],
+)
+def test_candidates_cover_all_matches(records: list[ExperimentRecord], query: Query):
+    plan = query.plan()
+    indexes = SecondaryIndexes(records)
+
+    candidates = indexes.candidates(plan)
+
+    assert candidates is not None
+    assert len(candidates) < len(records)
+    matches = [i for i, record in enumerate(records) if plan.matches(record.metadata)]
+    assert [i for i in candidates if plan.matches(records[i].metadata)] == matches
+
+
+def test_unindexable_filters_scan_everything(records: list[ExperimentRecord]):
+    indexes = SecondaryIndexes(records)
+
+    assert indexes.candidates(Query.where("experiment", ">", '"a"').plan()) is None
+    assert indexes.candidates(Query.from_expression("[?experiment == 'a' || experiment == 'b']").plan()) is None
+
+
+def test_top_orders_by_numeric_value(records: list[ExperimentRecord]):
+    top = SecondaryIndexes(records).top(("metrics", "accuracy"))
+
+    values = [records[i].metadata["metrics"]["accuracy"] for i in top]
+    assert values == sorted((v for v in values if v is not True), reverse=True)
+    assert len(values) == sum(isinstance(r.metadata["metrics"]["accuracy"], float) for r in records)
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+from unittest.mock import Mock
+
+import git
+import pytest
+
+from logis.decorator import Run, commit
+from logis.domain.query import Query, QueryResult
+from logis.service.aio import AsyncGitService, AsyncQueryService
+from logis.service.git import GitService
+from logis.service.query import QueryService
+
+
+@pytest.fixture
+def git_service():
+    service = Mock(spec=GitService)
+    service.should_commit.return_value = True
+    return service
+
+
+def test_commits_run_off_loop_one_at_a_time(git_service):
+    active, overlapped = 0, False
+    lock = threading.Lock()
+
+    def stage_and_commit(message: str, staging=None, wait=True):
+        nonlocal active, overlapped
+        with lock:
+            active += 1
+            overlapped |= active > 1
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+
+    git_service.stage_and_commit.side_effect = stage_and_commit
+    service = AsyncGitService(git_service)
+
+    async def main() -> int:
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.gather(*(service.stage_and_commit(f"exp: run {i}") for i in range(5)))
+        ticker.cancel()
+        return ticks
+
+    ticks = asyncio.run(main())
+
+    assert git_service.stage_and_commit.call_count == 5
+    assert not overlapped
+    assert ticks > 5  # The event loop kept running while git was busy
+
+
+def test_async_query_service():
+    query_service = Mock(spec=QueryService)
+    query = Query.where("metrics.accuracy", ">", 0.5)
+    query_service.execute.return_value = QueryResult(commits=[], query=query, num_searched=0)
+
+    result = asyncio.run(AsyncQueryService(query_service).execute(query, limit=1))
+
+    assert result.num_searched == 0
+    query_service.execute.assert_called_once_with(query, 1, None)
+
+
+def test_commit_decorator_on_async_function(git_service, mocker, monkeypatch):
+    monkeypatch.delenv("LOGIS_DRY_RUN", raising=False)
+    mocker.patch("logis.decorator._async_git_service", return_value=AsyncGitService(git_service))
+
+    @commit
+    async def experiment(run: Run, lr: float):
+        await asyncio.sleep(0)
+        run.set_hyperparameters({"lr": lr})
+        run.set_metrics({"accuracy": lr * 10})
+
+    async def main():
+        await asyncio.gather(*(experiment(lr) for lr in (0.01, 0.02, 0.03)))
+
+    asyncio.run(main())
+
+    messages = [call.args[0] for call in git_service.stage_and_commit.call_args_list]
+    assert len(messages) == 3
+    assert all(message.startswith("exp: run experiment") for message in messages)
+
+
+def test_concurrent_calls_share_the_repo_safely(repo: git.Repo):
+    for i in range(3):
+        repo.index.commit(f"exp: run {i}")
+    service = AsyncGitService(GitService(repo))
+
+    async def main() -> list:
+        calls = [*(service.head_sha() for _ in range(8)), service.get_all_commits()]
+        return await asyncio.wait_for(asyncio.gather(*calls), timeout=30)
+
+    *heads, commits = asyncio.run(main())
+
+    assert set(heads) == {repo.head.commit.hexsha}
+    assert len(commits) == 3
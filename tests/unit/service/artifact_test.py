@@ -0,0 +1,59 @@
+import git
+import pytest
+
+import logis
+
+from logis.domain.artifact import Artifact
+from logis.error import LogisError
+from logis.service.artifact import ArtifactService
+from logis.service.git import GitService
+from logis.service.index import IndexService
+
+np = pytest.importorskip("numpy")
+
+
+def test_arrays_are_stored_once_and_memory_mapped(repo: git.Repo):
+    service = ArtifactService(GitService(repo))
+    curve = np.linspace(1, 0, 1000, dtype=np.float32)
+
+    artifact = service.store(curve)
+    assert service.store(curve.copy()) == artifact
+    assert artifact.dtype == "float32" and artifact.shape == [1000]
+    assert len(list(service.directory.rglob("*.npy"))) == 1
+
+    loaded = service.load(artifact)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, curve)
+
+
+def test_object_arrays_are_rejected(repo: git.Repo):
+    with pytest.raises(LogisError):
+        ArtifactService(GitService(repo)).store(np.array([{"a": 1}], dtype=object))
+
+
+def test_missing_artifact(repo: git.Repo):
+    with pytest.raises(LogisError):
+        ArtifactService(GitService(repo)).load(Artifact(sha256="0" * 64, dtype="float64", shape=[1]))
+
+
+def test_run_arrays_are_referenced_from_metadata(repo: git.Repo, mocker):
+    @logis.commit
+    def train(run: logis.Run, epochs: int):
+        run.set_hyperparameters({"epochs": epochs})
+        run.set_metrics({"final_loss": 0.1})
+        run.set_artifacts({"loss": np.linspace(1, 0.1, epochs), "confusion": np.eye(3, dtype=np.int64)})
+
+    train(100)
+
+    git_service = GitService(repo)
+    [record] = IndexService(git_service).experiment_records()
+    assert set(record.metadata["artifacts"]) == {"loss", "confusion"}
+    assert len(repo.head.commit.message) < 2000  # Only references, not the arrays
+
+    service = ArtifactService(git_service)
+    load = mocker.spy(service, "load")
+    arrays = service.arrays(record.experiment_run)
+    assert sorted(arrays) == ["confusion", "loss"]
+    load.assert_not_called()
+    np.testing.assert_array_equal(arrays["confusion"], np.eye(3))
+    load.assert_called_once()
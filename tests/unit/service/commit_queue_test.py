@@ -0,0 +1,211 @@
+import multiprocessing
+import threading
+
+from pathlib import Path
+
+import git
+import pytest
+
+from logis.domain.git import Staging
+from logis.error import CommitConflictError, LogisError
+from logis.service.commit_queue import BackgroundCommits, CommitQueue
+from logis.service.git import GitService
+from logis.service.lock import FileLock
+
+WORKERS = 8
+RUNS_PER_WORKER = 5
+
+
+def run_worker(path: str, worker: int) -> None:
+    git_service = GitService(git.Repo(path))
+    for run in range(RUNS_PER_WORKER):
+        (Path(path) / f"result-{worker}-{run}.txt").write_text(f"{worker} {run}")
+        git_service.stage_and_commit(f"exp: worker {worker} run {run}")
+
+
+def test_parallel_runs_commit_without_races(repo: git.Repo):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, args=(repo.working_dir, worker)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+
+    assert [process.exitcode for process in processes] == [0] * WORKERS
+    messages = [commit.message for commit in repo.iter_commits()]
+    assert sorted(messages) == sorted(
+        f"exp: worker {worker} run {run}" for worker in range(WORKERS) for run in range(RUNS_PER_WORKER)
+    )
+    # Every run's results were committed, and nothing is left behind.
+    committed = {blob.path for blob in repo.head.commit.tree.traverse()}
+    assert {f"result-{w}-{r}.txt" for w in range(WORKERS) for r in range(RUNS_PER_WORKER)} <= committed
+    assert not repo.is_dirty(untracked_files=True)
+    assert not list((Path(repo.git_dir) / "logis" / "queue").iterdir())
+
+
+def test_threads_share_the_queue(repo: git.Repo):
+    git_service = GitService(repo)
+    threads = [
+        threading.Thread(target=git_service.stage_and_commit, args=(f"exp: thread {i}",)) for i in range(WORKERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(list(repo.iter_commits())) == WORKERS
+
+
+def test_queued_messages_are_committed_by_the_lock_holder(repo: git.Repo):
+    queue = CommitQueue(GitService(repo))
+    queue._enqueue("exp: first", Staging(all=True))
+    queue._enqueue("exp: second", Staging(tracked=True))
+
+    queue.submit("exp: third", Staging())
+
+    assert [commit.message for commit in repo.iter_commits()] == ["exp: third", "exp: second", "exp: first"]
+
+
+def test_submit_times_out_while_lock_is_held(repo: git.Repo):
+    queue = CommitQueue(GitService(repo))
+    holder = FileLock(queue.lock.path)
+    assert holder.try_acquire()
+
+    with pytest.raises(LogisError):
+        queue.submit("exp: blocked", Staging(all=True), timeout=0.1)
+    holder.release()
+
+    assert not list(queue.directory.iterdir())
+    assert queue.lock.try_acquire()
+    queue.lock.release()
+
+
+def test_deferred_commit_is_applied_on_top_of_commits_made_since(repo: git.Repo):
+    git_service = GitService(repo)
+    work_tree = Path(repo.working_dir)
+    (work_tree / "result.txt").write_text("run")
+    base = git_service.head_sha()
+    tree = git_service.tree_sha(Staging(all=True))
+    (work_tree / "result.txt").write_text("changed after the run")
+
+    (work_tree / "notes.txt").write_text("committed in between")
+    repo.index.add(["notes.txt"])
+    repo.index.commit("manual commit")
+    git_service.commit_tree(tree, base, "exp: run")
+
+    head = repo.head.commit
+    assert head.message == "exp: run"
+    assert head.tree["result.txt"].data_stream.read() == b"run"
+    assert head.tree["notes.txt"].data_stream.read() == b"committed in between"
+    assert not repo.index.diff("HEAD")  # The index matches the commit
+
+
+def test_deferred_commit_conflicting_with_a_commit_made_since_is_refused(repo: git.Repo):
+    git_service = GitService(repo)
+    work_tree = Path(repo.working_dir)
+    (work_tree / "train.py").write_text("v0")
+    repo.index.add(["train.py"])
+    repo.index.commit("initial")
+    (work_tree / "train.py").write_text("v1")
+    base = git_service.head_sha()
+    tree = git_service.tree_sha(Staging(all=True))
+
+    (work_tree / "train.py").write_text("v2")
+    repo.index.add(["train.py"])
+    repo.index.commit("manual commit")
+    with pytest.raises(CommitConflictError, match="train.py"):
+        git_service.commit_tree(tree, base, "exp: run")
+
+    assert repo.head.commit.message == "manual commit"
+    assert repo.head.commit.tree["train.py"].data_stream.read() == b"v2"
+
+
+def test_deferred_commits_are_snapshotted_on_top_of_each_other(repo: git.Repo):
+    git_service = GitService(repo)
+    (Path(repo.working_dir) / "model.txt").write_text("initial")
+    repo.index.add(["model.txt"])
+    repo.index.commit("initial")
+    holder = FileLock(CommitQueue(git_service).lock.path)
+    assert holder.try_acquire()  # Keep them queued
+    for run in range(3):
+        (Path(repo.working_dir) / "model.txt").write_text(f"run {run}")
+        git_service.stage_and_commit(f"exp: run {run}", Staging(pathspecs=["model.txt"]), wait=False)
+        (Path(repo.working_dir) / "model.txt").write_text("overwritten by the next run")
+    holder.release()
+    BackgroundCommits.get().flush()
+
+    commits = list(repo.iter_commits())
+    assert [commit.message for commit in commits] == ["exp: run 2", "exp: run 1", "exp: run 0", "initial"]
+    assert [commit.tree["model.txt"].data_stream.read() for commit in commits[:3]] == [b"run 2", b"run 1", b"run 0"]
+
+
+def test_conflicting_deferred_commit_is_reported_and_dropped(repo: git.Repo):
+    git_service = GitService(repo)
+    queue = CommitQueue(git_service)
+    holder = FileLock(queue.lock.path)
+    assert holder.try_acquire()
+    (Path(repo.working_dir) / "result.txt").write_text("run")
+    git_service.stage_and_commit("exp: run", Staging(all=True), wait=False)
+    (Path(repo.working_dir) / "result.txt").write_text("edited")
+    repo.index.add(["result.txt"])
+    repo.index.commit("manual commit")
+    holder.release()
+
+    with pytest.raises(LogisError, match="result.txt"):
+        BackgroundCommits.get().flush()
+
+    assert [commit.message for commit in repo.iter_commits()] == ["manual commit"]
+    assert not list(queue.directory.glob("*.msg"))
+    assert not list(queue.claimed.iterdir())
+    assert not list(queue.failed.iterdir())
+
+
+def test_deferred_commit_left_by_a_crash_is_made_by_the_next_drain(repo: git.Repo):
+    git_service = GitService(repo)
+    queue = CommitQueue(git_service)
+    (Path(repo.working_dir) / "result.txt").write_text("run")
+    snapshot = {"tree": git_service.tree_sha(Staging(all=True)), "base": None}
+    queue._enqueue("exp: deferred", Staging(), snapshot=snapshot)  # Its process died before committing it
+
+    git_service.stage_and_commit("exp: next")
+
+    assert [commit.message for commit in repo.iter_commits()] == ["exp: next", "exp: deferred"]
+    assert not list(queue.directory.glob("*.msg"))
+
+
+def test_submitter_timing_out_leaves_claimed_entries_to_the_drain(repo: git.Repo):
+    queue = CommitQueue(GitService(repo))
+    holder = FileLock(queue.lock.path)
+    assert holder.try_acquire()
+    entry = queue._enqueue("exp: claimed", Staging(all=True))
+    queue.claimed.mkdir(parents=True)
+    entry.rename(queue.claimed / entry.name)  # As the lock holder's drain does before committing it
+
+    with pytest.raises(LogisError):
+        queue.wait(entry, timeout=0.1)
+    holder.release()
+
+    assert (queue.claimed / entry.name).exists()
+    queue.submit("exp: next", Staging())
+    assert [commit.message for commit in repo.iter_commits()] == ["exp: next", "exp: claimed"]
+
+
+def test_drain_failing_to_write_notes_doesnt_commit_twice(repo: git.Repo, monkeypatch: pytest.MonkeyPatch):
+    git_service = GitService(repo)
+    queue = CommitQueue(git_service)
+    queue._enqueue("exp: first", Staging(all=True), note="first")
+    queue._enqueue("exp: second", Staging(all=True), note="second")
+    add_notes = git_service.add_notes
+
+    def fail(notes: dict[str, str]) -> None:
+        raise git.GitCommandError("notes", 128)
+
+    monkeypatch.setattr(git_service, "add_notes", fail)
+    with pytest.raises(git.GitCommandError):
+        queue.drain()
+    monkeypatch.setattr(git_service, "add_notes", add_notes)
+    queue.drain()
+
+    assert [commit.message for commit in repo.iter_commits()] == ["exp: second", "exp: first"]
+    assert sorted(git_service.read_notes().values()) == ["first", "second"]
+    assert not list(queue.claimed.iterdir())
@@ -0,0 +1,106 @@
+import threading
+
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from logis.domain.git import Commit
+from logis.domain.query import Aggregate, OrderBy, Query
+from logis.error import LogisError
+from logis.service.daemon import DaemonClient, QueryServer
+from logis.service.git import GitService
+from logis.service.index import IndexService
+from logis.service.query import QueryService
+
+
+@pytest.fixture
+def git_service(tmp_path):
+    service = Mock(spec=GitService)
+    commits = [
+        Commit(
+            sha=f"{i:040x}",
+            message=f"exp: Test {i}\n\n---\n\n"
+            f'{{"experiment": "test", "hyperparameters": {{}}, "metrics": {{"accuracy": 0.{i}}}}}',
+            date=datetime(2024, 1, i),
+        )
+        for i in range(1, 4)
+    ]
+    service.iter_commits.side_effect = lambda *args, **kwargs: iter(commits)
+    service.git_dir = tmp_path
+    service.head_sha.return_value = "abc123"
+    service.notes_sha.return_value = None
+    (tmp_path / "HEAD").write_text("ref: refs/heads/main\n")
+    return service
+
+
+def make_server(git_service: GitService) -> QueryServer:
+    index_service = IndexService(git_service)
+    return QueryServer(git_service, index_service, QueryService(git_service, index_service))
+
+
+@pytest.fixture
+def server(git_service: GitService):
+    server = make_server(git_service)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_client_matches_query_service(server: QueryServer, git_service: GitService):
+    client = DaemonClient.connect(git_service.git_dir)
+    query = Query.where("metrics.accuracy", ">", 0.15)
+
+    assert client is not None
+    remote = client.execute(query, limit=1, order_by=OrderBy(field="metrics.accuracy"))
+    local = server.query_service.execute(query, limit=1, order_by=OrderBy(field="metrics.accuracy"))
+    assert remote == local
+
+    aggregates = client.aggregate(query, [Aggregate.parse("max:metrics.accuracy")], group_by="experiment")
+    assert [(group.key, group.count, group.values) for group in aggregates.groups] == [
+        ("test", 2, {"max(metrics.accuracy)": 0.3})
+    ]
+
+
+def test_errors_are_returned_to_the_client(server: QueryServer, git_service: GitService):
+    client = DaemonClient(server.path)
+
+    with pytest.raises(LogisError):
+        client.execute(Query(expression="[?metrics.accuracy >"))
+    assert client.ping()  # The daemon keeps serving
+
+
+def test_refresh_updates_index_when_head_moves(git_service: GitService, mocker):
+    server = make_server(git_service)
+    update = mocker.spy(server.index_service, "update")
+
+    server.refresh()
+    server.refresh()
+    update.assert_called_once()
+
+    (git_service.git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_service.git_dir / "refs" / "heads" / "main").write_text("abc123\n")
+    server.refresh()
+    assert update.call_count == 2
+    server.server_close()
+
+
+def test_connect_without_daemon(git_service: GitService):
+    assert DaemonClient.connect(git_service.git_dir) is None
+
+    stale = make_server(git_service)
+    stale.socket.close()  # Leaves the socket file behind, as if the daemon was killed
+
+    assert DaemonClient.connect(git_service.git_dir) is None
+    make_server(git_service).server_close()
+
+
+def test_single_daemon_per_repository(server: QueryServer, git_service: GitService, monkeypatch):
+    with pytest.raises(LogisError):
+        QueryServer(git_service, server.index_service, server.query_service)
+
+    monkeypatch.setenv("LOGIS_NO_DAEMON", "1")
+    assert DaemonClient.connect(git_service.git_dir) is None
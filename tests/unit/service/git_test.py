@@ -0,0 +1,191 @@
+import importlib
+import os
+import sys
+import time
+
+from io import BytesIO
+from pathlib import Path
+
+import git
+
+from logis.domain.experiment import CommitKind
+from logis.domain.git import StageStrategy, Staging
+from logis.service.git import GitService, _split_records
+
+
+def test_iter_commits_pushes_kind_filter_into_git(repo: git.Repo):
+    repo.index.commit("exp: first\n\n---\n\n{}")
+    repo.index.commit("feat: a feature\n\nexp: mentioned in the body")
+    repo.index.commit("fix: a fix")
+    repo.index.commit("exp: second\n\n---\n\n{}")
+
+    commits = list(GitService(repo).iter_commits(CommitKind.EXP))
+
+    assert [commit.message.split("\n")[0] for commit in commits] == ["exp: second", "exp: first"]
+
+
+def test_iter_commits_is_lazy(repo: git.Repo):
+    for i in range(3):
+        repo.index.commit(f"fix: {i}")
+
+    commits = GitService(repo).iter_commits()
+
+    assert next(commits).message == "fix: 2"
+
+
+def test_iter_commits_matches_gitpython(repo: git.Repo):
+    repo.index.commit("exp: one\n\n---\n\n{}")
+    repo.index.commit("fix: two\n\nwith a body\n\n")
+
+    commits = list(GitService(repo).iter_commits())
+
+    expected = list(repo.iter_commits())
+    assert [c.sha for c in commits] == [c.hexsha for c in expected]
+    assert [c.message for c in commits] == [c.message for c in expected]
+    assert [c.date for c in commits] == [c.committed_datetime for c in expected]
+
+
+def test_split_records_across_chunk_boundaries(mocker):
+    mocker.patch("logis.service.git.READ_CHUNK_SIZE", 3)
+    stream = BytesIO("first\0sécond\0third".encode())
+
+    assert list(_split_records(stream)) == ["first", "sécond", "third"]
+
+
+def staged_files(repo: git.Repo) -> set[str]:
+    return {path for path, _ in repo.index.entries}
+
+
+def test_tracked_strategy_leaves_untracked_files_alone(repo: git.Repo):
+    (Path(repo.working_dir) / "train.py").write_text("v1")
+    repo.index.add(["train.py"])
+    repo.index.commit("feat: train")
+    (Path(repo.working_dir) / "train.py").write_text("v2")
+    (Path(repo.working_dir) / "checkpoint.bin").write_bytes(b"\0" * 1024)
+
+    git_service = GitService(repo)
+    git_service.stage(git_service.staging(StageStrategy.TRACKED))
+
+    assert staged_files(repo) == {"train.py"}
+    assert repo.index.diff("HEAD")
+
+
+def test_paths_strategy_stages_matching_files(repo: git.Repo):
+    root = Path(repo.working_dir)
+    (root / "src").mkdir()
+    (root / "src" / "model.py").write_text("model")
+    (root / "data.csv").write_text("1,2,3")
+
+    git_service = GitService(repo)
+    git_service.stage(git_service.staging(StageStrategy.PATHS, ["src/**/*.py"]))
+
+    assert staged_files(repo) == {"src/model.py"}
+    assert not git_service.should_commit(StageStrategy.PATHS)
+
+
+def test_changed_strategy_only_selects_files_changed_since_last_commit(repo: git.Repo):
+    root = Path(repo.working_dir)
+    for name in ("a.py", "b.py", "c.py"):
+        (root / name).write_text(name)
+    git_service = GitService(repo)
+    first = git_service.staging(StageStrategy.CHANGED)
+    git_service.stage_and_commit("exp: first", first)
+
+    (root / "b.py").write_text("changed")
+    (root / "c.py").unlink()
+    (root / "d.py").write_text("new")
+    second = git_service.staging(StageStrategy.CHANGED)
+
+    assert sorted(first.pathspecs) == [":(literal)a.py", ":(literal)b.py", ":(literal)c.py"]
+    assert sorted(second.pathspecs) == [":(literal)b.py", ":(literal)c.py", ":(literal)d.py"]
+    git_service.stage(second)
+    assert staged_files(repo) == {"a.py", "b.py", "d.py"}
+
+
+def test_changed_strategy_selects_uncommitted_changes_again(repo: git.Repo):
+    root = Path(repo.working_dir)
+    (root / "a.py").write_text("a")
+    git_service = GitService(repo)
+    git_service.stage_and_commit("exp: first", git_service.staging(StageStrategy.CHANGED))
+    (root / "a.py").write_text("changed")
+
+    dropped = git_service.staging(StageStrategy.CHANGED)  # e.g. a dry run, or a commit that failed
+
+    assert dropped.pathspecs == [":(literal)a.py"]
+    assert git_service.staging(StageStrategy.CHANGED).pathspecs == [":(literal)a.py"]
+
+
+def test_changed_strategy_selects_files_modified_as_the_cache_was_written(repo: git.Repo):
+    root = Path(repo.working_dir)
+    (root / "a.py").write_text("a")
+    tick = time.time_ns() + 60 * 10**9  # Not older than the stat cache, like a write in the same timestamp tick
+    os.utime(root / "a.py", ns=(tick, tick))
+    git_service = GitService(repo)
+    git_service.stage_and_commit("exp: first", git_service.staging(StageStrategy.CHANGED))
+
+    (root / "a.py").write_text("b")  # Same size and mtime
+    os.utime(root / "a.py", ns=(tick, tick))
+
+    assert git_service.staging(StageStrategy.CHANGED).pathspecs == [":(literal)a.py"]
+
+
+def test_imports_strategy_stages_imported_modules(repo: git.Repo, monkeypatch):
+    root = Path(repo.working_dir)
+    (root / "experiment_helpers.py").write_text("VALUE = 1\n")
+    (root / "unrelated.py").write_text("VALUE = 2\n")
+    (root / "secret_config.py").write_text("VALUE = 3\n")
+    (root / ".gitignore").write_text("secret_config.py\n")
+    monkeypatch.syspath_prepend(str(root))
+    for name in ("experiment_helpers", "secret_config"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+        importlib.import_module(name)
+
+    git_service = GitService(repo)
+    staging = git_service.staging(StageStrategy.IMPORTS)
+
+    assert staging.pathspecs == [":(literal)experiment_helpers.py"]
+
+
+def test_should_not_commit_during_merge(repo: git.Repo):
+    git_service = GitService(repo)
+    assert git_service.should_commit(StageStrategy.ALL)
+
+    (Path(repo.git_dir) / "MERGE_HEAD").write_text("0" * 40)
+    assert not git_service.should_commit(StageStrategy.ALL)
+
+
+def test_snapshot_doesnt_need_the_index(repo: git.Repo):
+    root = Path(repo.working_dir)
+    (root / "train.py").write_text("v1")
+    lock = Path(repo.git_dir) / "index.lock"
+    lock.touch()  # Someone is in the middle of `git add -p`
+
+    tree = GitService(repo).tree_sha(Staging(all=True))
+    lock.unlink()
+
+    assert repo.git.show(f"{tree}:train.py") == "v1"
+    assert not staged_files(repo)
+
+
+def test_commit_keeps_the_staging_area(repo: git.Repo):
+    root = Path(repo.working_dir)
+    (root / "notes.md").write_text("draft")
+    repo.index.add(["notes.md"])
+    repo.index.commit("docs: notes")
+    (root / "notes.md").write_text("staged")
+    repo.index.add(["notes.md"])
+    (root / "notes.md").write_text("staged, then edited")
+    (root / "results").mkdir()
+    (root / "results" / "metrics.json").write_text("{}")
+
+    git_service = GitService(repo)
+    git_service.stage_and_commit("exp: run", git_service.staging(StageStrategy.PATHS, ["results/*"]))
+
+    head = repo.head.commit
+    assert head.message == "exp: run"
+    assert head.tree["results/metrics.json"].data_stream.read() == b"{}"
+    # Like `git commit`, the index holds the committed content, and work tree edits stay unstaged.
+    assert head.tree["notes.md"].data_stream.read() == b"staged"
+    assert not repo.index.diff("HEAD")
+    assert [diff.a_path for diff in repo.index.diff(None)] == ["notes.md"]
+    assert repo.head.log()[-1].message == "commit: exp: run"
@@ -0,0 +1,70 @@
+import git
+
+from logis.domain.experiment import ExperimentBatch, ExperimentRun
+from logis.service.git import GitService
+from logis.service.index import IndexService
+
+
+def commit_experiment(repo: git.Repo, name: str, accuracy: float) -> str:
+    run = ExperimentRun(experiment=name, hyperparameters={}, metrics={"accuracy": accuracy})
+    return repo.index.commit(run.as_commit_message(template="run {experiment}").render()).hexsha
+
+
+def test_index_is_persisted_and_updated_incrementally(repo: git.Repo, mocker):
+    git_service = GitService(repo)
+    commit_experiment(repo, "first", 0.1)
+    repo.index.commit("feat: not an experiment")
+
+    index = IndexService(git_service)
+    assert [c.experiment_run.experiment for c in index.experiment_records()] == ["first"]
+    assert index.path.exists()
+
+    second = commit_experiment(repo, "second", 0.2)
+    walk = mocker.spy(git_service, "iter_commits")
+
+    # A fresh service loads from disk and only walks the new commit.
+    index = IndexService(git_service)
+    commits = index.experiment_records()
+    assert [c.experiment_run.experiment for c in commits] == ["second", "first"]
+    assert commits[0].sha == second
+    walk.assert_called_once()
+    assert walk.call_args.kwargs["rev"].endswith(f"..{second}")
+
+
+def test_index_is_rebuilt_after_history_rewrite(repo: git.Repo):
+    git_service = GitService(repo)
+    first = commit_experiment(repo, "first", 0.1)
+    commit_experiment(repo, "second", 0.2)
+
+    index = IndexService(git_service)
+    assert len(index.experiment_records()) == 2
+
+    repo.git.reset("--hard", first)
+    commit_experiment(repo, "rewritten", 0.3)
+
+    commits = IndexService(git_service).experiment_records()
+    assert [c.experiment_run.experiment for c in commits] == ["rewritten", "first"]
+
+
+def test_corrupt_index_is_ignored(repo: git.Repo):
+    git_service = GitService(repo)
+    commit_experiment(repo, "first", 0.1)
+
+    index = IndexService(git_service)
+    index.path.parent.mkdir(parents=True)
+    index.path.write_text("{not json")
+
+    assert len(index.experiment_records()) == 1
+
+
+def test_batch_commit_runs_are_indexed_individually(repo: git.Repo):
+    commit_experiment(repo, "single", 0.5)
+    runs = [ExperimentRun(experiment=f"run{i}", hyperparameters={}, metrics={"accuracy": i / 10}) for i in range(3)]
+    batch = repo.index.commit(ExperimentBatch(runs=runs).as_commit_message(template="batch").render()).hexsha
+
+    IndexService(GitService(repo)).experiment_records()
+    records = IndexService(GitService(repo)).experiment_records()  # Loaded from disk
+
+    assert [record.metadata["experiment"] for record in records] == ["run0", "run1", "run2", "single"]
+    assert [record.sha for record in records[:3]] == [batch] * 3
+    assert records[2].message == records[0].message
@@ -0,0 +1,110 @@
+import json
+
+import git
+import pytest
+
+from logis.domain.experiment import ExperimentRun
+from logis.error import LogisError
+from logis.service import index as index_module
+from logis.service.git import GitService
+from logis.service.index import IndexService
+
+
+def run_message(name: str, accuracy: float) -> str:
+    run = ExperimentRun(experiment=name, hyperparameters={"lr": 0.1}, metrics={"accuracy": accuracy})
+    return run.as_commit_message(template="run {experiment}").render()
+
+
+def test_notes_storage_keeps_metadata_out_of_the_message(repo: git.Repo, monkeypatch):
+    monkeypatch.setenv("LOGIS_STORAGE", "notes")
+    git_service = GitService(repo)
+
+    git_service.stage_and_commit(run_message("first", 0.1))
+    git_service.stage_and_commit(run_message("second", 0.2))
+
+    assert repo.head.commit.message == "exp: run second"
+    notes = git_service.read_notes()
+    assert json.loads(notes[repo.head.commit.hexsha])["metrics"] == {"accuracy": 0.2}
+    records = IndexService(git_service).experiment_records()
+    assert [record.experiment_run.experiment for record in records] == ["second", "first"]
+
+
+def test_backfill_notes_from_messages(repo: git.Repo):
+    git_service = GitService(repo)
+    first = repo.index.commit(run_message("first", 0.1)).hexsha
+    repo.index.commit("feat: not an experiment")
+    second = repo.index.commit(run_message("second", 0.2)).hexsha
+
+    assert git_service.backfill_notes() == 2
+    assert git_service.backfill_notes() == 0
+
+    notes = git_service.read_notes()
+    assert set(notes) == {first, second}
+    assert json.loads(notes[first]) == ExperimentRun.parse_metadata(repo.commit(first).message)
+
+
+def test_index_picks_up_notes_added_to_indexed_commits(repo: git.Repo, mocker):
+    git_service = GitService(repo)
+    sha = repo.index.commit("exp: run without metadata").hexsha
+    repo.index.commit(run_message("later", 0.3))
+    index = IndexService(git_service)
+    assert len(index.experiment_records()) == 1
+
+    metadata = {"experiment": "noted", "hyperparameters": {}, "metrics": {"accuracy": 0.5}}
+    git_service.add_notes({sha: json.dumps(metadata)})
+    parse = mocker.spy(index_module, "parse_experiment_commits")
+
+    records = IndexService(git_service).experiment_records()
+    assert [record.experiment_run.experiment for record in records] == ["later", "noted"]
+    # Only the commit whose note changed was parsed again.
+    assert [commit.sha for commit in parse.call_args.args[0]] == [sha]
+
+
+def test_invalid_storage_setting(repo: git.Repo, monkeypatch):
+    monkeypatch.setenv("LOGIS_STORAGE", "database")
+    with pytest.raises(LogisError):
+        GitService(repo).storage
+
+
+def test_compressed_encoding_in_messages_and_notes(repo: git.Repo, monkeypatch):
+    monkeypatch.setenv("LOGIS_ENCODING", "zlib")
+    git_service = GitService(repo)
+    git_service.stage_and_commit(run_message("message", 0.1))
+    monkeypatch.setenv("LOGIS_STORAGE", "notes")
+    git_service.stage_and_commit(run_message("note", 0.2))
+
+    first = repo.head.commit.parents[0]
+    assert first.message.startswith("exp: run message\n\n---\n\nlogis:v1:zlib+b64\n")
+    assert git_service.read_notes()[repo.head.commit.hexsha].startswith("logis:v1:zlib+b64\n")
+    records = IndexService(git_service).experiment_records()
+    assert [record.metadata["metrics"]["accuracy"] for record in records] == [0.2, 0.1]
+
+
+def test_index_reads_notes_changed_on_indexed_runs_from_the_notes_tree(repo: git.Repo, mocker):
+    git_service = GitService(repo)
+    first = repo.index.commit(run_message("first", 0.1)).hexsha
+    repo.index.commit(run_message("second", 0.2))
+    index = IndexService(git_service)
+    assert len(index.experiment_records()) == 2
+
+    metadata = {"experiment": "first", "hyperparameters": {}, "metrics": {"accuracy": 0.9}}
+    git_service.add_notes({first: json.dumps(metadata)})
+    walk = mocker.spy(git_service, "iter_commits")
+
+    records = index.experiment_records()
+    assert [record.metadata["metrics"]["accuracy"] for record in records] == [0.2, 0.9]
+    walk.assert_not_called()
+
+
+def test_add_notes_keeps_notes_written_by_git(repo: git.Repo):
+    git_service = GitService(repo)
+    first = repo.index.commit(run_message("first", 0.1)).hexsha
+    second = repo.index.commit(run_message("second", 0.2)).hexsha
+    repo.git.notes("--ref", "logis", "add", "-m", "by git", first)
+
+    git_service.add_notes({second: "by logis"})
+    git_service.add_notes({first: "replaced"})
+
+    assert git_service.read_notes() == {first: "replaced", second: "by logis"}
+    assert git_service.read_notes([second]) == {second: "by logis"}
+    assert repo.git.notes("--ref", "logis", "show", first) == "replaced"
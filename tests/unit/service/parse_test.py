@@ -0,0 +1,49 @@
+import json
+
+from datetime import datetime
+
+from logis.domain.git import Commit
+from logis.service.parse import parse_experiment_commits, parse_workers
+
+
+def make_commits(n: int) -> list[Commit]:
+    commits = []
+    for i in range(n):
+        if i % 3:
+            metadata = {"experiment": f"exp{i}", "hyperparameters": {}, "metrics": {"step": i}}
+            message = f"exp: run {i}\n\n---\n\n{json.dumps(metadata)}"
+        else:
+            message = f"fix: {i}"
+        commits.append(Commit(sha=f"{i:040x}", message=message, date=datetime(2024, 1, 1)))
+    return commits
+
+
+def test_parallel_parsing_preserves_history_order(mocker):
+    mocker.patch("logis.service.parse.PARALLEL_PARSE_THRESHOLD", 10)
+    mocker.patch("logis.service.parse.PARALLEL_PARSE_CHUNK_SIZE", 7)
+    commits = make_commits(50)
+
+    parsed = parse_experiment_commits(commits, workers=3)
+
+    serial = parse_experiment_commits(commits, workers=1)
+    assert [[exp.experiment_run.metrics for exp in runs] for runs in parsed] == [
+        [exp.experiment_run.metrics for exp in runs] for runs in serial
+    ]
+    assert [[exp.sha for exp in runs] for runs in parsed] == [[c.sha] if i % 3 else [] for i, c in enumerate(commits)]
+
+
+def test_small_batches_are_parsed_in_process(mocker):
+    pool = mocker.patch("logis.service.parse.ProcessPoolExecutor")
+
+    parsed = parse_experiment_commits(make_commits(10), workers=8)
+
+    pool.assert_not_called()
+    assert sum(len(runs) for runs in parsed) == 6
+
+
+def test_parse_workers_from_env(monkeypatch):
+    monkeypatch.setenv("LOGIS_WORKERS", "3")
+    assert parse_workers() == 3
+
+    monkeypatch.setenv("LOGIS_WORKERS", "not a number")
+    assert parse_workers() >= 1
@@ -5,13 +5,14 @@ import pytest
 
 from logis.domain.experiment import ExperimentRun
 from logis.domain.git import Commit
-from logis.domain.query import Query
+from logis.domain.query import Aggregate, OrderBy, Query
 from logis.service.git import GitService
+from logis.service.index import IndexService
 from logis.service.query import QueryService
 
 
 @pytest.fixture
-def git_service():
+def git_service(tmp_path):
     service = Mock(spec=GitService)
     commits = [
         Commit(
@@ -26,12 +27,16 @@ def git_service():
         ),
     ]
     service.get_all_commits.return_value = commits
+    service.iter_commits.side_effect = lambda *args, **kwargs: iter(commits)
+    service.git_dir = tmp_path
+    service.head_sha.return_value = "abc123"
+    service.notes_sha.return_value = None
     return service
 
 
 @pytest.fixture
 def query_service(git_service: GitService):
-    return QueryService(git_service)
+    return QueryService(git_service, IndexService(git_service))
 
 
 # @patch("logis.domain.experiment.ExperimentRun.from_commit")
@@ -51,12 +56,12 @@ def test_execute_query(query_service: QueryService):
     assert result.query == query
 
 
-@patch("logis.domain.experiment.ExperimentRun.from_commit")
-def test_execute_query_with_limit(mock_from_commit, query_service: QueryService):
+@patch("logis.domain.experiment.ExperimentRun.parse_metadata")
+def test_execute_query_with_limit(mock_parse_metadata, query_service: QueryService):
     # Setup mock experiments
-    mock_from_commit.side_effect = [
-        ExperimentRun(experiment="test1", hyperparameters={}, metrics={"accuracy": 0.9}),
-        ExperimentRun(experiment="test2", hyperparameters={}, metrics={"accuracy": 0.95}),
+    mock_parse_metadata.side_effect = [
+        ExperimentRun(experiment="test1", hyperparameters={}, metrics={"accuracy": 0.9}).model_dump(mode="json"),
+        ExperimentRun(experiment="test2", hyperparameters={}, metrics={"accuracy": 0.95}).model_dump(mode="json"),
     ]
 
     # Test query with limit
@@ -67,12 +72,12 @@ def test_execute_query_with_limit(mock_from_commit, query_service: QueryService)
     assert result.num_searched == 2
 
 
-@patch("logis.domain.experiment.ExperimentRun.from_commit")
-def test_execute_simple(mock_from_commit, query_service: QueryService):
+@patch("logis.domain.experiment.ExperimentRun.parse_metadata")
+def test_execute_simple(mock_parse_metadata, query_service: QueryService):
     # Setup mock experiments
-    mock_from_commit.side_effect = [
-        ExperimentRun(experiment="test1", hyperparameters={}, metrics={"accuracy": 0.9}),
-        ExperimentRun(experiment="test2", hyperparameters={}, metrics={"accuracy": 0.95}),
+    mock_parse_metadata.side_effect = [
+        ExperimentRun(experiment="test1", hyperparameters={}, metrics={"accuracy": 0.9}).model_dump(mode="json"),
+        ExperimentRun(experiment="test2", hyperparameters={}, metrics={"accuracy": 0.95}).model_dump(mode="json"),
     ]
 
     # Test query with limit
@@ -80,3 +85,95 @@ def test_execute_simple(mock_from_commit, query_service: QueryService):
 
     assert len(result.commits) == 1
     assert result.num_searched == 2
+
+
+def test_execute_streams_history_without_index(query_service: QueryService, git_service, monkeypatch):
+    monkeypatch.setenv("LOGIS_NO_INDEX", "1")
+    consumed = []
+
+    def iter_commits(*args, **kwargs):
+        for commit in git_service.get_all_commits.return_value:
+            consumed.append(commit.sha)
+            yield commit
+
+    git_service.iter_commits.side_effect = iter_commits
+
+    result = query_service.execute(Query.where("metrics.accuracy", ">", 0.5), limit=1)
+
+    assert [commit.sha for commit in result.commits] == ["abc123"]
+    assert consumed == ["abc123"]
+
+
+def test_execute_non_filter_expression(query_service: QueryService):
+    result = query_service.execute(Query.from_expression("[?metrics.accuracy > `0.5`] | [1:]"))
+
+    assert [commit.sha for commit in result.commits] == ["def456"]
+    assert result.num_searched == 2
+
+
+def test_execute_columnar(query_service: QueryService, monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr("logis.service.query.COLUMNAR_THRESHOLD", 0)
+    monkeypatch.setattr("logis.service.query.COLUMNAR_MIN_SCANS", 0)
+
+    # Not a range, which the secondary indexes would answer.
+    result = query_service.execute(Query.from_expression("[?metrics.accuracy != `0.8`]"), limit=1)
+
+    assert query_service.index_service.has_columnar()
+    assert [commit.sha for commit in result.commits] == ["def456"]
+    assert result.num_searched == 2
+
+
+def test_columnar_view_is_only_built_for_repeated_queries(query_service: QueryService, monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr("logis.service.query.COLUMNAR_THRESHOLD", 0)
+    monkeypatch.setattr("logis.service.query.COLUMNAR_MIN_SCANS", 2)
+    query = Query.from_expression("[?metrics.accuracy != `0.8`]")
+
+    built = []
+    for _ in range(3):
+        assert [commit.sha for commit in query_service.execute(query).commits] == ["def456"]
+        built.append(query_service.index_service.has_columnar())
+
+    assert built == [False, False, True]
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_top_k(query_service: QueryService, monkeypatch, indexed: bool):
+    if not indexed:
+        monkeypatch.setenv("LOGIS_NO_INDEX", "1")
+
+    best = query_service.top_k("metrics.accuracy", 1)
+    worst = query_service.top_k("metrics.loss", 2, descending=False, query=Query.where("metrics.accuracy", "<", 0.85))
+
+    assert [commit.sha for commit in best.commits] == ["def456"]
+    assert [commit.sha for commit in worst.commits] == ["abc123"]
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_execute_ordered(query_service: QueryService, monkeypatch, indexed: bool):
+    if not indexed:
+        monkeypatch.setenv("LOGIS_NO_INDEX", "1")
+
+    result = query_service.execute(Query.everything(), order_by=OrderBy(field="metrics.loss", descending=False))
+
+    assert [commit.sha for commit in result.commits] == ["def456", "abc123"]
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_aggregate(query_service: QueryService, monkeypatch, indexed: bool):
+    if not indexed:
+        monkeypatch.setenv("LOGIS_NO_INDEX", "1")
+    aggregates = [Aggregate.parse("mean:metrics.accuracy"), Aggregate.parse("max:metrics.loss")]
+
+    overall = query_service.aggregate(Query.everything(), aggregates)
+    grouped = query_service.aggregate(Query.where("metrics.loss", "<", 0.5), aggregates, group_by="experiment")
+
+    assert [group.count for group in overall.groups] == [2]
+    assert overall.groups[0].values == {
+        "mean(metrics.accuracy)": pytest.approx(0.85),
+        "max(metrics.loss)": 0.2,
+    }
+    assert [(group.key, group.count) for group in grouped.groups] == [("test1", 1), ("test2", 1)]
+    assert grouped.groups[1].values["max(metrics.loss)"] == 0.1
+    assert grouped.num_searched == 2
@@ -0,0 +1,59 @@
+from array import array
+
+import git
+import pytest
+
+import logis
+
+from logis.domain.query import OrderBy, Query
+from logis.service.artifact import ArtifactService
+from logis.service.git import GitService
+from logis.service.index import IndexService
+from logis.service.query import QueryService
+from logis.service.series import SeriesWriter
+
+np = pytest.importorskip("numpy")
+
+
+def test_series_are_spooled_in_chunks():
+    writer = SeriesWriter(chunk_size=4)
+    for step in range(10):
+        writer.append(step, {"loss": 10 - step, "train/accuracy": step / 10})
+        assert all(len(buffer) < 2 * writer.chunk_size for buffer in writer._buffers.values())
+
+    files = writer.finish()
+
+    points = array("d")
+    points.frombytes(files["loss"].read_bytes())
+    assert list(points[:4]) == [0, 10, 1, 9]
+    assert len(points) == 20
+    assert writer.summaries["loss"].min == 1 and writer.summaries["loss"].min_step == 9
+    assert writer.summaries["train/accuracy"].last == 0.9
+    writer.close()
+    assert not files["loss"].exists()
+
+
+def test_logged_series_are_summarized_and_queryable(repo: git.Repo):
+    @logis.commit
+    def train(run: logis.Run, lr: float):
+        run.set_hyperparameters({"lr": lr})
+        for epoch in range(50):
+            run.log(epoch, loss=abs(epoch - 40 * lr) + 0.1)
+        run.set_metrics({"epochs": 50})
+
+    train(0.5)
+    train(1.0)
+
+    git_service = GitService(repo)
+    index_service = IndexService(git_service)
+    query_service = QueryService(git_service, index_service)
+    result = query_service.execute(
+        Query.where("series.loss.min", "<", 1), order_by=OrderBy(field="series.loss.min_step", descending=True)
+    )
+    assert [commit.experiment_run.series["loss"]["min_step"] for commit in result.commits] == [40, 20]
+
+    run = result.commits[0].experiment_run
+    assert run.series["loss"]["count"] == 50 and run.series["loss"]["last"] == pytest.approx(9.1)
+    loss = ArtifactService(git_service).series(run)["loss"]
+    assert isinstance(loss, np.memmap) and loss.shape == (50, 2)
+    assert loss[40].tolist() == [40, pytest.approx(0.1)]
@@ -0,0 +1,23 @@
+import git
+import pytest
+
+from dishka import FromDishka
+from dishka.exceptions import NoFactoryError
+
+from logis.service.codebase import CodebaseService
+from logis.service.index import IndexService
+from logis.service.query import QueryService
+from logis.util.di import DI
+
+
+def query_command(query_service: FromDishka[QueryService], limit: int = 10): ...
+
+
+def test_container_for_a_function_provides_what_it_asks_for(repo: git.Repo):
+    di = DI.for_function(query_command)
+
+    query_service = di[QueryService]
+    assert query_service.index_service is di[IndexService]  # Dependencies are provided too, once
+    with pytest.raises(NoFactoryError):
+        di[CodebaseService]
+    di.container.close()
@@ -0,0 +1,52 @@
+import os
+
+from pathlib import Path
+
+import git
+import pytest
+
+from logis.service.git import GitService
+from logis.util.session import close_session, session
+
+
+def test_session_is_reused(repo: git.Repo):
+    git_service = session()[GitService]
+
+    assert session()[GitService] is git_service
+
+
+def test_session_follows_working_directory(repo: git.Repo, tmp_path: Path, monkeypatch):
+    first = session()
+    other = tmp_path / "other"
+    git.Repo.init(other)
+    monkeypatch.chdir(other)
+
+    assert session() is not first
+    assert session()[GitService].work_tree == other
+
+
+def test_closed_session_reopens(repo: git.Repo):
+    git_service = session()[GitService]
+    close_session()
+
+    assert session()[GitService] is not git_service
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Needs fork")
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+def test_forked_child_leaves_parent_git_processes_alone(repo: git.Repo):
+    repo.index.commit("initial")
+    git_service = session()[GitService]
+    session()[git.Repo].git.get_object_header("HEAD")  # Starts the persistent `git cat-file`
+    cat_file = session()[git.Repo].git.cat_file_header
+
+    pid = os.fork()
+    if pid == 0:
+        # Detached, so the child can't terminate it, and the child opens its own session.
+        detached = cat_file.proc is None and session()[GitService] is not git_service
+        os._exit(0 if detached else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert cat_file.proc.poll() is None
+    assert git_service.head_sha() is not None